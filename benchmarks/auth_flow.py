@@ -0,0 +1,208 @@
+'''
+End-to-end load of the webhook authentication flow. Authenticator runs with TonClient
+crypto and ABI (local calls) and an idle stand-in of the network, so no TON server
+is needed. N sessions are started concurrently, then a pool of Surf mocks (webhook mode)
+decodes their QR codes, signs them and posts to a local aiohttp server calling
+`auth.hook`, until every callback is executed.
+
+Reports, as one JSON object on stdout:
+- sessions_per_sec: `start_authentication` calls, auths_per_sec: completed authentications
+- hook_ms: p50/p95/p99/max of `auth.hook` in the webhook handler
+- callback_ms: from the webhook arrival to the callback, e2e_ms: from the start
+  of signing in Surf to the callback
+- loop_lag_ms: delay of a 1ms sleep of a probe task while the load runs
+- rss_mb: current and peak resident memory
+
+Run: python -m benchmarks.auth_flow [--sessions N] [--surfs N] [--qr-format link|png|svg|matrix]
+     [--output results.json]
+'''
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import resource
+
+import aiohttp
+from aiohttp import web
+
+from torauth import Authenticator, Config
+from torauth.mocks.Surf import Surf
+from torauth.mocks.decode_qr import decode_qr
+
+
+class IdleNet:
+    ''' Network stand-in: the subscription is accepted, no messages arrive '''
+
+    async def subscribe_collection(self, params, callback):
+        return type('Handle', (), {'handle': 1})()
+
+    async def unsubscribe(self, params):
+        pass
+
+    async def query_collection(self, params):
+        return type('Result', (), {'result': []})()
+
+
+class OfflineClient:
+    ''' Local calls of TonClient, network calls of the stand-in '''
+
+    def __init__(self, client):
+        self.crypto = client.crypto
+        self.abi = client.abi
+        self.boc = client.boc
+        self.tvm = client.tvm
+        self.net = IdleNet()
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {}
+
+    def at(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1e3, 3)
+    return {'p50': at(0.5), 'p95': at(0.95), 'p99': at(0.99), 'max': round(values[-1] * 1e3, 3)}
+
+
+def rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    try:
+        with open('/proc/self/statm') as fp:
+            current = int(fp.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        current = None
+    return {'current': current and round(current, 1), 'peak': round(peak, 1)}
+
+
+async def run(sessions, surfs, qr_format, concurrency):
+    config = Config()
+    config.client = OfflineClient(config.client)
+    auth = Authenticator(config)
+
+    hook_times = []
+    arrivals = {}
+    sign_starts = {}
+    callback_delays = []
+    e2e_delays = []
+    completed = asyncio.Event()
+    seqs = [None] * sessions
+    done = 0
+
+    async def on_auth_callback(context, result, public_key=None, wallet_address=None):
+        nonlocal done
+        now = time.perf_counter()
+        seq = seqs[context]
+        callback_delays.append(now - arrivals[seq])
+        e2e_delays.append(now - sign_starts[seq])
+        done += 1
+        if done == sessions:
+            completed.set()
+
+    async def hook_handler(request):
+        data = await request.json()
+        start = time.perf_counter()
+        arrivals[data['seq']] = start
+        await auth.hook(data)
+        hook_times.append(time.perf_counter() - start)
+        return web.Response(text='OK')
+
+    runner = web.ServerRunner(web.Server(hook_handler))
+    await runner.setup()
+    site = web.TCPSite(runner, 'localhost', 0)
+    await site.start()
+    webhook_url = f'http://localhost:{site._server.sockets[0].getsockname()[1]}/hook'
+    await auth.init(on_auth_callback)
+
+    lags = []
+    probing = True
+
+    async def probe():
+        while probing:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    probe_task = asyncio.create_task(probe())
+
+    # Sessions
+    qr_codes = [None] * sessions
+    slots = asyncio.Semaphore(concurrency)
+
+    async def start_session(i):
+        async with slots:
+            qr_codes[i] = await auth.start_authentication(
+                webhook_url=webhook_url, pin=None, context=i, qr_format=qr_format)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(start_session(i) for i in range(sessions)))
+    started = time.perf_counter() - start
+    for i, qr_code in enumerate(qr_codes):
+        # <deep link url>rand,seq,webhook_url
+        seqs[i] = decode_qr(qr_code)[len(config.deep_link_url):].split(',')[1]
+
+    # Surf users
+    pending = asyncio.Queue()
+    for i, qr_code in enumerate(qr_codes):
+        pending.put_nowait((seqs[i], qr_code))
+
+    async def surf_user(surf):
+        while not pending.empty():
+            seq, qr_code = pending.get_nowait()
+            sign_starts[seq] = time.perf_counter()
+            await surf.sign(qr_code, None)
+
+    async with aiohttp.ClientSession(json_serialize=json.dumps) as http_session:
+        users = []
+        for i in range(surfs):
+            keys = await config.client.crypto.generate_random_sign_keys()
+            users.append(Surf(
+                config, f'0:{i:064x}', keys.public, keys.secret,
+                callback_type='webhook', http_session=http_session))
+        start = time.perf_counter()
+        await asyncio.gather(*(surf_user(surf) for surf in users))
+        await completed.wait()
+        authenticated = time.perf_counter() - start
+
+    probing = False
+    await probe_task
+    await auth.close()
+    await runner.cleanup()
+
+    return {
+        'sessions': sessions,
+        'surfs': surfs,
+        'qr_format': qr_format,
+        'sessions_per_sec': round(sessions / started, 1),
+        'auths_per_sec': round(sessions / authenticated, 1),
+        'hook_ms': percentiles(hook_times),
+        'callback_ms': percentiles(callback_delays),
+        'e2e_ms': percentiles(e2e_delays),
+        'loop_lag_ms': percentiles(lags),
+        'rss_mb': rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end load of the webhook auth flow')
+    parser.add_argument('--sessions', type=int, default=2000)
+    parser.add_argument('--surfs', type=int, default=100, help='concurrent Surf mocks')
+    parser.add_argument('--concurrency', type=int, default=200,
+                        help='concurrent start_authentication calls')
+    parser.add_argument('--qr-format', default='link', choices=('link', 'png', 'svg', 'matrix'))
+    parser.add_argument('--output', help='also write the results to this file')
+    args = parser.parse_args()
+
+    logging.getLogger('torauth').setLevel(logging.WARNING)
+    results = asyncio.run(run(args.sessions, args.surfs, args.qr_format, args.concurrency))
+    results['python'] = sys.version.split()[0]
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            fp.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+'''
+Cost of one `Cache.clean_obsolete` tick depending on the number of live sessions.
+
+Compares the deadline-ordered in-memory store with the former full scan over all sessions.
+Run: python -m benchmarks.cache_expiry
+'''
+import time
+import timeit
+
+from torauth.Cache import Cache
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+EXPIRED_PER_TICK = 100
+
+
+def full_scan(cache):
+    # Former implementation of `clean_obsolete`
+    obsolete_contexts = []
+    data = cache.store.data
+    for k in list(data):
+        v = data[k]
+        if v['timestamp'] + v['retention_sec'] < time.time():
+            obsolete_contexts.append(v['context'])
+            cache.store.pop(k)
+    return obsolete_contexts
+
+
+def fill(n):
+    cache = Cache()
+    for i in range(n):
+        cache.add(seq=str(i), webhook_url='https://ex.com', pin=None,
+                  retention_sec=3600, rand=str(i), context=i)
+    return cache
+
+
+def expire_some(cache):
+    # Sessions that are already past their deadline
+    for i in range(EXPIRED_PER_TICK):
+        cache.add(seq=f'x{i}', webhook_url='https://ex.com', pin=None,
+                  retention_sec=-1, rand=str(i), context=i)
+
+
+def measure(cache, clean):
+    idle = min(timeit.repeat(clean, number=1, repeat=5))
+    expire_some(cache)
+    start = time.perf_counter()
+    expired = clean()
+    busy = time.perf_counter() - start
+    assert len(expired) == EXPIRED_PER_TICK
+    return idle, busy
+
+
+def main():
+    print(f'{"sessions":>10} {"heap idle":>12} {"heap +100":>12} {"scan idle":>12} {"scan +100":>12}')
+    for n in SIZES:
+        cache = fill(n)
+        heap_idle, heap_busy = measure(cache, cache.clean_obsolete)
+        scan_idle, scan_busy = measure(cache, lambda: full_scan(cache))
+        print(f'{n:>10} {heap_idle * 1e6:>10.1f}us {heap_busy * 1e6:>10.1f}us '
+              f'{scan_idle * 1e3:>10.1f}ms {scan_busy * 1e3:>10.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
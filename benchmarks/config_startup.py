@@ -0,0 +1,71 @@
+'''
+Cold start of a worker: a fresh interpreter imports torauth, creates Config and
+Authenticator, then touches the fields it uses. An auth-only worker needs the ROOT
+ABI and TVC, the root interface ABI and TonClient; "all fields" loads every ABI
+and TVC as Config did eagerly before. Also reports the cost of one more Config
+in a running process (files and TonClient are shared).
+
+Run: python -m benchmarks.config_startup
+'''
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+RUNS = 5
+REPEATS = 200
+
+WORKER = '''
+import time, json, resource
+start = time.perf_counter()
+from torauth import Config, Authenticator
+config = Config()
+auth = Authenticator(config)
+for name in {fields!r}:
+    getattr(config, name)
+config.client
+print(json.dumps({{
+    'ms': (time.perf_counter() - start) * 1e3,
+    'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}}))
+'''
+
+AUTH_FIELDS = ('root_abi', 'root_tvc', 'root_interface_abi')
+ALL_FIELDS = AUTH_FIELDS + (
+    'wallet_abi', 'giver_abi', 'multisig_abi', 'wallet_tvc', 'giver_tvc', 'multisig_tvc')
+
+
+def cold_start(fields):
+    results = []
+    for _ in range(RUNS):
+        out = subprocess.run(
+            [sys.executable, '-c', WORKER.format(fields=fields)],
+            check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.splitlines()[-1]))
+    return (statistics.median(r['ms'] for r in results),
+            statistics.median(r['rss'] for r in results))
+
+
+def warm_config(fields):
+    from torauth import Config
+    Config()
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        config = Config()
+        for name in fields:
+            getattr(config, name)
+        config.client
+    return (time.perf_counter() - start) / REPEATS
+
+
+def main():
+    print(f'{"fields":>10} {"cold start":>11} {"max RSS":>9} {"next Config":>12}')
+    for name, fields in (('auth only', AUTH_FIELDS), ('all', ALL_FIELDS)):
+        ms, rss = cold_start(fields)
+        warm = warm_config(fields)
+        print(f'{name:>10} {ms:>9.1f}ms {rss / 1024:>7.1f}MB {warm * 1e6:>10.0f}us')
+
+
+if __name__ == '__main__':
+    main()
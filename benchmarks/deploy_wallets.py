@@ -0,0 +1,61 @@
+'''
+Wallets per second: `deploy_wallet` in a loop vs. `deploy_wallets` with worker pools
+of several sizes. A local mock client processes each message in LATENCY seconds
+(a credit and a deployment per wallet), so only the pipelining is measured.
+A giver with time-based replay protection takes one message at a time
+(GIVER_MAX_IN_FLIGHT=1), giverv2 takes as many as there are workers.
+
+Run: python -m benchmarks.deploy_wallets
+'''
+import time
+import asyncio
+
+from torauth import Config, deploy_wallet, deploy_wallets
+from torauth.mocks.LocalChain import LocalChain
+
+WALLETS = 200
+LATENCY = 0.02
+CONCURRENCY = (1, 10, 50, 200)
+
+
+def make_config(giver_max_in_flight):
+    config = Config()
+    config.giver_max_in_flight = giver_max_in_flight
+    config.client = LocalChain(
+        config.giver_address, latency=LATENCY,
+        time_replay_protection=giver_max_in_flight == 1)
+    return config
+
+
+async def serial(config, n):
+    for _ in range(n):
+        await deploy_wallet(config)
+
+
+async def pooled(config, n, concurrency):
+    async for _ in deploy_wallets(config, n, concurrency=concurrency):
+        pass
+
+
+async def measure(giver_max_in_flight, run, *args):
+    config = make_config(giver_max_in_flight)
+    start = time.perf_counter()
+    await run(config, WALLETS, *args)
+    elapsed = time.perf_counter() - start
+    return WALLETS / elapsed, config.client.max_in_flight, config.client.replay_conflicts
+
+
+async def main():
+    print(f'{WALLETS} wallets, {LATENCY * 1e3:.0f}ms per message')
+    print(f'{"giver":>9} {"mode":>12} {"wallets/sec":>12} {"in flight":>10} {"conflicts":>10}')
+    for giver in ('time', 'giverv2'):
+        rows = [('loop', serial, ())] + [
+            (f'pool of {c}', pooled, (c,)) for c in CONCURRENCY]
+        for mode, run, args in rows:
+            giver_max_in_flight = 1 if giver == 'time' else max(args or (1,))
+            rate, in_flight, conflicts = await measure(giver_max_in_flight, run, *args)
+            print(f'{giver:>9} {mode:>12} {rate:>12.1f} {in_flight:>10} {conflicts:>10}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
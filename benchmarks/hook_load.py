@@ -0,0 +1,94 @@
+'''
+Load test of `Authenticator.hook`: concurrent webhooks with valid signatures,
+for each way of running local verification. Reports hooks/sec and the event
+loop lag measured by a probe task while the load runs.
+
+Run: python -m benchmarks.hook_load
+'''
+import time
+import asyncio
+import hashlib
+import logging
+import statistics
+
+from nacl.signing import SigningKey
+
+from torauth import Authenticator, Config
+from torauth.Verifier import LocalVerifier, BatchVerifier
+
+SESSIONS = 5000
+CONCURRENCY = 200
+WORKERS = 4
+
+VERIFIERS = (
+    ('inline', lambda: LocalVerifier()),
+    ('thread', lambda: LocalVerifier('thread', WORKERS)),
+    ('process', lambda: LocalVerifier('process', WORKERS)),
+    ('thread, batch 32', lambda: BatchVerifier(32, 0.002, 'thread', WORKERS)),
+    ('process, batch 32', lambda: BatchVerifier(32, 0.002, 'process', WORKERS)),
+)
+
+
+async def run(make_verifier):
+    completed = 0
+
+    async def on_auth_callback(context, result, public_key=None, wallet_address=None):
+        nonlocal completed
+        assert result
+        completed += 1
+
+    auth = Authenticator(Config())
+    auth.verifier = make_verifier()
+    await auth.init(on_auth_callback)
+
+    key = SigningKey.generate()
+    public_key = key.verify_key.encode().hex()
+    await auth.start_authentication_many([
+        {'webhook_url': 'http://localhost/', 'pin': None, 'context': i, 'qr_format': 'link'}
+        for i in range(SESSIONS)
+    ])
+    hooks = []
+    for seq in list(auth.cache.store.data):
+        message = hashlib.sha256(seq.encode()).digest()
+        hooks.append({
+            'seq': seq,
+            'signed_message': key.sign(message).signature.hex(),
+            'public_key': public_key,
+            'wallet_address': '0:00'
+        })
+
+    lags = []
+    done = False
+
+    async def probe():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    async def worker(chunk):
+        for json in chunk:
+            await auth.hook(json)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(hooks[i::CONCURRENCY]) for i in range(CONCURRENCY)))
+    while completed < SESSIONS:
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    done = True
+    await probe_task
+    await auth.close()
+    return SESSIONS / elapsed, statistics.median(lags), max(lags)
+
+
+async def main():
+    logging.getLogger('torauth').setLevel(logging.WARNING)
+    print(f'{"verification":>18} {"hooks/sec":>10} {"lag p50":>9} {"lag max":>9}')
+    for name, make_verifier in VERIFIERS:
+        rate, lag_p50, lag_max = await run(make_verifier)
+        print(f'{name:>18} {rate:>10.0f} {lag_p50 * 1e3:>7.2f}ms {lag_max * 1e3:>7.2f}ms')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
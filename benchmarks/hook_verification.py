@@ -0,0 +1,40 @@
+'''
+Webhook signature verifications per second: TonClient core vs. local (hashlib + PyNaCl).
+
+Run: python -m benchmarks.hook_verification
+'''
+import time
+import asyncio
+
+from tonclient.types import ParamsOfNaclSign, ParamsOfHash
+
+from torauth import Config
+from torauth.Verifier import LocalVerifier, TonClientVerifier, LOCAL_ENGINE
+from torauth.utils import string_to_base64, hex_to_base64
+
+RUNS = 2000
+RAND = 'QX9YhgTB7ajSLSWR1zVcTeHNWkX3tdPN'
+PIN = '4352'
+
+
+async def main():
+    config = Config()
+    client = config.client
+    keys = await client.crypto.generate_random_sign_keys()
+    message_hash = (await client.crypto.sha256(params=ParamsOfHash(
+        data=string_to_base64(RAND + PIN)))).hash
+    signature = (await client.crypto.nacl_sign_detached(ParamsOfNaclSign(
+        unsigned=hex_to_base64(message_hash), secret=keys.secret + keys.public))).signature
+
+    print(f'{"verifier":>24} {"hooks/sec":>10}')
+    for name, verifier in (('tonclient', TonClientVerifier(client)),
+                           (f'local ({LOCAL_ENGINE})', LocalVerifier())):
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            assert await verifier.verify(
+                rand=RAND, pin=PIN, signed_message=signature, public_key=keys.public)
+        print(f'{name:>24} {RUNS / (time.perf_counter() - start):>10.0f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+'''
+Throughput of the on-chain authentication pipeline: a fake subscription feed
+pushes messages to the ROOT contract from another thread (as TonClient does),
+most of them not related to authorization, and consumers decode, verify
+and complete sessions. Reports messages/sec for different numbers of consumers.
+
+Run: python -m benchmarks.message_pipeline
+'''
+import time
+import random
+import asyncio
+import logging
+import threading
+
+from tonclient.types import ParamsOfEncodeMessageBody, ParamsOfNaclSign, CallSet, Signer
+
+from torauth import Authenticator, Config
+from torauth.MessageQueue import MessageQueue
+from torauth.utils import string_to_base64, base64_to_hex
+
+SESSIONS = 1000
+# Share of messages not related to authorization
+NOISE = 0.9
+WALLET_ADDRESS = '0:1a9af5ad556ad1d889a6963870fc46ccafaeb2382110a5f5c80730964408ce1f'
+WORKERS = (1, 4, 16)
+
+
+async def prove_ownership(config, keys, otp):
+    signed = (await config.client.crypto.nacl_sign(ParamsOfNaclSign(
+        unsigned=string_to_base64(otp),
+        secret=keys.secret + keys.public
+    ))).signed
+    return (await config.client.abi.encode_message_body(ParamsOfEncodeMessageBody(
+        abi=config.root_interface_abi,
+        call_set=CallSet('proveOwnership', input={'signedOTP': base64_to_hex(signed)}),
+        is_internal=True,
+        signer=Signer.NoSigner()
+    ))).body
+
+
+async def make_feed(auth, keys):
+    await auth.start_authentication_many([
+        {'webhook_url': 'http://localhost/', 'pin': None, 'context': i, 'qr_format': 'link'}
+        for i in range(SESSIONS)
+    ])
+    feed = []
+    for seq in list(auth.cache.store.data):
+        feed.append({
+            'src': WALLET_ADDRESS,
+            'body': await prove_ownership(auth.cfg, keys, seq)
+        })
+    # External messages and calls of other functions
+    noise = int(SESSIONS * NOISE / (1 - NOISE))
+    unrelated = await prove_ownership(auth.cfg, keys, 'x' * 32)
+    for i in range(noise):
+        if i % 2:
+            feed.append({'src': '', 'body': unrelated})
+        else:
+            feed.append({'src': WALLET_ADDRESS, 'body': 'te6ccgEBAQEAAgAAAA=='})
+    random.Random(1).shuffle(feed)
+    for i, message in enumerate(feed):
+        message['id'] = str(i)
+    return feed
+
+
+async def run(workers, keys):
+    completed = 0
+    all_completed = asyncio.get_running_loop().create_future()
+
+    async def on_auth_callback(context, result, public_key=None, wallet_address=None):
+        nonlocal completed
+        assert result
+        completed += 1
+        if completed == SESSIONS:
+            all_completed.set_result(None)
+
+    config = Config()
+    config.message_workers = workers
+    auth = Authenticator(config)
+    auth.wallet_keys[WALLET_ADDRESS] = [keys.public]
+    feed = await make_feed(auth, keys)
+    auth.messages = MessageQueue(len(feed))
+    await auth.init(on_auth_callback)
+
+    loop = asyncio.get_running_loop()
+
+    def subscription():
+        for message in feed:
+            auth.messages.put_threadsafe(message, loop)
+
+    start = time.perf_counter()
+    threading.Thread(target=subscription).start()
+    await all_completed
+    while len(auth.messages) > 0:
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    await auth.close()
+    return len(feed) / elapsed, auth.messages.dropped
+
+
+async def main():
+    logging.getLogger('torauth').setLevel(logging.WARNING)
+    keys = await Config().client.crypto.generate_random_sign_keys()
+    print(f'{SESSIONS} sessions, {NOISE:.0%} of messages are not related to authorization')
+    print(f'{"consumers":>10} {"messages/sec":>13} {"dropped":>8}')
+    for workers in WORKERS:
+        rate, dropped = await run(workers, keys)
+        print(f'{workers:>10} {rate:>13.0f} {dropped:>8}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+'''
+Cost of the instrumentation on the hot paths: `start_authentication` (link QR codes)
+and `Authenticator.hook` with inline local verification, without metrics,
+with in-memory metrics and with in-memory metrics and tracing.
+
+Run: python -m benchmarks.metrics_overhead
+'''
+import time
+import asyncio
+import hashlib
+import logging
+
+from nacl.signing import SigningKey
+
+from torauth import Authenticator, Config
+from torauth.metrics import Metrics
+from torauth.Verifier import LocalVerifier
+
+SESSIONS = 5000
+ROUNDS = 3
+
+SETUPS = (
+    ('disabled', lambda: None),
+    ('metrics', lambda: Metrics()),
+    ('metrics + tracing', lambda: Metrics(trace_capacity=10000)),
+)
+
+
+async def run(make_metrics):
+    completed = 0
+
+    async def on_auth_callback(context, result, public_key=None, wallet_address=None):
+        nonlocal completed
+        assert result
+        completed += 1
+
+    auth = Authenticator(Config(), make_metrics())
+    auth.verifier = LocalVerifier()
+    await auth.init(on_auth_callback)
+
+    start = time.perf_counter()
+    for i in range(SESSIONS):
+        await auth.start_authentication(
+            webhook_url='http://localhost/', pin=None, context=i, qr_format='link')
+    started = time.perf_counter() - start
+
+    key = SigningKey.generate()
+    public_key = key.verify_key.encode().hex()
+    hooks = [{
+        'seq': seq,
+        'signed_message': key.sign(hashlib.sha256(seq.encode()).digest()).signature.hex(),
+        'public_key': public_key,
+        'wallet_address': '0:00'
+    } for seq in list(auth.cache.store.data)]
+
+    start = time.perf_counter()
+    for json in hooks:
+        await auth.hook(json)
+    hooked = time.perf_counter() - start
+    while completed < SESSIONS:
+        await asyncio.sleep(0)
+    await auth.close()
+    return started / SESSIONS, hooked / SESSIONS
+
+
+async def main():
+    logging.getLogger('torauth').setLevel(logging.WARNING)
+    print(f'{"instrumentation":>20} {"start us":>9} {"hook us":>8}')
+    for name, make_metrics in SETUPS:
+        # The best of several rounds
+        timings = [await run(make_metrics) for _ in range(ROUNDS)]
+        started = min(timing[0] for timing in timings)
+        hooked = min(timing[1] for timing in timings)
+        print(f'{name:>20} {started * 1e6:>9.1f} {hooked * 1e6:>8.1f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+'''
+Overhead of serving many sites: one Authenticator per site against one Authenticator
+with a tenant per site. Each site starts sessions expiring within a few seconds.
+Reports memory allocated by Python objects after start, TonClient instances,
+subscriptions, background tasks and wake-ups of session expiration tasks.
+Memory of the TonClient native core (and its sockets) is not counted,
+it grows with the number of TonClient instances.
+
+Run: python -m benchmarks.multi_tenant
+'''
+import time
+import random
+import asyncio
+import logging
+import tracemalloc
+
+from torauth import Authenticator, Config
+
+TENANTS = (1, 50)
+SESSIONS = 20
+RETENTION_SEC = 2
+
+
+async def on_auth_callback(context, result, public_key=None, wallet_address=None):
+    pass
+
+
+def count_wakeups(auth, counter):
+    pop_expired = auth.cache.store.pop_expired
+
+    def counting(now):
+        counter[0] += 1
+        return pop_expired(now)
+
+    auth.cache.store.pop_expired = counting
+
+
+async def start_sessions(auth, tenant, rnd):
+    for i in range(SESSIONS):
+        await auth.start_authentication(
+            webhook_url='http://localhost/', pin=None, context=i,
+            retention_sec=rnd.uniform(0.5, RETENTION_SEC), qr_format='link', tenant=tenant)
+
+
+async def separate(n, rnd, wakeups):
+    auths = []
+    for _ in range(n):
+        auth = Authenticator(Config())
+        count_wakeups(auth, wakeups)
+        await auth.init(on_auth_callback)
+        auths.append(auth)
+    for auth in auths:
+        await start_sessions(auth, None, rnd)
+    return auths
+
+
+async def shared(n, rnd, wakeups):
+    config = Config()
+    auth = Authenticator(config)
+    for i in range(1, n):
+        keys = await config.client.crypto.generate_random_sign_keys()
+        auth.add_tenant(f'site{i}', keys.public, keys.secret)
+    count_wakeups(auth, wakeups)
+    await auth.init(on_auth_callback)
+    for tenant in auth.tenants:
+        await start_sessions(auth, tenant, rnd)
+    return [auth]
+
+
+async def run(setup, n):
+    rnd = random.Random(1)
+    wakeups = [0]
+    tasks_before = len(asyncio.all_tasks())
+    tracemalloc.start()
+    start = time.perf_counter()
+    auths = await setup(n, rnd, wakeups)
+    started = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tasks = len(asyncio.all_tasks()) - tasks_before
+    clients = len({id(auth.cfg.client) for auth in auths})
+
+    while sum(len(auth.cache) for auth in auths) > 0:
+        await asyncio.sleep(0.05)
+    for auth in auths:
+        await auth.close()
+    # Let the cancelled tasks finish
+    await asyncio.sleep(0.1)
+    return started, memory, clients, len(auths), tasks, wakeups[0]
+
+
+async def main():
+    logging.getLogger('torauth').setLevel(logging.WARNING)
+    print(f'{SESSIONS} sessions per site, expiring within {RETENTION_SEC}s')
+    print(f'{"sites":>5} {"mode":>9} {"start":>8} {"memory":>9} {"clients":>8} '
+          f'{"subscr.":>8} {"tasks":>6} {"wake-ups":>9}')
+    for n in TENANTS:
+        for name, setup in (('separate', separate), ('shared', shared)):
+            started, memory, clients, subscriptions, tasks, wakeups = await run(setup, n)
+            print(f'{n:>5} {name:>9} {started * 1e3:>6.0f}ms {memory / 1024:>7.0f}KB '
+                  f'{clients:>8} {subscriptions:>8} {tasks:>6} {wakeups:>9}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+'''
+Size and CPU time of a QR code in each output format.
+
+Run: python -m benchmarks.qr_formats
+'''
+import os
+import time
+import base64
+
+from torauth.gen_qr_code import gen_qr_code, QR_PNG, QR_SVG, QR_MATRIX, QR_LINK
+
+RUNS = 200
+
+params = {
+    'deep_link_url': 'https://ton-surf-stand-dev.firebaseapp.com/signing_proof/',
+    'webhook_url': 'https://example.com/torauth/hook'
+}
+
+
+def main():
+    print(f'{"format":>8} {"bytes":>8} {"ms/code":>10}')
+    for qr_format in (QR_PNG, QR_SVG, QR_MATRIX, QR_LINK):
+        size = 0
+        start = time.process_time()
+        for _ in range(RUNS):
+            rand = base64.b64encode(os.urandom(24)).decode()
+            code = gen_qr_code(seq=rand, rand=rand, qr_format=qr_format, **params)
+            size += len(code)
+        elapsed = time.process_time() - start
+        print(f'{qr_format:>8} {size // RUNS:>8} {elapsed / RUNS * 1e3:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+'''
+Latency of webhook handling while QR codes are being rendered,
+inline, in the default thread pool and in a pool of worker processes.
+
+Run: python -m benchmarks.qr_rendering_latency
+'''
+import time
+import asyncio
+import logging
+import statistics
+
+import aiohttp
+from aiohttp import web
+
+from torauth import Authenticator, Config
+from torauth.QrRenderer import QrRenderer
+
+MODES = (('inline', 0), ('thread', 0), ('process', 2), ('process', 4))
+RENDERERS = 8      # concurrent start_authentication loops
+DURATION = 5
+PROBE_INTERVAL = 0.01
+
+
+async def on_auth_callback(context, result, public_key=None, wallet_address=None):
+    pass
+
+
+async def run(executor, workers):
+    auth = Authenticator(Config())
+    auth.renderer = QrRenderer(workers, executor=executor)
+    await auth.init(on_auth_callback)
+
+    async def hook_handler(request):
+        await auth.hook(await request.json())
+        return web.Response(text='OK')
+
+    runner = web.ServerRunner(web.Server(hook_handler))
+    await runner.setup()
+    site = web.TCPSite(runner, 'localhost', 0)
+    await site.start()
+    url = 'http://localhost:{}/'.format(site._server.sockets[0].getsockname()[1])
+
+    # The probe session exists, but the signature is wrong:
+    # the hook runs the whole verification and fails
+    await auth.start_authentication(
+        webhook_url=url, pin=None, context='probe', retention_sec=3600)
+    seq = next(iter(auth.cache.store.data))
+    probe = {'seq': seq, 'signed_message': '00' * 64,
+             'public_key': '00' * 32, 'wallet_address': '0:00'}
+
+    stop = time.time() + DURATION
+    rendered = 0
+
+    async def render_load():
+        nonlocal rendered
+        while time.time() < stop:
+            await auth.start_authentication(
+                webhook_url=url, pin=None, context='load', retention_sec=3600)
+            rendered += 1
+            await asyncio.sleep(0)
+
+    latencies = []
+    load = [asyncio.create_task(render_load()) for _ in range(RENDERERS)]
+    async with aiohttp.ClientSession() as session:
+        while time.time() < stop:
+            start = time.perf_counter()
+            async with session.post(url, json=probe) as response:
+                await response.read()
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(PROBE_INTERVAL)
+    await asyncio.gather(*load)
+
+    await auth.close()
+    await runner.cleanup()
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return rendered / DURATION, quantiles[49], quantiles[98], max(latencies)
+
+
+async def main():
+    # Probe verification failures are expected
+    logging.getLogger('torauth').setLevel(logging.CRITICAL)
+    print(f'{"executor":>10} {"QR/sec":>8} {"hook p50":>10} {"hook p99":>10} {"hook max":>10}')
+    for executor, workers in MODES:
+        rate, p50, p99, worst = await run(executor, workers)
+        name = f'{executor} {workers}' if workers else executor
+        print(f'{name:>10} {rate:>8.0f} {p50 * 1e3:>8.1f}ms '
+              f'{p99 * 1e3:>8.1f}ms {worst * 1e3:>8.1f}ms')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
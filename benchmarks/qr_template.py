@@ -0,0 +1,62 @@
+'''
+QR codes per second: full `qrcode` encoding with PIL rendering (the former
+`gen_qr_code`) vs. template-cached rendering, with the full and the compact deep link.
+
+Run: python -m benchmarks.qr_template
+'''
+import io
+import os
+import time
+import base64
+
+import qrcode
+
+from torauth.gen_qr_code import gen_qr_code, qr_template, QR_PNG, QR_MATRIX
+
+RUNS = 200
+DEEP_LINK_URL = 'https://ton-surf-stand-dev.firebaseapp.com/signing_proof/'
+WEBHOOK_URL = 'https://example.com/torauth/hook'
+
+
+def full_encoding(deep_link_url, seq, rand, webhook_url):
+    # Former implementation of `gen_qr_code`
+    qr = qrcode.QRCode(
+        version=1,
+        border=4,
+        box_size=10,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+    )
+    qr.add_data(deep_link_url + ','.join([rand, seq, webhook_url]))
+    qr.make(fit=True)
+    img = qr.make_image(fill_color='black', back_color='white')
+    stream = io.BytesIO()
+    img.save(stream, 'PNG')
+    return base64.b64encode(stream.getvalue()).decode('utf-8')
+
+
+def rate(render, **kwargs):
+    randoms = [base64.b64encode(os.urandom(24)).decode() for _ in range(RUNS)]
+    start = time.perf_counter()
+    for rand in randoms:
+        render(deep_link_url=DEEP_LINK_URL, seq=rand, rand=rand, webhook_url=WEBHOOK_URL, **kwargs)
+    return RUNS / (time.perf_counter() - start)
+
+
+def main():
+    rand = base64.b64encode(os.urandom(24)).decode()
+    print(f'{"":>28} {"QR/sec":>8} {"version":>8}')
+    print(f'{"qrcode + PIL":>28} {rate(full_encoding):>8.0f}')
+    for compact in (False, True):
+        # First call builds the template
+        gen_qr_code(DEEP_LINK_URL, rand, rand, WEBHOOK_URL, compact=compact)
+        variable = len(rand) + (1 if compact else len(rand) + 1)
+        version = qr_template(
+            DEEP_LINK_URL.encode(), (',' + WEBHOOK_URL).encode(), variable, 1, 'L', 10, 4).version
+        for qr_format in (QR_PNG, QR_MATRIX):
+            name = f'template {qr_format}{" compact" if compact else ""}'
+            print(f'{name:>28} {rate(gen_qr_code, qr_format=qr_format, compact=compact):>8.0f} '
+                  f'{version:>8}')
+
+
+if __name__ == '__main__':
+    main()
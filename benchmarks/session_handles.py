@@ -0,0 +1,72 @@
+'''
+"Wait for login" at high concurrency: every session has a waiting long-poll request,
+results are delivered either by the global callback to a map of futures keyed by context
+(a task per callback) or by `start_session` handles (waiters are woken up directly).
+Reports the time from the first webhook until every waiter has its result.
+
+Run: python -m benchmarks.session_handles
+'''
+import time
+import asyncio
+import hashlib
+import logging
+
+from nacl.signing import SigningKey
+
+from torauth import Authenticator, Config
+from torauth.Verifier import LocalVerifier
+
+SESSIONS = 10000
+
+
+async def run(use_handles):
+    futures = {}
+
+    async def on_auth_callback(context, result, public_key=None, wallet_address=None):
+        futures[context].set_result(result)
+
+    auth = Authenticator(Config())
+    auth.verifier = LocalVerifier()
+    await auth.init(None if use_handles else on_auth_callback)
+
+    waiters = []
+    for i in range(SESSIONS):
+        if use_handles:
+            session = await auth.start_session(
+                webhook_url='http://localhost/', pin=None, context=i, qr_format='link')
+            waiters.append(asyncio.ensure_future(session.wait()))
+        else:
+            await auth.start_authentication(
+                webhook_url='http://localhost/', pin=None, context=i, qr_format='link')
+            futures[i] = asyncio.get_running_loop().create_future()
+            waiters.append(futures[i])
+
+    key = SigningKey.generate()
+    public_key = key.verify_key.encode().hex()
+    hooks = [{
+        'seq': seq,
+        'signed_message': key.sign(hashlib.sha256(seq.encode()).digest()).signature.hex(),
+        'public_key': public_key,
+        'wallet_address': '0:00'
+    } for seq in list(auth.cache.store.data)]
+
+    start = time.perf_counter()
+    for json in hooks:
+        await auth.hook(json)
+    results = await asyncio.gather(*waiters)
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    await auth.close()
+    return elapsed
+
+
+async def main():
+    logging.getLogger('torauth').setLevel(logging.WARNING)
+    print(f'{"delivery":>20} {"results/sec":>12}')
+    for name, use_handles in (('callback + futures', False), ('session handles', True)):
+        elapsed = min([await run(use_handles) for _ in range(3)])
+        print(f'{name:>20} {SESSIONS / elapsed:>12.0f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
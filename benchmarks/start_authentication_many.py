@@ -0,0 +1,45 @@
+'''
+Sessions per second: `start_authentication` in a loop vs. `start_authentication_many`.
+
+Run: python -m benchmarks.start_authentication_many
+'''
+import time
+import asyncio
+
+from torauth import Authenticator, Config
+
+WEBHOOK_URL = 'http://localhost:8080/test'
+BATCHES = (10, 100, 1000)
+
+
+def make_requests(n):
+    return [
+        {'webhook_url': WEBHOOK_URL, 'pin': None, 'context': i, 'retention_sec': 3600}
+        for i in range(n)
+    ]
+
+
+async def single(auth, requests):
+    for request in requests:
+        await auth.start_authentication(**request)
+
+
+async def many(auth, requests):
+    await auth.start_authentication_many(requests)
+
+
+async def main():
+    auth = Authenticator(Config())
+    print(f'{"sessions":>10} {"loop, s/sec":>14} {"many, s/sec":>14}')
+    for n in BATCHES:
+        rates = []
+        for run in (single, many):
+            requests = make_requests(n)
+            start = time.perf_counter()
+            await run(auth, requests)
+            rates.append(n / (time.perf_counter() - start))
+        print(f'{n:>10} {rates[0]:>14.0f} {rates[1]:>14.0f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
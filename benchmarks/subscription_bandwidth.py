@@ -0,0 +1,184 @@
+'''
+Bandwidth of the ROOT contract message subscription per matched authorization
+for different server-side filters and projections. The server is emulated
+on a message feed: each message passing the filter is delivered as JSON
+with the requested fields only.
+
+The feed is synthetic by default: management (external) messages, transfers,
+calls of other functions and delayed messages around proveOwnership calls.
+A feed of real messages to the ROOT contract can be recorded and used instead:
+
+Run: python -m benchmarks.subscription_bandwidth [feed.jsonl]
+     python -m benchmarks.subscription_bandwidth --record feed.jsonl [count]
+'''
+import os
+import sys
+import json
+import time
+import base64
+import random
+import asyncio
+import logging
+
+from tonclient.types import ParamsOfEncodeMessageBody, ParamsOfSubscribeCollection, \
+    CallSet, Signer, SubscriptionResponseType
+
+from torauth import Authenticator, Config
+from torauth.utils import body_function_id
+
+FIELDS = 'id src dst msg_type created_at body boc'
+AUTHS = 1000
+MAX_AGE_SEC = 3600
+
+# Subscription settings: (internal only, max age, result)
+SETTINGS = (
+    (False, 0, 'src id boc'),
+    (True, 0, 'src id boc'),
+    (True, 0, 'id src body'),
+    (True, MAX_AGE_SEC, 'id src body'),
+)
+
+
+def cell_boc(data: bytes) -> str:
+    ''' BOC of one cell without references '''
+    cell = bytes([0, 2 * len(data)]) + data
+    header = b'\xb5\xee\x9c\x72' + bytes([0x01, 2, 1, 1, 0, 0, len(cell), 0])
+    return base64.b64encode(header + cell).decode()
+
+
+def random_message(rnd, body_size):
+    # Message header (addresses, value, fees, timestamps) is about 100 bytes
+    return base64.b64encode(rnd.randbytes(100 + body_size)).decode()
+
+
+async def synthetic_feed(config, root_address):
+    rnd = random.Random(1)
+    now = int(time.time())
+    auth_body = (await config.client.abi.encode_message_body(ParamsOfEncodeMessageBody(
+        abi=config.root_interface_abi,
+        call_set=CallSet('proveOwnership', input={'signedOTP': '00' * 96}),
+        is_internal=True,
+        signer=Signer.NoSigner()
+    ))).body
+
+    feed = []
+    for i in range(AUTHS * 10):
+        wallet = '0:' + rnd.randbytes(32).hex()
+        kind = rnd.random()
+        created_at = now - rnd.randint(0, 60)
+        if kind < 0.1:
+            msg_type, src, body = 0, wallet, auth_body
+        elif kind < 0.4:
+            # ROOT contract management, signed by the ROOT keys
+            msg_type, src, body = 1, '', cell_boc(rnd.randbytes(120))
+        elif kind < 0.7:
+            # Plain transfers
+            msg_type, src, body = 0, wallet, None
+        elif kind < 0.9:
+            # Calls of other functions, bounced messages
+            msg_type, src, body = 0, wallet, cell_boc(rnd.randbytes(40))
+        else:
+            # Delayed messages
+            msg_type, src, body = 0, wallet, cell_boc(rnd.randbytes(40))
+            created_at -= 2 * MAX_AGE_SEC
+        body_size = 0 if body is None else len(base64.b64decode(body))
+        feed.append({
+            'id': rnd.randbytes(32).hex(),
+            'src': src,
+            'dst': root_address,
+            'msg_type': msg_type,
+            'created_at': created_at,
+            'body': body,
+            'boc': random_message(rnd, body_size),
+        })
+    return feed
+
+
+def matches(message, message_filter):
+    for field, condition in message_filter.items():
+        for op, value in condition.items():
+            actual = message[field]
+            if op == 'eq' and actual != value:
+                return False
+            if op == 'ge' and actual < value:
+                return False
+    return True
+
+
+def delivered_bytes(feed, message_filter, result, auth_id):
+    fields = result.split()
+    total = 0
+    delivered = 0
+    auths = 0
+    for message in feed:
+        if not matches(message, message_filter):
+            continue
+        delivered += 1
+        total += len(json.dumps({'result': {f: message[f] for f in fields}}))
+        if message['body'] is not None and body_function_id(message['body']) == auth_id:
+            auths += 1
+    return delivered, total, auths
+
+
+async def record(path, count):
+    config = Config()
+    auth = Authenticator(config)
+    root_address = await auth.get_root_address()
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    with open(path, 'w') as fp:
+        recorded = 0
+
+        def save_message(response_data, response_type, *args):
+            nonlocal recorded
+            if response_type == SubscriptionResponseType.OK and recorded < count:
+                fp.write(json.dumps(response_data['result']) + '\n')
+                recorded += 1
+                if recorded == count:
+                    loop.call_soon_threadsafe(done.set_result, None)
+
+        subscription = await config.client.net.subscribe_collection(
+            params=ParamsOfSubscribeCollection(
+                collection='messages',
+                result=FIELDS,
+                filter={'dst': {'eq': root_address}}
+            ),
+            callback=save_message
+        )
+        await done
+        await config.client.net.unsubscribe(params=subscription)
+
+
+async def main():
+    logging.getLogger('torauth').setLevel(logging.WARNING)
+    if len(sys.argv) > 2 and sys.argv[1] == '--record':
+        count = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+        await record(sys.argv[2], count)
+        return
+
+    config = Config()
+    auth = Authenticator(config)
+    root_address = await auth.get_root_address()
+    if len(sys.argv) > 1 and os.path.isfile(sys.argv[1]):
+        with open(sys.argv[1]) as fp:
+            feed = [json.loads(line) for line in fp]
+        print(f'Recorded feed, {len(feed)} messages')
+    else:
+        feed = await synthetic_feed(config, root_address)
+        print(f'Synthetic feed, {len(feed)} messages')
+    auth_id = await auth._function_id('proveOwnership')
+
+    print(f'{"internal":>8} {"max age":>8} {"result":>12} {"messages":>9} '
+          f'{"KB":>8} {"bytes/auth":>11}')
+    for internal_only, max_age, result in SETTINGS:
+        config.message_internal_only = internal_only
+        config.message_max_age_sec = max_age
+        delivered, total, auths = delivered_bytes(
+            feed, auth.message_filter(root_address), result, auth_id)
+        per_auth = total / auths if auths else float('nan')
+        print(f'{str(internal_only):>8} {max_age:>8} {result:>12} {delivered:>9} '
+              f'{total / 1024:>8.0f} {per_auth:>11.0f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+'''
+Throughput (per CPU second) and latency of webhook signature verification under bursts,
+depending on the micro-batch size.
+
+Run: python -m benchmarks.verify_batching
+'''
+import time
+import asyncio
+import hashlib
+import statistics
+
+from nacl.signing import SigningKey
+
+from torauth.Verifier import LocalVerifier, BatchVerifier
+
+BURSTS = 20
+BURST_SIZE = 250
+BURST_INTERVAL = 0.05
+BATCH_SIZES = (1, 8, 32, 128)
+WINDOW = 0.002
+
+
+async def run(verifier, requests):
+    latencies = []
+
+    async def hook(request):
+        start = time.perf_counter()
+        assert await verifier.verify(*request)
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    cpu = time.process_time()
+    for burst in range(BURSTS):
+        for request in requests[burst * BURST_SIZE:(burst + 1) * BURST_SIZE]:
+            tasks.append(asyncio.create_task(hook(request)))
+        await asyncio.sleep(BURST_INTERVAL)
+    await asyncio.gather(*tasks)
+    cpu = time.process_time() - cpu
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return len(latencies) / cpu, quantiles[49], quantiles[98]
+
+
+async def main():
+    key = SigningKey.generate()
+    public_key = key.verify_key.encode().hex()
+    requests = []
+    for i in range(BURSTS * BURST_SIZE):
+        rand = f'{i:032}'
+        message = hashlib.sha256((rand + '4352').encode()).digest()
+        requests.append((rand, '4352', key.sign(message).signature.hex(), public_key))
+
+    print(f'{"batch":>6} {"hooks/cpu sec":>14} {"p50":>9} {"p99":>9}')
+    for batch_size in BATCH_SIZES:
+        if batch_size == 1:
+            verifier = LocalVerifier()
+        else:
+            verifier = BatchVerifier(batch_size, WINDOW)
+        rate, p50, p99 = await run(verifier, requests)
+        print(f'{batch_size:>6} {rate:>14.0f} {p50 * 1e3:>7.2f}ms {p99 * 1e3:>7.2f}ms')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+import asyncio
+import hashlib
+from unittest import IsolatedAsyncioTestCase
+
+from nacl.signing import SigningKey
+
+from torauth.Verifier import BatchVerifier, LocalVerifier
+
+RAND = 'QX9YhgTB7ajSLSWR1zVcTeHNWkX3tdPN'
+PIN = '4352'
+
+key = SigningKey.generate()
+public_key = key.verify_key.encode().hex()
+
+
+def sign(rand, pin):
+    message = hashlib.sha256((rand + pin).encode()).digest()
+    return key.sign(message).signature.hex()
+
+
+class BatchVerifierTest(IsolatedAsyncioTestCase):
+
+    async def test_batch(self):
+        verifier = BatchVerifier(batch_size=4, window=10)
+        signature = sign(RAND, PIN)
+        # The batch is full, it is verified without waiting for the window
+        results = await asyncio.wait_for(asyncio.gather(
+            verifier.verify(RAND, PIN, signature, public_key),
+            verifier.verify(RAND, '0000', signature, public_key),
+            verifier.verify(RAND, PIN, 'not a hex string', public_key),
+            verifier.verify(RAND, PIN, '00' * 64, public_key),
+            return_exceptions=True
+        ), 1)
+        self.assertEqual(results[0], True)
+        self.assertEqual(results[1], False)
+        # Only the caller with a malformed signature gets an error
+        self.assertIsInstance(results[2], ValueError)
+        self.assertEqual(results[3], False)
+
+    async def test_window(self):
+        verifier = BatchVerifier(batch_size=100, window=0.01)
+        results = await asyncio.wait_for(asyncio.gather(*(
+            verifier.verify(str(i), PIN, sign(str(i), PIN), public_key) for i in range(10)
+        )), 1)
+        self.assertEqual(results, [True] * 10)
+
+    async def test_executors(self):
+        signature = sign(RAND, PIN)
+        for executor in ('thread', 'process'):
+            for verifier in (LocalVerifier(executor, 2), BatchVerifier(4, 0.01, executor, 2)):
+                try:
+                    results = await asyncio.wait_for(asyncio.gather(
+                        verifier.verify(RAND, PIN, signature, public_key),
+                        verifier.verify(RAND, '0000', signature, public_key),
+                        verifier.verify(RAND, PIN, 'not a hex string', public_key),
+                        return_exceptions=True
+                    ), 10)
+                finally:
+                    verifier.close()
+                self.assertEqual(results[:2], [True, False])
+                self.assertIsInstance(results[2], ValueError)
@@ -1,3 +1,4 @@
+import time
 import asyncio
 from unittest import TestCase, IsolatedAsyncioTestCase
 from torauth.Cache import Cache
@@ -46,3 +47,31 @@ class TestCache_2(IsolatedAsyncioTestCase):
         x = cache.get('1')
         self.assertEqual(x['context'], {'a': 'rec1'})
         self.assertEqual(x['webhook_url'], 'https://ex.com/1')
+
+
+class TestCache_3(TestCase):
+
+    def test_expiry_order(self):
+        cache = Cache()
+        cache.add(seq='a', webhook_url='https://ex.com/a', pin=None, retention_sec=0.2,
+                  rand='a', context='a')
+        cache.add(seq='b', webhook_url='https://ex.com/b', pin=None, retention_sec=0.1,
+                  rand='b', context='b')
+        cache.add(seq='c', webhook_url='https://ex.com/c', pin=None, retention_sec=60,
+                  rand='c', context='c')
+        cache.add(seq='d', webhook_url='https://ex.com/d', pin=None, retention_sec=0.1,
+                  rand='d', context='d')
+        cache.remove('d')
+
+        self.assertEqual(cache.clean_obsolete(), [])
+        self.assertEqual(cache.next_deadline(), cache.get('b')['timestamp'] + 0.1)
+
+        time.sleep(0.3)
+
+        # Removed entries are not reported, the rest come in deadline order
+        self.assertEqual(cache.clean_obsolete(), ['b', 'a'])
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.next_deadline(), cache.get('c')['timestamp'] + 60)
+
+        cache.remove('c')
+        self.assertEqual(cache.next_deadline(), None)
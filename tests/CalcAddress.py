@@ -0,0 +1,73 @@
+import os
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+
+from tonclient.types import DeploySet, KeyPair, Signer
+
+from torauth import Config
+from torauth.utils import calc_address, address_cache, AddressCache
+
+config = Config()
+
+
+class CountingClient:
+    ''' Counts encodings made by TonClient '''
+
+    def __init__(self, client):
+        self.client = client
+        self.abi = self
+        self.encodings = 0
+
+    async def encode_message(self, params):
+        self.encodings += 1
+        return await self.client.abi.encode_message(params=params)
+
+
+class CalcAddress(IsolatedAsyncioTestCase):
+    '''
+    Addresses are calculated once for the same ABI, code and public key
+    '''
+    def setUp(self):
+        address_cache.clear()
+        self.client = CountingClient(config.client)
+
+    async def calc(self, public, tvc=None, **kwargs):
+        return await calc_address(
+            client=self.client,
+            abi=config.root_abi,
+            signer=Signer.Keys(KeyPair(public=public, secret='00' * 32)),
+            deploy_set=DeploySet(tvc=tvc or config.root_tvc),
+            **kwargs)
+
+    async def test_memoize(self):
+        first = await self.calc(config.root_public)
+        self.assertEqual(await self.calc(config.root_public), first)
+        self.assertEqual(self.client.encodings, 1)
+        self.assertEqual((address_cache.hits, address_cache.misses), (1, 1))
+
+        # Any input changes the address
+        self.assertNotEqual(await self.calc('11' * 32), first)
+        await self.calc(config.root_public, tvc=config.wallet_tvc)
+        self.assertEqual(self.client.encodings, 3)
+
+        self.assertEqual(await self.calc(config.root_public, use_cache=False), first)
+        self.assertEqual(self.client.encodings, 4)
+        self.assertEqual(address_cache.hits, 1)
+
+    async def test_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'addresses.json')
+            address_cache.persist_to(path)
+            try:
+                address = await self.calc(config.root_public)
+            finally:
+                address_cache.path = None
+
+            # After restart
+            cache = AddressCache(path)
+            key = AddressCache.key(
+                config.root_abi,
+                Signer.Keys(KeyPair(public=config.root_public, secret='')),
+                DeploySet(tvc=config.root_tvc))
+            self.assertEqual(cache.get(key), address)
+            self.assertEqual(cache.hits, 1)
@@ -1,5 +1,7 @@
 import os
+import shutil
 import logging
+import tempfile
 import unittest
 
 from torauth import Config
@@ -13,3 +15,27 @@ class ConfigFromFile(unittest.TestCase):
 
         config = Config(env_file)
         self.assertEqual(config.root_initial_value, '123')
+
+    def test_shared(self):
+        # Files are read on the first access, once for all Config instances,
+        # and TonClient is shared
+        first, second = Config(), Config()
+        self.assertNotIn('root_tvc', first.__dict__)
+        self.assertIs(first.root_tvc, second.root_tvc)
+        self.assertIs(first.root_abi, second.root_abi)
+        self.assertIs(first.client, second.client)
+
+    def test_file_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'root.tvc')
+            shutil.copy(Config()._paths['ROOT_TVC'], path)
+            os.environ['ROOT_TVC'] = path
+            try:
+                before = Config().root_tvc
+                with open(path, 'ab') as fp:
+                    fp.write(b'\0\0\0')
+                os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+                after = Config().root_tvc
+            finally:
+                del os.environ['ROOT_TVC']
+        self.assertNotEqual(before, after)
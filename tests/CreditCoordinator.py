@@ -0,0 +1,68 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from tonclient.errors import TonException
+
+from torauth import Config, deploy_wallets
+from torauth.mocks.LocalChain import LocalChain
+from torauth.utils import credit, credit_coordinator, credit_params
+
+
+class CreditCoordinator(IsolatedAsyncioTestCase):
+    '''
+    Credits of the giver do not conflict: they are queued, sent one at a time
+    and combined for the same address
+    '''
+    def setUp(self):
+        self.config = Config()
+        self.chain = LocalChain(self.config.giver_address, latency=0.01)
+        self.config.client = self.chain
+
+    async def test_stand_in(self):
+        # Concurrent giver messages are rejected, as by a real giver
+        results = await asyncio.gather(
+            self.chain.process_message(credit_params(self.config, '0:01', 1)),
+            self.chain.process_message(credit_params(self.config, '0:02', 1)),
+            return_exceptions=True)
+        self.assertIsInstance(results[1], TonException)
+        self.assertEqual(self.chain.replay_conflicts, 1)
+
+    async def test_queue(self):
+        addresses = [f'0:{i:064x}' for i in range(20)]
+        await asyncio.gather(*(credit(self.config, address, 5) for address in addresses))
+
+        self.assertEqual(self.chain.replay_conflicts, 0)
+        self.assertEqual(self.chain.giver_messages, 20)
+        self.assertEqual(self.chain.balances, {address: 5 for address in addresses})
+        coordinator = credit_coordinator(self.config)
+        self.assertEqual((coordinator.requests, coordinator.messages), (20, 20))
+
+    async def test_combine(self):
+        first = credit(self.config, '0:01', 1)
+        # Waiting while the first message is processed
+        await asyncio.gather(*(credit(self.config, '0:02', 2) for _ in range(5)))
+        await first
+
+        self.assertEqual(self.chain.giver_messages, 2)
+        self.assertEqual(self.chain.balances, {'0:01': 1, '0:02': 10})
+
+    async def test_error(self):
+        process_message = self.chain.process_message
+
+        async def failing(params):
+            if params.message_encode_params.call_set.input['dest'] == '0:01':
+                raise RuntimeError('Giver is frozen')
+            return await process_message(params)
+        self.chain.processing = type('Processing', (), {'process_message': staticmethod(failing)})
+
+        results = await asyncio.gather(
+            credit(self.config, '0:01', 1), credit(self.config, '0:02', 1),
+            return_exceptions=True)
+        self.assertIsInstance(results[0], RuntimeError)
+        self.assertIsNone(results[1])
+        self.assertEqual(self.chain.balances, {'0:02': 1})
+
+    async def test_deploy_wallets(self):
+        wallets = [w async for w in deploy_wallets(self.config, 20, concurrency=10)]
+        self.assertEqual(len(wallets), 20)
+        self.assertEqual(self.chain.replay_conflicts, 0)
@@ -1,5 +1,3 @@
-from functools import wraps, partial
-import asyncio
 import os
 import logging
 from unittest import IsolatedAsyncioTestCase
@@ -17,21 +15,8 @@ keys_filename = os.path.join(
 )
 
 
-def async_wrap(func):
-    @wraps(func)
-    async def run(*args, loop=None, executor=None, **kwargs):
-        if loop is None:
-            loop = asyncio.get_event_loop()
-        pfunc = partial(func, *args, **kwargs)
-        return await loop.run_in_executor(executor, pfunc)
-    return run
-
-
-cb = async_wrap(debot)
-
-
 class Debot(IsolatedAsyncioTestCase):
     async def test_send_message(self):
-        result = await cb(debot_address, wallet_address, keys_filename, one_time_password)
+        result = await debot(debot_address, wallet_address, keys_filename, one_time_password)
         print(result)
         self.assertEqual(result, True)
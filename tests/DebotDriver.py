@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+
+from torauth.mocks.debot import debot, DebotPool, DebotError, DebotExited
+
+FAKE_CLI = os.path.join(os.path.dirname(__file__), 'fake_tonos_cli.py')
+KEYS_FILENAME = os.path.join(os.path.dirname(__file__), 'test_keys.txt')
+DEBOT_ADDRESS = '0:a4543b20e0b169a7d3edb354d0aa45bc0ada23d357104ade368efde09099ec0e'
+WALLET_ADDRESS = '0:1a9af5ad556ad1d889a6963870fc46ccafaeb2382110a5f5c80730964408ce1f'
+
+
+class DebotDriver(IsolatedAsyncioTestCase):
+    '''
+    DeBot sessions are driven by prompts, time out and are reused by a pool
+    '''
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.tmp.name, 'messages.log')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def cli(self, *options):
+        return [sys.executable, FAKE_CLI, '--log', self.log, *options]
+
+    def sent(self):
+        if not os.path.isfile(self.log):
+            return []
+        with open(self.log) as fp:
+            return fp.read().splitlines()
+
+    async def test_sign(self):
+        self.assertTrue(await debot(
+            DEBOT_ADDRESS, WALLET_ADDRESS, KEYS_FILENAME, '1111', cli=self.cli()))
+        self.assertEqual(self.sent(), [f'{WALLET_ADDRESS} 1111'])
+
+        self.assertFalse(await debot(
+            DEBOT_ADDRESS, '0:bad', KEYS_FILENAME, '2222', cli=self.cli()))
+        self.assertEqual(len(self.sent()), 1)
+
+    async def test_timeout(self):
+        start = time.perf_counter()
+        with self.assertRaises(DebotError):
+            await debot(DEBOT_ADDRESS, WALLET_ADDRESS, KEYS_FILENAME, '1111',
+                        cli=self.cli('--hang'), timeout=0.5)
+        self.assertLess(time.perf_counter() - start, 5)
+
+    async def test_pool(self):
+        pool = DebotPool(DEBOT_ADDRESS, size=4, cli=self.cli('--delay', '0.05'))
+        try:
+            results = await asyncio.gather(*(
+                pool.sign(WALLET_ADDRESS, KEYS_FILENAME, str(i)) for i in range(20)))
+        finally:
+            await pool.close()
+        self.assertEqual(results, [True] * 20)
+        self.assertEqual(sorted(self.sent()), sorted(f'{WALLET_ADDRESS} {i}' for i in range(20)))
+        # Sessions are reused
+        self.assertEqual(pool.started, 4)
+
+    async def test_pool_restarts_sessions(self):
+        pool = DebotPool(DEBOT_ADDRESS, size=2, cli=self.cli('--once'))
+        try:
+            for i in range(3):
+                self.assertTrue(await pool.sign(WALLET_ADDRESS, KEYS_FILENAME, str(i)))
+        finally:
+            await pool.close()
+        self.assertEqual(pool.started, 3)
+        self.assertEqual(len(self.sent()), 3)
+
+    async def test_pool_does_not_resend(self):
+        # A session exiting after the transaction is sent is not replaced for a retry
+        pool = DebotPool(DEBOT_ADDRESS, size=1, cli=self.cli('--crash', '2'))
+        try:
+            self.assertTrue(await pool.sign(WALLET_ADDRESS, KEYS_FILENAME, '1'))
+            with self.assertRaises(DebotExited):
+                await pool.sign(WALLET_ADDRESS, KEYS_FILENAME, '2')
+        finally:
+            await pool.close()
+        self.assertEqual(pool.started, 1)
+        self.assertEqual(pool.idle, [])
+
+    async def test_pool_stops_reusing_idle_sessions(self):
+        # A DeBot sitting idle after a signing is replaced quickly, and not reused again
+        pool = DebotPool(DEBOT_ADDRESS, size=1, cli=self.cli('--idle'), reuse_timeout=0.3)
+        start = time.perf_counter()
+        try:
+            for i in range(3):
+                self.assertTrue(await pool.sign(WALLET_ADDRESS, KEYS_FILENAME, str(i)))
+        finally:
+            await pool.close()
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertFalse(pool.reuse)
+        self.assertEqual(pool.started, 3)
+        self.assertEqual(pool.idle, [])
+        self.assertEqual(len(self.sent()), 3)
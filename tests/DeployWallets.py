@@ -0,0 +1,64 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from torauth import Config, deploy_wallets
+from torauth.mocks.LocalChain import LocalChain
+
+
+class DeployWallets(IsolatedAsyncioTestCase):
+    '''
+    Wallets are deployed by a bounded pool and returned as they are deployed
+    '''
+    def setUp(self):
+        self.config = Config()
+        # Giver credits are not the bottleneck
+        self.config.giver_max_in_flight = 5
+        self.chain = LocalChain(
+            self.config.giver_address, latency=0.01, time_replay_protection=False)
+        self.config.client = self.chain
+
+    async def test_deploy(self):
+        generate_random_sign_keys = self.chain.generate_random_sign_keys
+        deployed_before_keys = []
+
+        async def generate_keys():
+            deployed_before_keys.append(len(self.chain.deployed))
+            return await generate_random_sign_keys()
+
+        self.chain.generate_random_sign_keys = generate_keys
+        wallets = [w async for w in deploy_wallets(self.config, 25, concurrency=5)]
+        # All keys are generated before the first deployment
+        self.assertEqual(deployed_before_keys, [0] * 25)
+
+        addresses = {address for address, _, _ in wallets}
+        self.assertEqual(len(addresses), 25)
+        self.assertEqual(addresses, self.chain.deployed)
+        for address in addresses:
+            self.assertEqual(self.chain.balances[address], int(self.config.multisig_initial_value))
+        # Credit and deployment of each wallet
+        self.assertEqual(self.chain.messages, 50)
+        self.assertEqual(self.chain.max_in_flight, 5)
+
+    async def test_stream(self):
+        wallets = deploy_wallets(self.config, 100, concurrency=4)
+        await wallets.__anext__()
+        self.assertLess(len(self.chain.deployed), 10)
+
+        # Closing cancels the deployments in progress
+        await wallets.aclose()
+        deployed = len(self.chain.deployed)
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(self.chain.deployed), deployed)
+        self.assertEqual(self.chain.in_flight, 0)
+
+    async def test_error(self):
+        async def failing(params):
+            raise RuntimeError('Giver is empty')
+        self.chain.processing = type('Processing', (), {'process_message': staticmethod(failing)})
+
+        with self.assertRaises(RuntimeError):
+            async for _ in deploy_wallets(self.config, 10, concurrency=3):
+                pass
+
+    async def test_empty(self):
+        self.assertEqual([w async for w in deploy_wallets(self.config, 0)], [])
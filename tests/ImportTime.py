@@ -0,0 +1,62 @@
+import os
+import sys
+import subprocess
+from unittest import TestCase
+
+# Imported with the first use only
+DEFERRED = (
+    'qrcode', 'PIL', 'aiohttp', 'dotenv', 'nacl', 'cryptography', 'sqlite3',
+    'multiprocessing', 'tonclient.client', 'torauth.stores.RedisStore',
+)
+# Time of `from torauth import Authenticator` with all the modules it imports,
+# generous for slow CI machines
+MAX_IMPORT_MS = 300
+
+
+def import_times(statement):
+    '''
+    :return: {module: (self us, cumulative us)} reported by `python -X importtime`
+    '''
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        check=True, capture_output=True, text=True, env=os.environ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def imported_modules(statement):
+    '''
+    :return: names in `sys.modules` after the statement, in a fresh interpreter
+    '''
+    stdout = subprocess.run(
+        [sys.executable, '-c', f'{statement}\nimport sys\nprint(*sys.modules, sep="\\n")'],
+        check=True, capture_output=True, text=True, env=os.environ).stdout
+    return set(stdout.split())
+
+
+class ImportTime(TestCase):
+    '''
+    `from torauth import Authenticator` takes less than MAX_IMPORT_MS: it does not
+    import QR, HTTP, storage or crypto libraries until they are needed
+    '''
+    def test_authenticator(self):
+        # Modules loaded on startup of the interpreter (by site, sitecustomize) don't count
+        modules = imported_modules('from torauth import Authenticator') - imported_modules('pass')
+        for module in DEFERRED:
+            self.assertNotIn(module, modules)
+        self.assertIn('torauth.Authenticator', modules)
+
+        # The cumulative time of the package includes everything imported with it
+        times = import_times('from torauth import Authenticator')
+        self.assertLess(times['torauth'][1] / 1e3, MAX_IMPORT_MS)
+
+    def test_first_use(self):
+        times = import_times(
+            'import torauth.stores; torauth.stores.SQLiteStore')
+        self.assertIn('sqlite3', times)
+        self.assertNotIn('torauth.stores.RedisStore', times)
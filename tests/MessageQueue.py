@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import tracemalloc
+from unittest import IsolatedAsyncioTestCase
+
+from torauth.MessageQueue import MessageQueue, DROP_OLDEST, DROP_NEWEST, BLOCK
+
+
+class MessageQueueTest(IsolatedAsyncioTestCase):
+
+    async def test_drop_oldest(self):
+        queue = MessageQueue(3, DROP_OLDEST)
+        for i in range(5):
+            self.assertTrue(queue.put_nowait(i))
+        self.assertEqual([queue.get_nowait() for _ in range(3)], [2, 3, 4])
+        self.assertEqual((queue.dropped, queue.processed), (2, 3))
+
+    async def test_drop_newest(self):
+        queue = MessageQueue(3, DROP_NEWEST)
+        results = [queue.put_nowait(i) for i in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual([queue.get_nowait() for _ in range(3)], [0, 1, 2])
+        self.assertEqual((queue.dropped, queue.processed), (2, 3))
+
+    async def test_block(self):
+        queue = MessageQueue(2, BLOCK)
+        await queue.put(0)
+        await queue.put(1)
+        with self.assertRaises(asyncio.QueueFull):
+            queue.put_nowait(2)
+
+        producer = asyncio.create_task(queue.put(2))
+        await asyncio.sleep(0.01)
+        self.assertFalse(producer.done())
+        self.assertEqual(await queue.get(), 0)
+        await asyncio.wait_for(producer, 1)
+        self.assertEqual([await queue.get(), await queue.get()], [1, 2])
+        self.assertEqual(queue.dropped, 0)
+
+    async def test_consumer_waits(self):
+        queue = MessageQueue(10)
+        consumer = asyncio.create_task(queue.get())
+        await asyncio.sleep(0.01)
+        self.assertFalse(consumer.done())
+        queue.put_nowait('message')
+        self.assertEqual(await asyncio.wait_for(consumer, 1), 'message')
+
+    async def test_threadsafe(self):
+        loop = asyncio.get_running_loop()
+        # With the BLOCK policy items wait for free slots in the event loop
+        for queue in (MessageQueue(1000, DROP_OLDEST), MessageQueue(10, BLOCK)):
+            received = []
+
+            async def consume():
+                while len(received) < 100:
+                    received.append(await queue.get())
+
+            consumer = asyncio.create_task(consume())
+            thread = threading.Thread(
+                target=lambda: [queue.put_threadsafe(i, loop) for i in range(100)])
+            thread.start()
+            await asyncio.wait_for(consumer, 5)
+            thread.join()
+            self.assertEqual(received, list(range(100)))
+            self.assertEqual(queue.dropped, 0)
+
+    async def test_threadsafe_in_loop(self):
+        # Items put from the loop thread wait for a free slot in the order of arrival
+        loop = asyncio.get_running_loop()
+        queue = MessageQueue(1, BLOCK)
+        for i in range(3):
+            queue.put_threadsafe(i, loop)
+        self.assertEqual((len(queue), len(queue._pending)), (1, 2))
+        self.assertEqual([await queue.get() for _ in range(3)], [0, 1, 2])
+        self.assertEqual(len(queue._pending), 0)
+
+    async def test_threadsafe_does_not_block(self):
+        # The producer thread is not held up by a full queue, it is asked to stop instead
+        loop = asyncio.get_running_loop()
+        queue = MessageQueue(2, BLOCK)
+        events = []
+        queue.on_blocked = lambda: events.append('blocked')
+        queue.on_unblocked = lambda: events.append('unblocked')
+        thread = threading.Thread(
+            target=lambda: [queue.put_threadsafe(i, loop) for i in range(5)])
+        thread.start()
+        await asyncio.to_thread(thread.join, 1)
+        self.assertFalse(thread.is_alive())
+        await asyncio.sleep(0.01)
+        self.assertEqual(events, ['blocked'])
+        self.assertEqual([await queue.get() for _ in range(5)], list(range(5)))
+        self.assertEqual(events, ['blocked', 'unblocked'])
+        self.assertEqual(queue.dropped, 0)
+
+    async def test_soak(self):
+        # Memory stays flat under a flood of messages much larger than the capacity
+        queue = MessageQueue(1000, DROP_OLDEST)
+        boc = 'te6ccgEBAQEAAgAAAA==' * 50
+
+        def flood(start, count):
+            for i in range(start, start + count):
+                queue.put_nowait({'id': f'{i:064x}', 'src': '0:' + '0' * 64, 'boc': boc + str(i)})
+
+        tracemalloc.start()
+        flood(0, 10000)
+        warm = tracemalloc.get_traced_memory()[0]
+        flood(10000, 200000)
+        flooded = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        self.assertEqual(len(queue), 1000)
+        self.assertEqual(queue.dropped, 209000)
+        self.assertLess(flooded - warm, 100 * 1024)
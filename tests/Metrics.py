@@ -0,0 +1,185 @@
+import asyncio
+from unittest import TestCase, IsolatedAsyncioTestCase, skipUnless
+
+from torauth import Authenticator, Config
+from torauth.metrics import Metrics as MetricsRegistry, NULL_SPAN
+from tests.Verifier import sign
+
+WEBHOOK_URL = 'http://localhost:8080/test'
+
+try:
+    import opentelemetry.sdk
+except ImportError:
+    opentelemetry = None
+
+config = Config()
+config.verify_engine = 'tonclient'
+
+
+class Metrics(TestCase):
+    '''
+    Counters, histograms and gauges are exported in the Prometheus text format
+    '''
+    def test_prometheus_text(self):
+        metrics = MetricsRegistry(buckets=(0.01, 0.1))
+        metrics.inc('callbacks_total', result='true')
+        metrics.inc('callbacks_total', 2, result='false')
+        for value in (0.005, 0.05, 0.5):
+            metrics.observe('hook_seconds', value, result='verified')
+        metrics.gauge('sessions_live', lambda: 7)
+        metrics.inc('sessions_started_total', tenant='say "hi"\n')
+
+        self.assertEqual(metrics.value('callbacks_total', result='false'), 2)
+        self.assertEqual(metrics.value('hook_seconds', result='verified'), 3)
+        self.assertEqual(metrics.value('sessions_live'), 7)
+        self.assertEqual(metrics.prometheus_text().splitlines(), [
+            '# TYPE torauth_callbacks_total counter',
+            'torauth_callbacks_total{result="false"} 2',
+            'torauth_callbacks_total{result="true"} 1',
+            '# TYPE torauth_sessions_started_total counter',
+            'torauth_sessions_started_total{tenant="say \\"hi\\"\\n"} 1',
+            '# TYPE torauth_hook_seconds histogram',
+            'torauth_hook_seconds_bucket{result="verified",le="0.01"} 1',
+            'torauth_hook_seconds_bucket{result="verified",le="0.1"} 2',
+            'torauth_hook_seconds_bucket{result="verified",le="+Inf"} 3',
+            'torauth_hook_seconds_sum{result="verified"} 0.555',
+            'torauth_hook_seconds_count{result="verified"} 3',
+            '# TYPE torauth_sessions_live gauge',
+            'torauth_sessions_live 7',
+        ])
+
+    def test_spans(self):
+        self.assertIs(MetricsRegistry().span('hook'), NULL_SPAN)
+
+        metrics = MetricsRegistry(trace_capacity=2)
+        with metrics.span('hook', tenant='shop') as span:
+            span.set_attribute('result', 'verified')
+        with self.assertRaises(ValueError):
+            with metrics.span('start_authentication'):
+                raise ValueError('bad tenant')
+        with metrics.span('hook'):
+            pass
+
+        self.assertEqual([span.name for span in metrics.spans], ['start_authentication', 'hook'])
+        self.assertIn('bad tenant', metrics.spans[0].error)
+        self.assertGreaterEqual(metrics.spans[1].duration, 0)
+
+
+class AuthenticatorMetrics(IsolatedAsyncioTestCase):
+    '''
+    Authenticator measures its stages if metrics are passed
+    '''
+    async def asyncSetUp(self):
+        self.metrics = MetricsRegistry(trace_capacity=100)
+        self.auth = Authenticator(config, self.metrics)
+        self.results = []
+
+        async def on_auth_callback(
+                context: str, result: bool, public_key: str = None, wallet_address: str = None):
+            self.results.append((context, result))
+
+        await self.auth.init(on_auth_callback)
+
+    async def test_hook(self):
+        auth, metrics = self.auth, self.metrics
+        for context, qr_format in (('good', 'link'), ('bad', 'png'), ('expired', 'link')):
+            await auth.start_authentication(
+                webhook_url=WEBHOOK_URL, pin='1234', context=context, qr_format=qr_format,
+                retention_sec=1 if context == 'expired' else 60)
+        self.assertEqual(metrics.value('sessions_started_total', tenant=None), 3)
+        self.assertEqual(metrics.value('qr_render_seconds', format='link'), 2)
+        self.assertEqual(metrics.value('qr_render_seconds', format='png'), 1)
+        self.assertEqual(metrics.value('sessions_live'), 3)
+
+        sessions = {session['context']: session for session in auth.cache.store.data.values()}
+        keys = await config.client.crypto.generate_random_sign_keys()
+        other_keys = await config.client.crypto.generate_random_sign_keys()
+        for context, signer in (('good', keys), ('bad', other_keys)):
+            seq = sessions[context]['rand']
+            await auth.hook({
+                'seq': seq,
+                'public_key': keys.public,
+                'wallet_address': '0:' + '0' * 64,
+                'signed_message': await sign(signer, seq, '1234')
+            })
+        await auth.hook({'seq': 'unknown'})
+        await asyncio.sleep(1.2)
+
+        self.assertEqual(sorted(self.results), [('bad', False), ('expired', False), ('good', True)])
+        self.assertEqual(metrics.value('hook_seconds', result='verified'), 1)
+        self.assertEqual(metrics.value('hook_seconds', result='error'), 1)
+        self.assertEqual(metrics.value('hook_seconds', result='unknown'), 1)
+        self.assertEqual(metrics.value('verify_stage_seconds', stage='sha256'), 2)
+        self.assertEqual(metrics.value('verify_stage_seconds', stage='nacl_sign_open'), 1)
+        self.assertEqual(metrics.value('verify_seconds', engine='TonClientVerifier'), 1)
+        self.assertEqual(metrics.value('callbacks_total', tenant=None, result='false'), 2)
+        self.assertEqual(metrics.value('sessions_expired_total', tenant=None), 1)
+        self.assertEqual(metrics.value('sessions_live'), 1)
+        self.assertEqual(
+            [span.attributes.get('result') for span in metrics.spans if span.name == 'hook'],
+            ['verified', 'error', 'unknown'])
+
+        text = metrics.prometheus_text()
+        self.assertIn('torauth_sessions_live 1\n', text)
+        self.assertIn('torauth_message_queue_size 0\n', text)
+
+    async def test_start_many(self):
+        auth, metrics = self.auth, self.metrics
+        requests = [
+            {'webhook_url': WEBHOOK_URL, 'pin': None, 'context': i, 'qr_format': 'link'}
+            for i in range(3)
+        ]
+        # A batch with an unknown tenant is rejected as a whole and not counted
+        with self.assertRaises(ValueError):
+            await auth.start_authentication_many(requests[:2] + [{**requests[2], 'tenant': 'x'}])
+        self.assertEqual(metrics.value('sessions_started_total', tenant=None), 0)
+
+        await auth.start_authentication_many(requests)
+        self.assertEqual(metrics.value('sessions_started_total', tenant=None), 3)
+        self.assertEqual(
+            [(span.name, span.attributes) for span in metrics.spans],
+            [('start_authentication_many', {'sessions': 3})])
+
+    async def asyncTearDown(self):
+        await self.auth.close()
+
+
+@skipUnless(opentelemetry, 'opentelemetry-sdk is not installed')
+class OpenTelemetryAdapter(IsolatedAsyncioTestCase):
+    '''
+    OpenTelemetry instruments and spans receive the same measurements
+    '''
+    async def test_start_authentication(self):
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        from torauth.metrics import OpenTelemetryMetrics
+
+        reader = InMemoryMetricReader()
+        exporter = InMemorySpanExporter()
+        tracer_provider = TracerProvider()
+        tracer_provider.add_span_processor(SimpleSpanProcessor(exporter))
+        metrics = OpenTelemetryMetrics(
+            MeterProvider(metric_readers=[reader]).get_meter('test'),
+            tracer_provider.get_tracer('test'))
+
+        auth = Authenticator(config, metrics)
+        for _ in range(2):
+            await auth.start_authentication(
+                webhook_url=WEBHOOK_URL, pin=None, context=None, qr_format='link')
+
+        points = {
+            metric.name: metric.data.data_points
+            for resource_metrics in reader.get_metrics_data().resource_metrics
+            for scope_metrics in resource_metrics.scope_metrics
+            for metric in scope_metrics.metrics
+        }
+        self.assertEqual(points['torauth.sessions_started_total'][0].value, 2)
+        self.assertEqual(points['torauth.qr_render_seconds'][0].count, 2)
+        self.assertEqual(points['torauth.qr_render_seconds'][0].attributes, {'format': 'link'})
+        self.assertEqual(points['torauth.sessions_live'][0].value, 2)
+        self.assertEqual(
+            [span.name for span in exporter.get_finished_spans()],
+            ['torauth.start_authentication'] * 2)
@@ -0,0 +1,109 @@
+import os
+import asyncio
+import hashlib
+import logging
+from unittest import IsolatedAsyncioTestCase
+
+from nacl.signing import SigningKey
+
+from torauth import Authenticator, Config
+from tests.OnChainAuth import prove_ownership, WALLET_ADDRESS
+
+WEBHOOK_URL = 'http://localhost:8080/test'
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', 'INFO'))
+
+config = Config()
+
+
+class MultiTenant(IsolatedAsyncioTestCase):
+    '''
+    One Authenticator serves several sites, each session is completed
+    by the callback of its site
+    '''
+    async def asyncSetUp(self):
+        self.results = {'default': {}, 'a': {}}
+
+        def make_callback(tenant):
+            async def on_auth_callback(
+                    context: str, result: bool,  public_key: str = None, wallet_address: str = None):
+                self.results[tenant][context] = result
+            return on_auth_callback
+
+        self.auth = Authenticator(config)
+        for tenant in ('a', 'b'):
+            keys = await config.client.crypto.generate_random_sign_keys()
+            self.auth.add_tenant(
+                tenant, keys.public, keys.secret,
+                callback=make_callback('a') if tenant == 'a' else None)
+        await self.auth.init(make_callback('default'))
+
+    async def wait_for(self, tenant, count):
+        for _ in range(300):
+            if len(self.results[tenant]) >= count:
+                return
+            await asyncio.sleep(0.01)
+
+    async def test_routing(self):
+        auth = self.auth
+        addresses = {t: await auth.get_root_address(t) for t in (None, 'a', 'b')}
+        self.assertEqual(len(set(addresses.values())), 3)
+        self.assertEqual(
+            auth.message_filter(*addresses.values())['dst'], {'in': list(addresses.values())})
+        self.assertIn('dst', auth._subscription.result.split())
+
+        await auth.start_authentication_many([
+            {'webhook_url': WEBHOOK_URL, 'pin': None, 'context': context,
+             'tenant': tenant, 'qr_format': 'link'}
+            for context, tenant in (
+                ('hook_a', 'a'), ('hook_b', 'b'), ('chain_a', 'a'), ('pending_a', 'a'))
+        ])
+        sessions = {e['context']: (seq, e) for seq, e in auth.cache.store.data.items()}
+        self.assertEqual(sessions['hook_b'][1]['tenant'], 'b')
+
+        # Webhooks
+        key = SigningKey.generate()
+        for context in ('hook_a', 'hook_b'):
+            seq = sessions[context][0]
+            await auth.hook({
+                'seq': seq,
+                'signed_message': key.sign(hashlib.sha256(seq.encode()).digest()).signature.hex(),
+                'public_key': key.verify_key.encode().hex(),
+                'wallet_address': WALLET_ADDRESS
+            })
+
+        # On-chain, first sent to the ROOT contract of another site
+        keys = await config.client.crypto.generate_random_sign_keys()
+        auth.wallet_keys[WALLET_ADDRESS] = [keys.public]
+        body = await prove_ownership(keys, sessions['chain_a'][0])
+        for tenant in ('b', 'a'):
+            auth.messages.put_nowait({
+                'id': tenant, 'src': WALLET_ADDRESS, 'dst': addresses[tenant], 'body': body})
+
+        await self.wait_for('a', 2)
+        await self.wait_for('default', 1)
+        self.assertEqual(self.results['a'], {'hook_a': True, 'chain_a': True})
+        self.assertEqual(self.results['default'], {'hook_b': True})
+        self.assertEqual(len(auth.cache), 1)
+
+    async def test_expiry(self):
+        await self.auth.start_authentication(
+            webhook_url=WEBHOOK_URL, pin=None, context='expired_a', retention_sec=0.1,
+            qr_format='link', tenant='a')
+        await self.auth.start_authentication(
+            webhook_url=WEBHOOK_URL, pin=None, context='expired', retention_sec=0.1,
+            qr_format='link')
+        await self.wait_for('a', 1)
+        await self.wait_for('default', 1)
+        self.assertEqual(self.results['a'], {'expired_a': False})
+        self.assertEqual(self.results['default'], {'expired': False})
+
+    async def test_unknown_tenant(self):
+        with self.assertRaises(ValueError):
+            await self.auth.start_authentication(
+                webhook_url=WEBHOOK_URL, pin=None, context='x', tenant='c')
+        with self.assertRaises(RuntimeError):
+            self.auth.add_tenant('c', '00' * 32, '00' * 32)
+
+    async def asyncTearDown(self):
+        await self.auth.close()
@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+import tempfile
+import asyncio
+import logging
+from unittest import IsolatedAsyncioTestCase
+
+from tonclient.types import ParamsOfEncodeMessageBody, ParamsOfNaclSign, CallSet, Signer
+
+from torauth import Authenticator, Config
+from torauth.mocks.Surf import Surf, debot_address, tmpfiles
+from torauth.mocks.debot import DebotPool
+from torauth.utils import string_to_base64, base64_to_hex
+
+WEBHOOK_URL = 'http://localhost:8080/test'
+WALLET_ADDRESS = '0:1a9af5ad556ad1d889a6963870fc46ccafaeb2382110a5f5c80730964408ce1f'
+FAKE_CLI = os.path.join(os.path.dirname(__file__), 'fake_tonos_cli.py')
+PIN = '4352'
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', 'INFO'))
+
+config = Config()
+auth = Authenticator(config)
+
+
+async def prove_ownership(keys, otp):
+    ''' Body of the message the DeBot sends to the ROOT contract '''
+    signed = (await config.client.crypto.nacl_sign(ParamsOfNaclSign(
+        unsigned=string_to_base64(otp),
+        secret=keys.secret + keys.public
+    ))).signed
+    return (await config.client.abi.encode_message_body(ParamsOfEncodeMessageBody(
+        abi=config.root_interface_abi,
+        call_set=CallSet('proveOwnership', input={'signedOTP': base64_to_hex(signed)}),
+        is_internal=True,
+        signer=Signer.NoSigner()
+    ))).body
+
+
+class OnChainAuth(IsolatedAsyncioTestCase):
+    '''
+    Users signing the random value through the DeBot are authenticated
+    by the messages to the ROOT contract
+    '''
+    async def test_prove_ownership(self):
+        results = {}
+
+        async def on_auth_callback(
+                context: str, result: bool,  public_key: str = None, wallet_address: str = None):
+            results[context] = (result, public_key, wallet_address)
+
+        keys = await config.client.crypto.generate_random_sign_keys()
+        other_keys = await config.client.crypto.generate_random_sign_keys()
+        # Custodians are read from the wallet account, unless they are known
+        auth.wallet_keys[WALLET_ADDRESS] = [other_keys.public, keys.public]
+        await auth.init(on_auth_callback)
+
+        await auth.start_authentication_many([
+            {'webhook_url': WEBHOOK_URL, 'pin': pin, 'context': context, 'qr_format': 'link'}
+            for context, pin in (('ok', PIN), ('wrong_pin', PIN), ('forged', None))
+        ])
+        rands = {
+            entry['context']: entry['rand'] for entry in auth.cache.store.data.values()
+        }
+        stranger = await config.client.crypto.generate_random_sign_keys()
+
+        messages = [
+            # Not related to authorization
+            {'id': '1', 'src': '', 'body': await prove_ownership(keys, rands['ok'] + PIN)},
+            {'id': '2', 'src': WALLET_ADDRESS, 'body': 'te6ccgEBAQEAAgAAAA=='},
+            {'id': '3', 'src': WALLET_ADDRESS, 'body': await prove_ownership(keys, 'unknown')},
+            # Authorization
+            {'id': '4', 'src': WALLET_ADDRESS, 'body': await prove_ownership(keys, rands['ok'] + PIN)},
+            {'id': '5', 'src': WALLET_ADDRESS, 'body': await prove_ownership(keys, rands['wrong_pin'])},
+            {'id': '6', 'src': WALLET_ADDRESS, 'body': await prove_ownership(stranger, rands['forged'])},
+        ]
+        for message in messages:
+            auth.messages.put_nowait(message)
+
+        while len(results) < 3:
+            await asyncio.sleep(0.01)
+        self.assertEqual(results['ok'], (True, keys.public, WALLET_ADDRESS))
+        self.assertEqual(results['wrong_pin'], (False, None, None))
+        self.assertEqual(results['forged'], (False, None, None))
+        self.assertEqual(len(auth.cache), 2)
+        self.assertEqual(len(auth.messages), 0)
+
+    async def test_surf_pin(self):
+        # Surf passes the pin to the DeBot, which sends the signed random value and the pin
+        results = {}
+
+        async def on_auth_callback(
+                context: str, result: bool,  public_key: str = None, wallet_address: str = None):
+            results[context] = result
+
+        keys = await config.client.crypto.generate_random_sign_keys()
+        auth.wallet_keys[WALLET_ADDRESS] = [keys.public]
+        await auth.init(on_auth_callback)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            log = os.path.join(tmp, 'messages.log')
+            pool = DebotPool(debot_address, size=1, cli=[sys.executable, FAKE_CLI, '--log', log])
+            surf = Surf(config, WALLET_ADDRESS, keys.public, keys.secret, debot_pool=pool)
+            try:
+                for context, pin in (('pin', PIN), ('no_pin', None)):
+                    qr_code = await auth.start_authentication(
+                        webhook_url=WEBHOOK_URL, pin=pin, context=context, qr_format='link')
+                    await surf.sign(qr_code, pin)
+            finally:
+                await pool.close()
+                os.remove(os.path.join(
+                    os.path.dirname(sys.modules[Surf.__module__].__file__),
+                    tmpfiles.format(WALLET_ADDRESS)))
+            with open(log) as fp:
+                sent = [line.split()[1] for line in fp.read().splitlines()]
+
+        # The DeBot stand-in does not sign, the message is made as the real one makes it
+        for otp in sent:
+            auth.messages.put_nowait(
+                {'id': otp, 'src': WALLET_ADDRESS, 'body': await prove_ownership(keys, otp)})
+        while len(results) < 2:
+            await asyncio.sleep(0.01)
+        self.assertEqual(results, {'pin': True, 'no_pin': True})
+        self.assertTrue(sent[0].endswith(PIN))
+
+    async def test_message_filter(self):
+        root_address = await auth.get_root_address()
+        self.assertEqual(auth.message_filter(root_address), {
+            'dst': {'eq': root_address},
+            'msg_type': {'eq': 0}
+        })
+        config.message_max_age_sec = 3600
+        try:
+            created_at = auth.message_filter(root_address)['created_at']['ge']
+        finally:
+            config.message_max_age_sec = 0
+        self.assertAlmostEqual(created_at, time.time() - 3600, delta=2)
+
+    async def test_close_cancels_tasks(self):
+        # Cancellation of the background tasks is not swallowed
+        await auth.init()
+        tasks = [auth._task] + auth._message_tasks
+        await asyncio.sleep(0.01)
+        await auth.close()
+        await asyncio.wait(tasks, timeout=1)
+        self.assertTrue(all(task.cancelled() for task in tasks))
+
+    async def asyncTearDown(self):
+        await auth.close()
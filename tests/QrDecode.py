@@ -0,0 +1,89 @@
+import io
+import base64
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+import qrcode
+from aiohttp import web
+
+from torauth import Config
+from torauth.Verifier import verify_signature
+from torauth.gen_qr_code import gen_qr_code, QR_PNG, QR_SVG, QR_MATRIX, QR_LINK
+from torauth.mocks.Surf import Surf
+from torauth.mocks.decode_qr import decode_qr
+
+config = Config()
+
+params = {
+    'deep_link_url': 'https://link_to_the_surf_page_for_signing_proof/',
+    'seq': 'seq',
+    'rand': 'rand',
+    'webhook_url': 'http://localhost:8080/test'
+}
+link = 'https://link_to_the_surf_page_for_signing_proof/rand,seq,http://localhost:8080/test'
+WALLET_ADDRESS = '0:1a9af5ad556ad1d889a6963870fc46ccafaeb2382110a5f5c80730964408ce1f'
+
+
+class QrDecode(TestCase):
+    '''
+    QR codes of all formats are decoded offline
+    '''
+    def test_formats(self):
+        for qr_format in (QR_PNG, QR_SVG, QR_MATRIX, QR_LINK):
+            for error_correction in ('L', 'M', 'Q', 'H'):
+                for version in (1, 10):
+                    qr_code = gen_qr_code(
+                        qr_format=qr_format, error_correction=error_correction,
+                        version=version, box_size=3, border=2, **params)
+                    self.assertEqual(decode_qr(qr_code), link)
+
+    def test_compact(self):
+        compact = dict(params, seq='rand')
+        for qr_format in (QR_PNG, QR_SVG, QR_MATRIX):
+            self.assertEqual(
+                decode_qr(gen_qr_code(qr_format=qr_format, compact=True, **compact)),
+                gen_qr_code(qr_format=QR_LINK, compact=True, **compact))
+
+    def test_other_generators(self):
+        # PIL images of `qrcode`, with numeric and alphanumeric segments
+        for data in ('0123456789012', 'HELLO WORLD 123', link * 3):
+            for mode in ('1', 'RGB'):
+                image = io.BytesIO()
+                qrcode.make(data).convert(mode).save(image, format='PNG')
+                self.assertEqual(decode_qr(base64.b64encode(image.getvalue()).decode()), data)
+
+
+class SurfWebhook(IsolatedAsyncioTestCase):
+    '''
+    Surf mock signs a QR code and calls the webhook without network access
+    '''
+    async def asyncSetUp(self):
+        self.received = []
+
+        async def hook_handler(request):
+            self.received.append(await request.json())
+            return web.Response(text='OK')
+
+        self.runner = web.ServerRunner(web.Server(hook_handler))
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, 'localhost', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.webhook_url = f'http://localhost:{port}/test'
+
+    async def test_sign(self):
+        keys = await config.client.crypto.generate_random_sign_keys()
+        surf = Surf(config, WALLET_ADDRESS, keys.public, keys.secret, callback_type='webhook')
+        for qr_format in (QR_PNG, QR_LINK):
+            qr_code = gen_qr_code(
+                deep_link_url=config.deep_link_url, seq='seq', rand='rand',
+                webhook_url=self.webhook_url, qr_format=qr_format)
+            await surf.sign(qr_code, '1234')
+
+        self.assertEqual(len(self.received), 2)
+        for data in self.received:
+            self.assertEqual(data['seq'], 'seq')
+            self.assertEqual(data['wallet_address'], WALLET_ADDRESS)
+            self.assertTrue(verify_signature('rand', '1234', data['signed_message'], keys.public))
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
@@ -0,0 +1,80 @@
+import base64
+from unittest import TestCase
+
+import qrcode
+
+from qrcode.util import QRData, MODE_8BIT_BYTE
+
+from torauth.gen_qr_code import gen_qr_code, qr_template, \
+    QR_PNG, QR_SVG, QR_MATRIX, QR_LINK, ERROR_CORRECTION
+
+params = {
+    'deep_link_url': 'https://link_to_the_surf_page_for_signing_proof/',
+    'seq': 'seq',
+    'rand': 'rand',
+    'webhook_url': 'http://localhost:8080/test'
+}
+link = 'https://link_to_the_surf_page_for_signing_proof/rand,seq,http://localhost:8080/test'
+
+
+class QrFormats(TestCase):
+
+    def test_png(self):
+        self.assertEqual(gen_qr_code(**params), gen_qr_code(qr_format=QR_PNG, **params))
+        self.assertTrue(base64.b64decode(gen_qr_code(**params)).startswith(b'\x89PNG'))
+
+    def test_link(self):
+        self.assertEqual(gen_qr_code(qr_format=QR_LINK, **params), link)
+
+    def test_template(self):
+        # The same QR code as built by `qrcode` with the same version and mask
+        for error_correction in ('L', 'M', 'Q', 'H'):
+            for version in (1, 10):
+                template = qr_template(
+                    params['deep_link_url'].encode(), b',' + params['webhook_url'].encode(),
+                    len('rand,seq'), version, error_correction, 10, 4)
+                qr = qrcode.QRCode(
+                    version=template.version,
+                    error_correction=ERROR_CORRECTION[error_correction],
+                    mask_pattern=template.mask_pattern)
+                qr.add_data(QRData(link, mode=MODE_8BIT_BYTE))
+                qr.make(fit=False)
+                self.assertEqual(template.modules(b'rand,seq'), qr.modules)
+
+    def test_compact(self):
+        compact = dict(params, seq='rand', compact=True)
+        self.assertEqual(
+            gen_qr_code(qr_format=QR_LINK, **compact),
+            'https://link_to_the_surf_page_for_signing_proof/rand,,http://localhost:8080/test')
+        with self.assertRaises(ValueError):
+            gen_qr_code(qr_format=QR_LINK, **dict(compact, seq='seq'))
+
+    def test_matrix(self):
+        template = qr_template(
+            params['deep_link_url'].encode(), b',' + params['webhook_url'].encode(),
+            len('rand,seq'), 1, 'L', 10, 4)
+        qr = qrcode.QRCode(
+            error_correction=qrcode.constants.ERROR_CORRECT_L, mask_pattern=template.mask_pattern)
+        qr.add_data(QRData(link, mode=MODE_8BIT_BYTE))
+        qr.make(fit=True)
+
+        matrix = gen_qr_code(qr_format=QR_MATRIX, **params)
+        size = matrix[0]
+        self.assertEqual(size, len(qr.modules))
+        bits = int.from_bytes(matrix[1:], 'big') >> (-size * size % 8)
+        for y in range(size):
+            for x in range(size):
+                bit = (bits >> (size * size - 1 - (y * size + x))) & 1
+                self.assertEqual(bit, int(qr.modules[y][x]))
+
+    def test_svg(self):
+        svg = gen_qr_code(qr_format=QR_SVG, box_size=5, border=2, **params)
+        self.assertTrue(svg.startswith('<svg '))
+        size = gen_qr_code(qr_format=QR_MATRIX, **params)[0]
+        self.assertIn(f'width="{(size + 4) * 5}"', svg)
+
+    def test_params(self):
+        low = gen_qr_code(qr_format=QR_MATRIX, **params)
+        high = gen_qr_code(qr_format=QR_MATRIX, error_correction='H', **params)
+        self.assertGreater(high[0], low[0])
+        self.assertEqual(gen_qr_code(qr_format=QR_MATRIX, version=10, **params)[0], 57)
@@ -0,0 +1,59 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from unittest import IsolatedAsyncioTestCase
+
+from torauth.gen_qr_code import gen_qr_code
+from torauth.QrRenderer import QrRenderer
+
+params = {
+    'deep_link_url': 'https://link_to_the_surf_page_for_signing_proof/',
+    'seq': 'seq',
+    'rand': 'rand',
+    'webhook_url': 'http://localhost:8080/test'
+}
+
+
+class QrRendererTest(IsolatedAsyncioTestCase):
+
+    async def test_inline(self):
+        renderer = QrRenderer(executor='inline')
+        self.assertEqual(await renderer.render(**params), gen_qr_code(**params))
+
+    async def test_threads(self):
+        # By default QR codes are rendered in the default executor, off the event loop
+        renderer = QrRenderer()
+        self.assertEqual(renderer.executor, 'thread')
+        codes = await asyncio.gather(*(renderer.render(**params) for _ in range(10)))
+        self.assertEqual(codes, [gen_qr_code(**params)] * 10)
+
+        renderer = QrRenderer(workers=2, executor='thread')
+        try:
+            self.assertEqual(await renderer.render(**params), gen_qr_code(**params))
+            self.assertEqual(renderer._executor._max_workers, 2)
+        finally:
+            renderer.close()
+
+    async def test_process_without_workers(self):
+        # Processes are used when asked for, even without a pool size
+        renderer = QrRenderer(executor='process')
+        try:
+            self.assertEqual(await renderer.render(**params), gen_qr_code(**params))
+            self.assertIsInstance(renderer._executor, ProcessPoolExecutor)
+        finally:
+            renderer.close()
+
+    async def test_process_pool(self):
+        renderer = QrRenderer(workers=2, max_pending=3)
+        self.assertEqual(renderer.executor, 'process')
+        try:
+            codes = await asyncio.gather(*(renderer.render(**params) for _ in range(10)))
+            self.assertEqual(codes, [gen_qr_code(**params)] * 10)
+            self.assertIsInstance(renderer._executor, ProcessPoolExecutor)
+
+            # Only `max_pending` renders are in progress, the rest are waiting
+            tasks = [asyncio.create_task(renderer.render(**params)) for _ in range(5)]
+            await asyncio.sleep(0)
+            self.assertTrue(renderer._semaphore.locked())
+            await asyncio.gather(*tasks)
+        finally:
+            renderer.close()
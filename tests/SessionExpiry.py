@@ -0,0 +1,89 @@
+import os
+import time
+import asyncio
+import logging
+from unittest import IsolatedAsyncioTestCase
+
+from torauth import Authenticator, Config
+from torauth.stores import MemoryStore
+
+WEBHOOK_URL = 'http://localhost:8080/test'
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', 'INFO'))
+
+config = Config()
+auth = Authenticator(config)
+
+
+class SessionExpiry(IsolatedAsyncioTestCase):
+    '''
+    Failure callbacks are executed right after the session deadline,
+    and sessions expiring at the same moment are handled together
+    '''
+    async def test_expiry(self):
+        expired = {}
+
+        async def on_auth_callback(
+                context: str, result: bool,  public_key: str = None, wallet_address: str = None):
+            expired[context] = (time.time(), result)
+
+        await auth.init(on_auth_callback)
+
+        # The expiration task has nothing to wait for, it sleeps until a session is added
+        await auth.start_authentication(
+            webhook_url=WEBHOOK_URL, pin=None, context='late', retention_sec=3)
+        # An earlier deadline re-arms it
+        for context in ('early_1', 'early_2'):
+            await auth.start_authentication(
+                webhook_url=WEBHOOK_URL, pin=None, context=context, retention_sec=1)
+        started = time.time()
+
+        await asyncio.sleep(1.5)
+        self.assertEqual(set(expired), {'early_1', 'early_2'})
+        for context in ('early_1', 'early_2'):
+            expired_at, result = expired[context]
+            self.assertEqual(result, False)
+            self.assertLess(expired_at - started, 1.1)
+
+        await asyncio.sleep(2)
+        self.assertEqual(set(expired), {'early_1', 'early_2', 'late'})
+        self.assertLess(expired['late'][0] - started, 3.1)
+        self.assertEqual(len(auth.cache), 0)
+
+    async def test_start_does_not_query_deadlines(self):
+        # The deadline of a new session is known, the store is not asked for the earliest one
+        class CountingStore(MemoryStore):
+            queries = 0
+
+            def next_deadline(self):
+                CountingStore.queries += 1
+                return super().next_deadline()
+
+        counted = Authenticator(config)
+        counted.cache.store = CountingStore()
+        expired = []
+
+        async def on_auth_callback(context, result, public_key=None, wallet_address=None):
+            expired.append(context)
+
+        await counted.init(on_auth_callback)
+        try:
+            await asyncio.sleep(0)
+            queries = CountingStore.queries
+            for i in range(10):
+                await counted.start_authentication(
+                    webhook_url=WEBHOOK_URL, pin=None, context=i, retention_sec=60,
+                    qr_format='link')
+            await counted.start_authentication_many([
+                {'webhook_url': WEBHOOK_URL, 'pin': None, 'context': 'early',
+                 'retention_sec': 0.5, 'qr_format': 'link'}])
+            await asyncio.sleep(1)
+            self.assertEqual(expired, ['early'])
+            # Only the expiration task queried: woken up by the first session, by the earlier
+            # one and after expiring it (one query per started session before)
+            self.assertLessEqual(CountingStore.queries - queries, 3)
+        finally:
+            await counted.close()
+
+    async def asyncTearDown(self):
+        await auth.close()
@@ -0,0 +1,108 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from torauth import Authenticator, AuthSession, Config
+from torauth.mocks.decode_qr import decode_qr
+from tests.Verifier import sign
+
+WEBHOOK_URL = 'http://localhost:8080/test'
+WALLET_ADDRESS = '0:1a9af5ad556ad1d889a6963870fc46ccafaeb2382110a5f5c80730964408ce1f'
+
+config = Config()
+
+
+class SessionHandle(IsolatedAsyncioTestCase):
+    '''
+    Handles of `start_session` are awaited and iterated over, next to the callback
+    '''
+    async def asyncSetUp(self):
+        self.auth = Authenticator(config)
+        self.results = []
+
+        async def on_auth_callback(
+                context: str, result: bool, public_key: str = None, wallet_address: str = None):
+            self.results.append((context, result))
+
+        await self.auth.init(on_auth_callback)
+
+    async def hook(self, session, keys, public_key):
+        seq = decode_qr(session.qr_code)[len(config.deep_link_url):].split(',')[0]
+        await self.auth.hook({
+            'seq': seq,
+            'public_key': public_key,
+            'wallet_address': WALLET_ADDRESS,
+            'signed_message': await sign(keys, seq, '1234')
+        })
+
+    async def test_verified(self):
+        session = await self.auth.start_session(
+            webhook_url=WEBHOOK_URL, pin='1234', context='user', qr_format='link')
+        self.assertIsInstance(session, AuthSession)
+        self.assertEqual(session.state, 'issued')
+        self.assertIsNone(session.result)
+
+        async def states():
+            return [state async for state in session]
+
+        watchers = [asyncio.create_task(states()) for _ in range(3)]
+        waiters = [asyncio.create_task(session.wait()) for _ in range(100)]
+        await asyncio.sleep(0)
+
+        keys = await config.client.crypto.generate_random_sign_keys()
+        other_keys = await config.client.crypto.generate_random_sign_keys()
+        # A wrong signature does not end the session
+        await self.hook(session, other_keys, keys.public)
+        self.assertEqual(session.state, 'rejected')
+        await self.hook(session, keys, keys.public)
+
+        self.assertTrue(await session)
+        self.assertEqual(await asyncio.gather(*waiters), [True] * 100)
+        for watcher in watchers:
+            self.assertEqual(
+                await watcher, ['issued', 'scanned', 'rejected', 'scanned', 'verified'])
+        self.assertEqual(session.public_key, keys.public)
+        self.assertEqual(session.wallet_address, WALLET_ADDRESS)
+        # A late iteration gets all the states
+        self.assertEqual([state async for state in session][-1], 'verified')
+
+        await asyncio.sleep(0)
+        self.assertEqual(self.results, [('user', False), ('user', True)])
+        self.assertEqual(self.auth._sessions, {})
+
+    async def test_expired(self):
+        session = await self.auth.start_session(
+            webhook_url=WEBHOOK_URL, pin=None, context='user', retention_sec=1)
+        self.assertFalse(await asyncio.wait_for(session.wait(), 3))
+        self.assertEqual(session.states, ['issued', 'expired'])
+        self.assertEqual(self.auth._sessions, {})
+
+    async def test_expired_elsewhere(self):
+        # Another process sharing the store has popped the expired session
+        session = await self.auth.start_session(
+            webhook_url=WEBHOOK_URL, pin=None, context='user', qr_format='link',
+            retention_sec=1)
+        self.auth.cache.store.pop(session.qr_code.split(',')[1])
+        self.assertFalse(await asyncio.wait_for(session.wait(), 3))
+        self.assertEqual(session.states, ['issued', 'expired'])
+        self.assertEqual(self.auth._sessions, {})
+        self.assertEqual(self.auth._handle_deadlines, [])
+        self.assertEqual(self.results, [])
+
+    async def test_without_callback(self):
+        # Results are delivered to the waiters, without a task per result
+        auth = Authenticator(config)
+        await auth.init()
+        try:
+            session = await auth.start_session(
+                webhook_url=WEBHOOK_URL, pin=None, context='user', qr_format='link')
+            waiter = asyncio.ensure_future(session.wait())
+            await asyncio.sleep(0)
+            tasks = len(asyncio.all_tasks())
+            auth._exec_callback(auth.cache.pop(session.qr_code.split(',')[1]), result=True)
+            self.assertEqual(len(asyncio.all_tasks()), tasks)
+            self.assertTrue(await waiter)
+        finally:
+            await auth.close()
+
+    async def asyncTearDown(self):
+        await self.auth.close()
@@ -0,0 +1,181 @@
+import os
+import time
+import asyncio
+import tempfile
+import threading
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+from torauth.Cache import Cache
+from torauth.stores import MemoryStore, SQLiteStore, RedisStore, open_store
+from tests.fake_redis import FakeRedisServer
+
+
+class StoreTests:
+    '''
+    The same checks for every store backend.
+    `make_store` returns a new store instance sharing data with the previous ones
+    (as worker processes do), unless the backend is in-process
+    '''
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def test_put_get_pop(self):
+        store = self.make_store()
+        store.put('1', {'context': {'user': 1}}, time.time() + 60)
+        self.assertEqual(store.get('1'), {'context': {'user': 1}})
+        self.assertEqual(len(store), 1)
+
+        self.assertEqual(store.pop('1'), {'context': {'user': 1}})
+        self.assertEqual(store.pop('1'), None)
+        self.assertEqual(store.get('1'), None)
+        self.assertEqual(len(store), 0)
+
+    def test_pop_expired(self):
+        store = self.make_store()
+        now = time.time()
+        store.put('late', {'context': 'late'}, now + 60)
+        store.put('b', {'context': 'b'}, now - 1)
+        store.put('a', {'context': 'a'}, now - 2)
+        store.put('gone', {'context': 'gone'}, now - 3)
+        store.pop('gone')
+
+        self.assertEqual(store.next_deadline(), now - 2)
+        self.assertEqual(store.pop_expired(now), [{'context': 'a'}, {'context': 'b'}])
+        self.assertEqual(store.pop_expired(now), [])
+        self.assertEqual(store.next_deadline(), now + 60)
+
+        store.pop('late')
+        self.assertEqual(store.next_deadline(), None)
+
+    def test_cache(self):
+        cache = Cache(self.make_store())
+        cache.add(seq='0', webhook_url='https://ex.com/0', pin=None, retention_sec=-1,
+                  rand='000', context={'a': 'rec0'})
+        cache.add(seq='1', webhook_url='https://ex.com/1', pin='pin1', retention_sec=60,
+                  rand='001', context={'a': 'rec1'})
+        self.assertEqual(cache.clean_obsolete(), [{'a': 'rec0'}])
+        self.assertEqual(cache.get('1')['pin'], 'pin1')
+        self.assertEqual(cache.remove('1')['rand'], '001')
+        with self.assertRaises(KeyError):
+            cache.remove('1')
+
+
+class SharedStoreTests(StoreTests):
+
+    def test_pop_is_atomic_across_workers(self):
+        workers = [self.make_store() for _ in range(3)]
+        workers[0].put('seq', {'context': 'ctx'}, time.time() + 60)
+        popped = [worker.pop('seq') for worker in workers]
+        self.assertEqual(popped, [{'context': 'ctx'}, None, None])
+
+    def test_expiry_is_claimed_once(self):
+        workers = [self.make_store() for _ in range(3)]
+        for i in range(10):
+            workers[i % 3].put(str(i), {'context': i}, time.time() - 1)
+        expired = [entry['context'] for worker in workers for entry in worker.pop_expired(time.time())]
+        self.assertEqual(sorted(expired), list(range(10)))
+
+
+class MemoryStoreTest(StoreTests, TestCase):
+
+    def make_store(self):
+        return MemoryStore()
+
+
+class SQLiteStoreTest(SharedStoreTests, TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.stores = []
+
+    def make_store(self):
+        store = open_store(f'sqlite://{os.path.join(self.dir.name, "sessions.db")}')
+        self.assertIsInstance(store, SQLiteStore)
+        self.stores.append(store)
+        return store
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        self.dir.cleanup()
+
+
+class RedisStoreTest(SharedStoreTests, TestCase):
+
+    def setUp(self):
+        self.server = FakeRedisServer().start()
+        self.stores = []
+
+    def make_store(self):
+        store = open_store(f'redis://localhost:{self.server.port}/0')
+        self.assertIsInstance(store, RedisStore)
+        self.stores.append(store)
+        return store
+
+    def test_ttl(self):
+        store = RedisStore(port=self.server.port, grace_sec=0)
+        self.stores.append(store)
+        store.put('1', {'context': 1}, time.time() + 0.1)
+        self.assertEqual(store.get('1'), {'context': 1})
+        time.sleep(0.2)
+        self.assertEqual(store.get('1'), None)
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        self.server.stop()
+
+
+class SlowStore(MemoryStore):
+    ''' Memory store answering as slowly as a remote one '''
+
+    blocking = True
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def get(self, seq):
+        self.threads.add(threading.get_ident())
+        time.sleep(0.2)
+        return super().get(seq)
+
+
+class AsyncCache(IsolatedAsyncioTestCase):
+    '''
+    Calls of blocking stores don't stall the event loop
+    '''
+    async def test_blocking_store(self):
+        cache = Cache(SlowStore())
+        try:
+            await cache.aadd(seq='1', webhook_url='https://ex.com/1', pin=None,
+                             retention_sec=60, rand='1', context='ctx')
+            ticks = 0
+
+            async def probe():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            probe_task = asyncio.create_task(probe())
+            entries = await asyncio.gather(*(cache.aget('1') for _ in range(3)))
+            probe_task.cancel()
+
+            self.assertEqual([entry['context'] for entry in entries], ['ctx'] * 3)
+            self.assertNotIn(threading.get_ident(), cache.store.threads)
+            # The loop kept running during 0.6s of store calls
+            self.assertGreater(ticks, 20)
+            self.assertEqual((await cache.apop('1'))['rand'], '1')
+            self.assertEqual(await cache.anext_deadline(), None)
+        finally:
+            cache.close()
+
+    async def test_memory_store(self):
+        # In-process stores are called directly
+        cache = Cache()
+        await cache.aadd(seq='1', webhook_url='https://ex.com/1', pin=None,
+                         retention_sec=-1, rand='1', context='ctx')
+        self.assertEqual([entry['context'] for entry in await cache.apop_expired()], ['ctx'])
+        self.assertIsNone(cache._executor)
@@ -0,0 +1,37 @@
+import os
+import base64
+import logging
+from unittest import IsolatedAsyncioTestCase
+
+from torauth import Authenticator, Config
+
+WEBHOOK_URL = 'http://localhost:8080/test'
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', 'INFO'))
+
+config = Config()
+
+
+class StartAuthenticationMany(IsolatedAsyncioTestCase):
+    async def test_many(self):
+        auth = Authenticator(config)
+        requests = [
+            {'webhook_url': WEBHOOK_URL, 'pin': str(i), 'context': {'user': i}}
+            for i in range(20)
+        ]
+        qr_codes = await auth.start_authentication_many(requests)
+
+        self.assertEqual(len(qr_codes), 20)
+        for qr_code in qr_codes:
+            self.assertTrue(base64.b64decode(qr_code).startswith(b'\x89PNG'))
+
+        # Every session has its own random value, 24 bytes long
+        self.assertEqual(len(auth.cache), 20)
+        sessions = [auth.cache.get(seq) for seq in list(auth.cache.store.data)]
+        self.assertEqual(len({session['rand'] for session in sessions}), 20)
+        for session in sessions:
+            self.assertEqual(len(base64.b64decode(session['rand'])), 24)
+            self.assertEqual(session['pin'], str(session['context']['user']))
+            self.assertEqual(session['retention_sec'], 3600)
+
+        self.assertEqual(await auth.start_authentication_many([]), [])
@@ -0,0 +1,128 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from unittest import IsolatedAsyncioTestCase
+
+from torauth.Subscription import Subscription
+from tests.fake_net import FakeClient
+
+logging.basicConfig(level=os.environ.get('LOGLEVEL', 'INFO'))
+
+ITEMS = 500
+
+
+class SubscriptionTests(IsolatedAsyncioTestCase):
+    '''
+    Items published while the subscription is down are fetched after reconnection,
+    each item is delivered exactly once
+    '''
+    async def asyncSetUp(self):
+        self.client = FakeClient()
+        self.received = []
+        self.subscription = Subscription(
+            self.client,
+            collection='messages',
+            filter={'dst': {'eq': 'root'}},
+            result='src body',
+            on_item=self.received.append,
+            backoff_min=0.01,
+            backoff_max=0.05,
+            page_size=7,
+            seen_capacity=1000)
+        await self.subscription.start()
+
+    async def wait_for(self, count):
+        for _ in range(500):
+            if len(self.received) >= count and self.subscription._reconnect_task is None:
+                return
+            await asyncio.sleep(0.01)
+
+    async def test_reconnect(self):
+        net = self.client.net
+        rnd = random.Random(1)
+        created_at = int(time.time())
+        items = []
+        for i in range(ITEMS):
+            items.append({
+                # Ids are hashes, they do not follow the order of messages
+                'id': '%064x' % rnd.getrandbits(256),
+                'src': f'0:{i}',
+                'dst': 'other' if i % 10 == 0 else 'root',
+                'body': 'te6ccgEBAQEAAgAAAA==',
+                # Several messages per second
+                'created_at': created_at + i // 20,
+            })
+
+        def publish(chunk):
+            for item in chunk:
+                net.publish(item)
+
+        # Connection drops several times, once reconnection also fails twice
+        for n, chunk in enumerate(range(0, ITEMS, 50)):
+            await asyncio.to_thread(publish, items[chunk:chunk + 25])
+            net.disconnect()
+            if n == 3:
+                net.failing_subscriptions = 2
+            await asyncio.to_thread(publish, items[chunk + 25:chunk + 50])
+            net.reconnect()
+            await asyncio.sleep(0.02)
+
+        expected = [item['id'] for item in items if item['dst'] == 'root']
+        await self.wait_for(len(expected))
+        received = [item['id'] for item in self.received]
+        self.assertEqual(sorted(received), sorted(expected))
+        self.assertEqual(len(received), len(set(received)))
+        self.assertGreater(self.subscription.duplicates, 0)
+        self.assertGreater(self.subscription.reconnects, 0)
+        self.assertEqual(self.subscription.result, 'src body id created_at')
+
+    async def test_subscription_lost_during_reconnection(self):
+        net = self.client.net
+        query_collection = net.query_collection
+
+        async def drop_and_query(params):
+            # The restored subscription drops while the gap is being filled
+            if net.queries == 0:
+                net.disconnect()
+                net.publish({'id': 'c', 'dst': 'root', 'created_at': int(time.time()) + 1})
+                net.reconnect()
+            return await query_collection(params)
+
+        net.query_collection = drop_and_query
+        net.publish({'id': 'a', 'dst': 'root', 'created_at': int(time.time())})
+        net.disconnect()
+        net.publish({'id': 'b', 'dst': 'root', 'created_at': int(time.time())})
+        net.reconnect()
+        await self.wait_for(3)
+        self.assertEqual([item['id'] for item in self.received], ['a', 'b', 'c'])
+        self.assertEqual(len(net.subscriptions), 1)
+
+    async def test_pause(self):
+        # Items created while the subscription is paused are fetched when it resumes
+        net = self.client.net
+        net.publish({'id': 'a', 'dst': 'root', 'created_at': int(time.time())})
+        self.subscription.pause()
+        await asyncio.sleep(0.01)
+        self.assertEqual(len(net.subscriptions), 0)
+        net.publish({'id': 'b', 'dst': 'root', 'created_at': int(time.time())})
+        self.assertEqual(len(self.received), 1)
+        self.subscription.resume()
+        await asyncio.sleep(0.05)
+        await self.wait_for(2)
+        self.assertEqual([item['id'] for item in self.received], ['a', 'b'])
+        self.assertEqual(len(net.subscriptions), 1)
+
+    async def test_live_items_are_not_requeried(self):
+        net = self.client.net
+        await asyncio.to_thread(lambda: [
+            net.publish({'id': str(i), 'dst': 'root', 'created_at': int(time.time())})
+            for i in range(100)
+        ])
+        self.assertEqual(len(self.received), 100)
+        self.assertEqual(net.queries, 0)
+
+    async def asyncTearDown(self):
+        await self.subscription.close()
+        self.assertEqual(len(self.client.net.subscriptions), 0)
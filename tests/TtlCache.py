@@ -0,0 +1,41 @@
+import time
+from unittest import TestCase
+
+from torauth.TtlCache import TtlCache
+
+
+class TtlCacheTest(TestCase):
+    '''
+    Entries expire after `ttl_sec`, the oldest are evicted beyond `capacity`
+    '''
+    def test_expiry(self):
+        cache = TtlCache(capacity=10, ttl_sec=0.2)
+        cache['wallet'] = ['key']
+        self.assertEqual(cache['wallet'], ['key'])
+        self.assertIn('wallet', cache)
+        time.sleep(0.25)
+        self.assertNotIn('wallet', cache)
+        self.assertIsNone(cache.get('wallet'))
+        with self.assertRaises(KeyError):
+            cache['wallet']
+
+        # Expired entries are dropped when new ones are set
+        cache['first'] = 1
+        time.sleep(0.25)
+        cache['second'] = 2
+        self.assertEqual(len(cache), 1)
+
+    def test_capacity(self):
+        cache = TtlCache(capacity=3, ttl_sec=60)
+        for i in range(5):
+            cache[i] = i
+        self.assertEqual(len(cache), 3)
+        self.assertEqual([cache.get(i) for i in range(5)], [None, None, 2, 3, 4])
+
+        # Setting an entry again renews it
+        cache[2] = 'renewed'
+        cache[5] = 5
+        self.assertEqual(cache.get(2), 'renewed')
+        self.assertIsNone(cache.get(3))
+        self.assertEqual(cache.pop(2), 'renewed')
+        self.assertIsNone(cache.pop(2))
@@ -0,0 +1,62 @@
+from unittest import IsolatedAsyncioTestCase
+
+from tonclient.types import ParamsOfNaclSign, ParamsOfHash
+
+from torauth import Config
+from torauth.Verifier import LocalVerifier, TonClientVerifier
+from torauth.utils import string_to_base64, hex_to_base64
+
+config = Config()
+
+RAND = 'QX9YhgTB7ajSLSWR1zVcTeHNWkX3tdPN'
+PIN = '4352'
+
+
+async def sign(keys, rand, pin):
+    # Surf signs sha256(rand + pin)
+    message_hash = (await config.client.crypto.sha256(params=ParamsOfHash(
+        data=string_to_base64(rand + ('' if pin is None else pin))
+    ))).hash
+    return (await config.client.crypto.nacl_sign_detached(ParamsOfNaclSign(
+        unsigned=hex_to_base64(message_hash),
+        secret=keys.secret + keys.public
+    ))).signature
+
+
+class Verifier(IsolatedAsyncioTestCase):
+    '''
+    Local and TonClient verification give the same results
+    '''
+    async def verify(self, **kwargs):
+        results = []
+        for verifier in (LocalVerifier(), TonClientVerifier(config.client)):
+            try:
+                results.append(await verifier.verify(**kwargs))
+            except Exception:
+                # TonClient fails on a forged signature
+                results.append(False)
+        self.assertEqual(results[0], results[1])
+        return results[0]
+
+    async def test_verify(self):
+        keys = await config.client.crypto.generate_random_sign_keys()
+        other_keys = await config.client.crypto.generate_random_sign_keys()
+        signature = await sign(keys, RAND, PIN)
+
+        self.assertTrue(await self.verify(
+            rand=RAND, pin=PIN, signed_message=signature, public_key=keys.public))
+        self.assertTrue(await self.verify(
+            rand=RAND, pin=None, signed_message=await sign(keys, RAND, None),
+            public_key=keys.public))
+
+        # Wrong pin, random, key or signature
+        self.assertFalse(await self.verify(
+            rand=RAND, pin='0000', signed_message=signature, public_key=keys.public))
+        self.assertFalse(await self.verify(
+            rand=RAND[::-1], pin=PIN, signed_message=signature, public_key=keys.public))
+        self.assertFalse(await self.verify(
+            rand=RAND, pin=PIN, signed_message=signature, public_key=other_keys.public))
+        self.assertFalse(await self.verify(
+            rand=RAND, pin=PIN, signed_message='00' * 64, public_key=keys.public))
+        self.assertFalse(await self.verify(
+            rand=RAND, pin=PIN, signed_message=signature + '00', public_key=keys.public))
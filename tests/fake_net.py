@@ -0,0 +1,107 @@
+'''
+Local fake of the TON GraphQL endpoint behind `TonClient.net` for tests.
+Keeps a collection in memory, pushes new items to subscribers from the publishing
+thread (as TonClient does from its own one) and drops subscriptions on demand.
+Supports only the filters used by `torauth.Subscription`
+'''
+import threading
+
+from tonclient.errors import TonException
+from tonclient.types import SubscriptionResponseType
+
+
+class _Handle:
+    def __init__(self, handle):
+        self.handle = handle
+
+
+class FakeNet:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = []
+        self.subscriptions = {}  # handle -> (filter, callback)
+        self.online = True
+        self.failing_subscriptions = 0
+        self.queries = 0
+        self._next_handle = 0
+
+    def publish(self, item):
+        ''' Adds an item, it is delivered to the subscribers if the endpoint is online '''
+        with self.lock:
+            self.items.append(item)
+            subscribers = list(self.subscriptions.values()) if self.online else []
+        for item_filter, callback in subscribers:
+            if _matches(item, item_filter):
+                callback({'result': dict(item)}, SubscriptionResponseType.OK, None)
+
+    def disconnect(self):
+        ''' Drops all subscriptions, new items are not delivered until reconnection '''
+        with self.lock:
+            self.online = False
+            subscribers = list(self.subscriptions.values())
+            self.subscriptions.clear()
+        for _, callback in subscribers:
+            callback({'code': 607, 'message': 'Connection closed'},
+                     SubscriptionResponseType.ERROR, None)
+
+    def reconnect(self):
+        with self.lock:
+            self.online = True
+
+    async def subscribe_collection(self, params, callback):
+        with self.lock:
+            if not self.online or self.failing_subscriptions > 0:
+                self.failing_subscriptions = max(0, self.failing_subscriptions - 1)
+                raise TonException('Network is unavailable')
+            self._next_handle += 1
+            self.subscriptions[self._next_handle] = (params.filter, callback)
+            return _Handle(self._next_handle)
+
+    async def unsubscribe(self, params):
+        with self.lock:
+            self.subscriptions.pop(params.handle, None)
+
+    async def query_collection(self, params):
+        with self.lock:
+            if not self.online:
+                raise TonException('Network is unavailable')
+            self.queries += 1
+            items = [dict(i) for i in self.items if _matches(i, params.filter)]
+        for order in reversed(params.order or []):
+            items.sort(key=lambda i: i[order.path], reverse=order.direction == 'DESC')
+        return _Result(items[:params.limit])
+
+
+class FakeClient:
+    def __init__(self):
+        self.net = FakeNet()
+
+
+class _Result:
+    def __init__(self, result):
+        self.result = result
+
+
+def _matches(item, item_filter):
+    if 'OR' in item_filter:
+        rest = {k: v for k, v in item_filter.items() if k != 'OR'}
+        return _matches(item, rest) or _matches(item, item_filter['OR'])
+    for field, condition in item_filter.items():
+        value = item[field]
+        for op, operand in condition.items():
+            if op == 'eq' and not value == operand:
+                return False
+            if op == 'ne' and not value != operand:
+                return False
+            if op == 'gt' and not value > operand:
+                return False
+            if op == 'ge' and not value >= operand:
+                return False
+            if op == 'lt' and not value < operand:
+                return False
+            if op == 'le' and not value <= operand:
+                return False
+            if op == 'in' and value not in operand:
+                return False
+    return True
@@ -0,0 +1,148 @@
+'''
+Local fake of a Redis-protocol server for tests.
+Supports only the commands used by `torauth.stores.RedisStore`
+'''
+import time
+import threading
+import socketserver
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('localhost', 0), _Handler)
+        self.lock = threading.Lock()
+        self.strings = {}  # key -> (value, expires_at)
+        self.zsets = {}    # key -> {member: score}
+        self.connections = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def run(self, args):
+        cmd = args[0].upper()
+        handler = getattr(self, 'cmd_' + cmd.decode().lower(), None)
+        if handler is None:
+            return Exception(f'ERR unknown command {cmd}')
+        return handler(*args[1:])
+
+    def cmd_ping(self):
+        return 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_set(self, key, value, *opts):
+        expires_at = None
+        if len(opts) == 2 and opts[0].upper() == b'PX':
+            expires_at = time.time() + int(opts[1]) / 1000
+        self.strings[key] = (value, expires_at)
+        return 'OK'
+
+    def cmd_get(self, key):
+        value = self.strings.get(key)
+        if value is None:
+            return None
+        if value[1] is not None and value[1] <= time.time():
+            del self.strings[key]
+            return None
+        return value[0]
+
+    def cmd_del(self, *keys):
+        return sum(self.strings.pop(key, None) is not None for key in keys)
+
+    def cmd_zadd(self, key, score, member):
+        zset = self.zsets.setdefault(key, {})
+        added = member not in zset
+        zset[member] = float(score)
+        return int(added)
+
+    def cmd_zrem(self, key, member):
+        return int(self.zsets.get(key, {}).pop(member, None) is not None)
+
+    def cmd_zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def cmd_zrangebyscore(self, key, low, high):
+        def bound(value):
+            exclusive = value.startswith(b'(')
+            return float(value.lstrip(b'(')), exclusive
+        (low, low_ex), (high, high_ex) = bound(low), bound(high)
+        return [
+            member for member, score in self._sorted(key)
+            if (score > low if low_ex else score >= low)
+            and (score < high if high_ex else score <= high)
+        ]
+
+    def cmd_zrange(self, key, start, stop, withscores=None):
+        items = self._sorted(key)[int(start):int(stop) + 1 or None]
+        if withscores is None:
+            return [member for member, _ in items]
+        return [x for member, score in items for x in (member, repr(score).encode())]
+
+    def _sorted(self, key):
+        return sorted(self.zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        queued = None
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            cmd = args[0].upper()
+            if cmd == b'MULTI':
+                queued = []
+                self._write('OK')
+            elif cmd == b'EXEC':
+                with server.lock:
+                    replies = [server.run(queued_args) for queued_args in queued]
+                queued = None
+                self._write(replies)
+            elif queued is not None:
+                queued.append(args)
+                self._write('QUEUED')
+            else:
+                with server.lock:
+                    self._write(server.run(args))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _write(self, reply):
+        self.wfile.write(self._encode(reply))
+
+    def _encode(self, reply):
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, Exception):
+            return b'-%s\r\n' % str(reply).encode()
+        if isinstance(reply, str):
+            return b'+%s\r\n' % reply.encode()
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, bytes):
+            return b'$%d\r\n%s\r\n' % (len(reply), reply)
+        return b'*%d\r\n' % len(reply) + b''.join(self._encode(x) for x in reply)
@@ -0,0 +1,78 @@
+'''
+Stand-in for `tonos-cli debot fetch <address>` with the authentication DeBot.
+Prompts are printed without a line end, as the real ones. Options go before `debot`:
+    --delay SEC   time to process the transaction
+    --log FILE    append "<wallet> <one-time password>" of each sent message
+    --once        exit after the first transaction
+    --idle        sit idle after the first transaction, without the menu
+    --crash N     exit without a result while processing the N-th transaction
+    --hang        never ask for the one-time password
+'''
+import re
+import sys
+import json
+import time
+
+
+def ask(prompt):
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    line = sys.stdin.readline()
+    if not line:
+        sys.exit(0)
+    return line.strip()
+
+
+def valid_keys(path):
+    try:
+        with open(path) as fp:
+            keys = json.load(fp)
+        return len(keys['public']) == 64 and len(keys['secret']) == 64
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def main(argv):
+    debot = argv.index('debot')
+    options, address = argv[:debot], argv[debot + 2]
+    delay = float(options[options.index('--delay') + 1]) if '--delay' in options else 0
+    log = options[options.index('--log') + 1] if '--log' in options else None
+    crash = int(options[options.index('--crash') + 1]) if '--crash' in options else 0
+    transactions = 0
+
+    print(f'Connecting to net.ton.dev\nDeBot {address} is fetched\n'
+          'Hello, I am the authentication DeBot!')
+    while True:
+        print('Actions:\n  1) Prove ownership of a wallet\n  2) Quit')
+        if ask('Select action (1-2): ') != '1':
+            return
+        if '--hang' in options:
+            time.sleep(3600)
+        otp = ask('Enter one-time password: ')
+        signing_keys = ask('Enter path to the keys file of the signing box: ')
+        wallet = ask('Enter wallet address: ')
+        wallet_keys = ask('Enter path to the keys file of the wallet: ')
+
+        if not re.fullmatch(r'-?\d+:[0-9a-f]{64}', wallet):
+            print(f'Error: invalid address {wallet}')
+            continue
+        if not (valid_keys(signing_keys) and valid_keys(wallet_keys)):
+            print('Error: invalid keys')
+            continue
+        print('Sending the message, Error codes are printed on failure')
+        transactions += 1
+        if transactions == crash:
+            sys.exit(1)
+        time.sleep(delay)
+        if log is not None:
+            with open(log, 'a') as fp:
+                fp.write(f'{wallet} {otp}\n')
+        print('Transaction succeeded.')
+        if '--once' in options:
+            return
+        if '--idle' in options:
+            time.sleep(3600)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
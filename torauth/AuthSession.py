@@ -0,0 +1,92 @@
+import asyncio
+from typing import Any, Union
+
+# States of an authentication
+ISSUED = 'issued'
+SCANNED = 'scanned'
+REJECTED = 'rejected'
+VERIFIED = 'verified'
+EXPIRED = 'expired'
+FINAL_STATES = (VERIFIED, EXPIRED)
+
+
+class AuthSession:
+    '''
+    Handle of an authentication started by `Authenticator.start_session`.
+    Awaiting it returns the result, iterating over it (`async for`) yields the states:
+    `issued`, `scanned` (a webhook or a ROOT contract message has arrived), `rejected`
+    (a wrong signature, the user may scan the QR code again), then `verified` or `expired`.
+    Waiting coroutines are woken up directly, no task is started for a state change
+    '''
+
+    def __init__(self, context: Any, qr_code: Union[str, bytes] = None, deadline: float = None):
+        '''
+        :param context: context of the authentication
+        :param qr_code: QR code to show to the user
+        :param deadline: time (`time.time()`) when the authentication expires
+        '''
+        self.context = context
+        self.qr_code = qr_code
+        self.deadline = deadline
+        self.states = [ISSUED]
+        self.public_key = None
+        self.wallet_address = None
+        self._waiters = []
+
+    @property
+    def state(self) -> str:
+        return self.states[-1]
+
+    @property
+    def result(self) -> bool:
+        '''
+        :return: True if verified, False if expired, None while in progress
+        '''
+        if not self.done():
+            return None
+        return self.state == VERIFIED
+
+    def done(self) -> bool:
+        return self.state in FINAL_STATES
+
+    async def wait(self) -> bool:
+        '''
+        Waits until the authentication is verified or expires
+        :return: `result`
+        '''
+        while not self.done():
+            await self._changed()
+        return self.result
+
+    def __await__(self):
+        return self.wait().__await__()
+
+    async def __aiter__(self):
+        index = 0
+        while True:
+            while index < len(self.states):
+                index += 1
+                yield self.states[index - 1]
+            if self.done():
+                return
+            await self._changed()
+
+    def set_state(self, state: str, public_key: str = None, wallet_address: str = None) -> None:
+        '''
+        Moves to a new state and wakes up the waiting coroutines, called by `Authenticator`
+        '''
+        if self.done() or state == self.state:
+            return
+        self.states.append(state)
+        if public_key is not None:
+            self.public_key = public_key
+            self.wallet_address = wallet_address
+        waiters, self._waiters = self._waiters, []
+        for future in waiters:
+            if not future.done():
+                future.set_result(state)
+
+    def _changed(self) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        return future
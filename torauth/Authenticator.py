@@ -1,202 +1,650 @@
 import sys
+import time
+import heapq
+import base64
 import asyncio
 import logging
-from typing import Callable, Any
+from typing import Callable, Any, List, Union
 
 from tonclient.errors import TonException
 from tonclient.types import ParamsOfGenerateRandomBytes, ParamsOfDecodeMessageBody, \
-    ParamsOfParse, ParamsOfSubscribeCollection, ParamsOfNaclSignOpen, \
-    KeyPair, DeploySet, Signer, SubscriptionResponseType, ParamsOfHash
+    ParamsOfParse, ParamsOfEncodeMessageBody, \
+    ParamsOfEncodeMessage, ParamsOfQueryCollection, ParamsOfRunTvm, ParamsOfNaclSignOpen, \
+    KeyPair, DeploySet, CallSet, Signer
 
 from torauth.Cache import Cache
+from torauth.TtlCache import TtlCache
+from torauth.AuthSession import AuthSession, SCANNED, REJECTED, VERIFIED, EXPIRED
 from torauth.Config import Config
-from torauth.gen_qr_code import gen_qr_code
-from torauth.utils import calc_address, hex_to_base64, base64_to_hex, string_to_base64
+from torauth.stores import open_store
+from torauth.QrRenderer import QrRenderer
+from torauth.MessageQueue import MessageQueue
+from torauth.Subscription import Subscription
+from torauth.Verifier import create_verifier
+from torauth.utils import calc_address, address_cache, body_function_id, hex_to_base64
 
 log = logging.getLogger(__name__)
 
+# Length of the random value in bytes
+RANDOM_LENGTH = 24
+# ... and in characters of its base64 representation
+RANDOM_CHARS = (RANDOM_LENGTH + 2) // 3 * 4
+# ed25519 signature length in bytes
+SIGNATURE_LENGTH = 64
+# `msg_type` of internal messages in the `messages` collection
+MSG_TYPE_INTERNAL = 0
+
 
 class Authenticator:
     ''' Authenticating a site user providing his public_key as a TON blockchain user '''
 
-    def __init__(self, config: Config = None):
+    def __init__(self, config: Config = None, metrics=None):
         '''
         :param config: config object, initializing from env vars
+        :param metrics: `torauth.metrics.Metrics`, `OpenTelemetryMetrics` or an object with
+            the same interface. Without it (by default) nothing is measured
         '''
         if config is None:
             config = Config()
         self.cfg = config
-        self.messages = {}
-        self.cache = Cache()
+        if config.address_cache_path and address_cache.path != config.address_cache_path:
+            address_cache.persist_to(config.address_cache_path)
+        self.messages = MessageQueue(
+            config.message_queue_capacity, config.message_queue_overflow)
+        self.cache = Cache(open_store(config.session_store))
+        self.verifier = create_verifier(
+            config.verify_engine,
+            config.client,
+            config.verify_batch_size,
+            config.verify_batch_window_ms / 1000,
+            config.verify_executor,
+            config.verify_workers)
+        self.renderer = QrRenderer(
+            config.qr_render_workers, config.qr_render_max_pending, config.qr_render_executor)
+        # Custodian public keys of wallets which have sent messages to the ROOT contract,
+        # re-read after CUSTODIAN_CACHE_TTL_SEC, so that removed custodians lose access
+        self.wallet_keys = TtlCache(config.custodian_cache_size, config.custodian_cache_ttl_sec)
+        # ROOT contract keys of the served sites, None is the one from the config
+        self.tenants = {None: KeyPair(public=config.root_public, secret=config.root_secret)}
+        self.metrics = metrics
+        if metrics is not None:
+            self.renderer.metrics = metrics
+            self.verifier.metrics = metrics
+            metrics.gauge('sessions_live', lambda: len(self.cache))
+            metrics.gauge('message_queue_size', lambda: len(self.messages))
+            metrics.gauge('message_queue_dropped', lambda: self.messages.dropped)
+        self._callbacks = {}
+        # Handles of the sessions started by `start_session`, by seq
+        self._sessions = {}
+        # Heap of (deadline, seq) of the handles: they expire even if the session
+        # is completed or expires in another process sharing the store
+        self._handle_deadlines = []
+        self._root_addresses = {}
+        self._tenant_by_address = {}
         self._callback = None
         self._subscription = None
         self._task = None
+        self._message_tasks = []
+        self._prove_ownership_id = None
         self._is_subscribed = False
+        self._wakeup = None
+        self._armed_deadline = None
+
+    def add_tenant(self, tenant: str, root_public: str, root_secret: str,
+                   callback: Callable = None) -> None:
+        '''
+        Serves one more site with its own ROOT contract. Sessions of all sites share
+        the cache, the subscription and the background tasks
+        :param tenant: name of the site, passed to `start_authentication`
+        :param root_public, root_secret: keys of the site ROOT contract
+        :param callback: callback for the site sessions, the one passed to `init` by default
+        '''
+        if self._is_subscribed:
+            raise RuntimeError('Tenants must be added before init')
+        self.tenants[tenant] = KeyPair(public=root_public, secret=root_secret)
+        if callback is not None:
+            self._callbacks[tenant] = callback
 
-    async def get_root_address(self) -> str:
+    async def get_root_address(self, tenant: str = None) -> str:
         '''
         Returns an address of the ROOT contract
+        :param tenant: the site, the ROOT contract from the config by default
         :return: str
         '''
-        signer = Signer.Keys(
-            KeyPair(public=self.cfg.root_public, secret=self.cfg.root_secret)
-        )
-        return await calc_address(
-            client=self.cfg.client,
-            abi=self.cfg.root_abi,
-            signer=signer,
-            deploy_set=DeploySet(tvc=self.cfg.root_tvc)
-        )
+        if tenant not in self._root_addresses:
+            self._root_addresses[tenant] = await calc_address(
+                client=self.cfg.client,
+                abi=self.cfg.root_abi,
+                signer=Signer.Keys(self.tenants[tenant]),
+                deploy_set=DeploySet(tvc=self.cfg.root_tvc)
+            )
+        return self._root_addresses[tenant]
 
     async def start_authentication(
         self,
         webhook_url: str,
         pin: str,
         context: Any,
-        retention_sec=3600
-    ) -> str:
+        retention_sec=3600,
+        qr_format: str = None,
+        tenant: str = None
+    ) -> Union[str, bytes]:
         '''
         Saves context and returns a QR code required for the authentication process
         :param webhook_url: endpoint for POST request from Surf
         :param pin: pin code used when logged-in user wants to link Surf wallet
         :param context: serializable context
         :param retention_sec: time limit in seconds as long as the QR code is valid
-        :return: QR code encoded as base64 string
+        :param qr_format: output format (see `gen_qr_code`), QR_FORMAT from config by default
+        :param tenant: the site the user signs in (see `add_tenant`)
+        :return: QR code encoded as base64 string (in the default format)
         '''
+        return await self._start_authentication(
+            webhook_url, pin, context, retention_sec, qr_format, tenant)
+
+    async def start_session(
+        self,
+        webhook_url: str,
+        pin: str,
+        context: Any,
+        retention_sec=3600,
+        qr_format: str = None,
+        tenant: str = None
+    ) -> AuthSession:
+        '''
+        Starts an authentication like `start_authentication` and returns its handle:
+        `qr_code` to show, the result to await and the states to iterate over
+        (see `AuthSession`). The callback, if any, is executed as well.
+        The handle learns the result only if the session is completed in this process,
+        otherwise it expires at its deadline
+        :return: AuthSession
+        '''
+        session = AuthSession(context)
+        session.qr_code = await self._start_authentication(
+            webhook_url, pin, context, retention_sec, qr_format, tenant, session)
+        return session
+
+    async def _start_authentication(self, webhook_url, pin, context, retention_sec,
+                                    qr_format, tenant, session=None):
+        self._check_tenant(tenant)
+        metrics = self.metrics
+        if metrics is None:
+            return await self._issue(
+                webhook_url, pin, context, retention_sec, qr_format, tenant, session)
+        metrics.inc('sessions_started_total', tenant=tenant)
+        with metrics.span('start_authentication', tenant=tenant):
+            return await self._issue(
+                webhook_url, pin, context, retention_sec, qr_format, tenant, session)
+
+    async def _issue(self, webhook_url, pin, context, retention_sec, qr_format, tenant, session):
         rand = (
             await self.cfg.client.crypto.generate_random_bytes(
-                ParamsOfGenerateRandomBytes(length=24)
+                ParamsOfGenerateRandomBytes(length=RANDOM_LENGTH)
             )
         ).bytes
 
         seq = rand  # or uuid.uuid4().hex
-        self.cache.add(
+        await self.cache.aadd(
             seq=seq,
             webhook_url=webhook_url,
             pin=pin,
             retention_sec=retention_sec,
             rand=rand,
-            context=context)
+            context=context,
+            tenant=tenant)
+        deadline = time.time() + retention_sec
+        if session is not None:
+            session.deadline = deadline
+            self._sessions[seq] = session
+            heapq.heappush(self._handle_deadlines, (deadline, seq))
+        self._rearm(deadline)
 
-        return gen_qr_code(
+        return await self.renderer.render(
             deep_link_url=self.cfg.deep_link_url,
             seq=seq,
             rand=rand,
-            webhook_url=webhook_url)
+            webhook_url=webhook_url,
+            **self._qr_params(qr_format))
+
+    async def start_authentication_many(self, requests: List[dict]) -> List[Union[str, bytes]]:
+        '''
+        Starts several authentications at once: randomness is requested from the client
+        in one call, sessions are saved in one batch and QR codes are rendered concurrently
+        off the event loop (see QR_RENDER_EXECUTOR)
+        :param requests: list of dictionaries with `start_authentication` arguments
+            (`webhook_url`, `pin`, `context` and optionally `retention_sec`, `qr_format`,
+            `tenant`)
+        :return: list of QR codes, in the order of requests
+        '''
+        if len(requests) == 0:
+            return []
+        for request in requests:
+            self._check_tenant(request.get('tenant'))
+        metrics = self.metrics
+        if metrics is None:
+            return await self._issue_many(requests)
+        with metrics.span('start_authentication_many', sessions=len(requests)):
+            return await self._issue_many(requests)
+
+    async def _issue_many(self, requests):
+        random_bytes = base64.b64decode((
+            await self.cfg.client.crypto.generate_random_bytes(
+                ParamsOfGenerateRandomBytes(length=RANDOM_LENGTH * len(requests))
+            )
+        ).bytes)
+
+        sessions = []
+        qr_formats = []
+        for i, request in enumerate(requests):
+            rand = base64.b64encode(
+                random_bytes[i * RANDOM_LENGTH:(i + 1) * RANDOM_LENGTH]).decode()
+            sessions.append({
+                'seq': rand,
+                'rand': rand,
+                'webhook_url': request['webhook_url'],
+                'pin': request['pin'],
+                'context': request['context'],
+                'tenant': request.get('tenant'),
+                'retention_sec': request.get('retention_sec', 3600)
+            })
+            qr_formats.append(request.get('qr_format'))
+        await self.cache.aadd_many(sessions)
+        if self.metrics is not None:
+            for session in sessions:
+                self.metrics.inc('sessions_started_total', tenant=session['tenant'])
+        self._rearm(time.time() + min(session['retention_sec'] for session in sessions))
+
+        return await asyncio.gather(*(
+            self.renderer.render(
+                deep_link_url=self.cfg.deep_link_url,
+                seq=session['seq'],
+                rand=session['rand'],
+                webhook_url=session['webhook_url'],
+                **self._qr_params(qr_format))
+            for session, qr_format in zip(sessions, qr_formats)
+        ))
+
+    def _check_tenant(self, tenant: str) -> None:
+        if tenant not in self.tenants:
+            raise ValueError(f'Unknown tenant {tenant}')
+
+    def _exec_callback(self, session: dict, state: str = None, **kwargs) -> None:
+        '''
+        Runs the callback of the session tenant and moves the session handle, if any,
+        to the next state
+        :param state: `expired`, by default `verified` or `rejected` depending on the result
+        '''
+        # seq is the random value
+        handle = self._sessions.get(session['rand'])
+        if handle is not None:
+            if state is None:
+                state = VERIFIED if kwargs['result'] else REJECTED
+            handle.set_state(state, kwargs.get('public_key'), kwargs.get('wallet_address'))
+            if handle.done():
+                del self._sessions[session['rand']]
+
+        callback = self._callbacks.get(session.get('tenant'), self._callback)
+        if self.metrics is not None:
+            self.metrics.inc(
+                'callbacks_total', tenant=session.get('tenant'),
+                result='true' if kwargs['result'] else 'false')
+        if callback is not None:
+            asyncio.create_task(callback(context=session['context'], **kwargs))
+
+    def _scanned(self, seq: str) -> None:
+        handle = self._sessions.get(seq)
+        if handle is not None:
+            handle.set_state(SCANNED)
+
+    def _qr_params(self, qr_format: str = None) -> dict:
+        return {
+            'qr_format': self.cfg.qr_format if qr_format is None else qr_format,
+            'version': self.cfg.qr_version,
+            'box_size': self.cfg.qr_box_size,
+            'border': self.cfg.qr_border,
+            'error_correction': self.cfg.qr_error_correction,
+            'compact': self.cfg.qr_compact
+        }
 
     async def hook(self, json) -> None:
-        if 'seq' in json:
-            seq = json['seq']
-            cached = self.cache.get(seq)
-            if cached is not None:
-                def exec_callback(**kwargs):
-                    asyncio.create_task(self._callback(
-                        context=cached['context'], **kwargs))
+        metrics = self.metrics
+        if metrics is None:
+            await self._hook(json)
+            return
+        start = time.perf_counter()
+        with metrics.span('hook') as span:
+            result = await self._hook(json, metrics)
+            span.set_attribute('result', result)
+        metrics.observe('hook_seconds', time.perf_counter() - start, result=result)
 
-                try:
-                    pin = cached['pin']
-                    public_key = json['public_key']
-                    wallet_address = json['wallet_address']
-                    signed_message = json['signed_message']
-
-                    hash_of_initial_random = (await self.cfg.client.crypto.sha256(params=ParamsOfHash(
-                        data=string_to_base64(
-                            cached['rand'] + ('' if pin is None else pin))
-                    ))).hash
-
-                    signed = hex_to_base64(
-                        signed_message + hash_of_initial_random
-                    )
-
-                    hash_of_received_random = (await self.cfg.client.crypto.nacl_sign_open(
-                        params=ParamsOfNaclSignOpen(
-                            signed=signed,
-                            public=public_key
-                        )
-                    )).unsigned
-
-                    if hash_of_initial_random == base64_to_hex(hash_of_received_random):
-                        log.debug('Check passed')
-                        self.cache.remove(seq)
-                        exec_callback(
-                            public_key=public_key,
-                            wallet_address=wallet_address,
-                            result=True
-                        )
-                    else:
-                        log.debug('Randoms are NOT equal')
-                        exec_callback(result=False)
-
-                except:
-                    log.error(f'Check sign error: {sys.exc_info()[1]}')
-                    exec_callback(result=False)
-
-    async def init(self, callback: Callable) -> None:
-        '''
-        Creates a subscription to the ROOT contract messages and start message processing
-        :param callback: async function with signature (context: Any, result: bool)
+    async def _hook(self, json, metrics=None) -> str:
+        '''
+        :param metrics: metrics for the verification time, if enabled
+        :return: `verified`, `rejected`, `error`, `duplicate` or `unknown` (no such session)
+        '''
+        if 'seq' not in json:
+            return 'unknown'
+        seq = json['seq']
+        cached = await self.cache.aget(seq)
+        if cached is None:
+            return 'unknown'
+        self._scanned(seq)
+        try:
+            pin = cached['pin']
+            public_key = json['public_key']
+            wallet_address = json['wallet_address']
+            signed_message = json['signed_message']
+
+            if metrics is not None:
+                start = time.perf_counter()
+            verified = await self.verifier.verify(
+                rand=cached['rand'],
+                pin=pin,
+                signed_message=signed_message,
+                public_key=public_key)
+            if metrics is not None:
+                metrics.observe('verify_seconds', time.perf_counter() - start,
+                                engine=type(self.verifier).__name__)
+
+            if verified:
+                log.debug('Check passed')
+                if await self.cache.apop(seq) is None:
+                    # Another worker has already completed or expired the session
+                    return 'duplicate'
+                self._exec_callback(
+                    cached,
+                    public_key=public_key,
+                    wallet_address=wallet_address,
+                    result=True
+                )
+                return 'verified'
+            log.debug('Randoms are NOT equal')
+            self._exec_callback(cached, result=False)
+            return 'rejected'
+
+        except Exception:
+            log.error(f'Check sign error: {sys.exc_info()[1]}')
+            self._exec_callback(cached, result=False)
+            return 'error'
+
+    async def init(self, callback: Callable = None) -> None:
+        '''
+        Creates a subscription to the messages of ROOT contracts of all tenants
+        and start message processing
+        :param callback: async function with signature (context: Any, result: bool),
+            may be omitted if results are awaited on the handles of `start_session`
         '''
         self._callback = callback
-        root_address = await self.get_root_address()
-
-        def save_message(response_data, response_type, *args):
-            if response_type == SubscriptionResponseType.OK:
-                _id = response_data['result']['id']
-                wallet_address = response_data['result']['src']
-                boc = response_data['result']['boc']
-                self.messages[_id] = (wallet_address, boc)
-
-        self._subscription = await self.cfg.client.net.subscribe_collection(
-            params=ParamsOfSubscribeCollection(
-                collection='messages',
-                result='src id boc',
-                filter={'dst': {'eq': root_address}}
-            ),
-            callback=save_message
-        )
-        self._task = asyncio.create_task(self._handle_messages(1))
+        tenants = list(self.tenants)
+        root_addresses = await asyncio.gather(
+            *(self.get_root_address(tenant) for tenant in tenants))
+        self._tenant_by_address = dict(zip(root_addresses, tenants))
+        loop = asyncio.get_running_loop()
+
+        result = self.cfg.message_result
+        if len(root_addresses) > 1 and 'dst' not in result.split():
+            # Messages are routed to tenants by the ROOT contract address
+            result += ' dst'
+        self._subscription = Subscription(
+            self.cfg.client,
+            collection='messages',
+            filter=self.message_filter(*root_addresses),
+            result=result,
+            on_item=lambda message: self.messages.put_threadsafe(message, loop),
+            backoff_min=self.cfg.subscription_backoff_min_sec,
+            backoff_max=self.cfg.subscription_backoff_max_sec,
+            page_size=self.cfg.subscription_page_size,
+            seen_capacity=self.cfg.subscription_seen_ids)
+        # With the BLOCK policy the subscription is stopped while the queue is full
+        self.messages.on_blocked = self._subscription.pause
+        self.messages.on_unblocked = self._subscription.resume
+        await self._subscription.start()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._expire_sessions())
+        self._message_tasks = [
+            asyncio.create_task(self._handle_messages())
+            for _ in range(self.cfg.message_workers)
+        ]
         self._is_subscribed = True
 
+    def message_filter(self, *root_addresses: str) -> dict:
+        '''
+        Narrows the subscription to the ROOT contract messages on the server side:
+        only internal messages (the DeBot calls `proveOwnership` from a wallet),
+        not older than MESSAGE_MAX_AGE_SEC at the moment of subscription
+        :param root_addresses: addresses of the ROOT contracts
+        :return: GraphQL filter of the `messages` collection
+        '''
+        if len(root_addresses) == 1:
+            message_filter = {'dst': {'eq': root_addresses[0]}}
+        else:
+            message_filter = {'dst': {'in': list(root_addresses)}}
+        if self.cfg.message_internal_only:
+            message_filter['msg_type'] = {'eq': MSG_TYPE_INTERNAL}
+        if self.cfg.message_max_age_sec > 0:
+            message_filter['created_at'] = {
+                'ge': int(time.time()) - self.cfg.message_max_age_sec
+            }
+        return message_filter
+
     async def close(self) -> None:
         '''
         Remove subscription and stop ROOT contract message processing
         '''
         if self._subscription is not None:
-            await self.cfg.client.net.unsubscribe(params=self._subscription)
+            await self._subscription.close()
         if self._task is not None:
             self._task.cancel()
+        for task in self._message_tasks:
+            task.cancel()
+        self._message_tasks = []
+        self.messages.clear()
+        self.renderer.close()
+        self.verifier.close()
+        self.cache.close()
 
-    async def _handle_messages(self, period: int) -> None:
+    def _rearm(self, deadline) -> None:
         '''
-        This function periodically checks and process incoming messages.
-        If the message contains a signed 'random', then the 'random' is compared with one from the cache,
-        and a callback with the result of comparision is called.
-        :param period: time interval for checking the message queue
+        Wakes up the expiration task if a session expires earlier than it planned to wake up
+        :param deadline: deadline of the added session (the earliest one of a batch)
+        '''
+        if self._wakeup is None:
+            return
+        if self._armed_deadline is None or deadline < self._armed_deadline:
+            self._wakeup.set()
+
+    async def _expire_sessions(self) -> None:
+        '''
+        This function sleeps until the nearest session deadline (or until an earlier
+        one is added by `start_authentication`), then executes the callback with
+        a negative result for all sessions expired by that moment.
         '''
 
         while self._is_subscribed:
             try:
-                log.debug("Checking...")
-                obsolete_contexts = self.cache.clean_obsolete()
-                for context in obsolete_contexts:
+                for session in await self.cache.apop_expired():
                     log.debug('Executing callback with obsolete context')
-                    asyncio.create_task(self._callback(context, False))
+                    if self.metrics is not None:
+                        self.metrics.inc('sessions_expired_total', tenant=session.get('tenant'))
+                    self._exec_callback(session, state=EXPIRED, result=False)
+                self._expire_handles()
 
-                if len(self.messages) > 0:
-                    # _, (wallet_address, boc) = self.messages.popitem()
-                    # Next code temporary removed as unused
+                self._wakeup.clear()
+                self._armed_deadline = await self.cache.anext_deadline()
+                if self._handle_deadlines and (
+                        self._armed_deadline is None
+                        or self._handle_deadlines[0][0] < self._armed_deadline):
+                    self._armed_deadline = self._handle_deadlines[0][0]
+                timeout = None
+                if self._armed_deadline is not None:
+                    timeout = max(0, self._armed_deadline - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
                     pass
+
+            except asyncio.CancelledError:
+                log.debug('OK. Session expiration is canceled')
+                self._is_subscribed = False
+                raise
+            except Exception:
+                log.error(f'Unexpected error: {sys.exc_info()[1]}')
+                raise
+
+    def _expire_handles(self) -> None:
+        '''
+        Moves the handles past their deadline to `expired`. Their sessions may have been
+        popped from a shared store by another process, which executed the callback
+        '''
+        now = time.time()
+        deadlines = self._handle_deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, seq = heapq.heappop(deadlines)
+            handle = self._sessions.pop(seq, None)
+            if handle is not None:
+                handle.set_state(EXPIRED)
+
+    async def handle_message(self, message: dict) -> None:
+        '''
+        Authenticates a user who has sent the signed random value to the ROOT contract
+        through the DeBot: `proveOwnership(signedOTP)`, where `signedOTP` is the random value
+        (followed by the pin, if any) signed by a custodian of the sender wallet.
+        Messages not related to authorization are discarded before decoding.
+        :param message: message with `src` and either `body` or `boc`
+        '''
+        client = self.cfg.client
+        wallet_address = message.get('src')
+        if not wallet_address:
+            # External messages, e.g. the ROOT contract management
+            return
+
+        if 'body' in message:
+            body = message['body']
+        else:
+            body = (await client.boc.parse_message(
+                params=ParamsOfParse(boc=message['boc']))).parsed['body']
+        if body is None:
+            return
+
+        function_id = body_function_id(body)
+        if function_id is not None:
+            if self._prove_ownership_id is None:
+                self._prove_ownership_id = await self._function_id('proveOwnership')
+            if function_id != self._prove_ownership_id:
+                return
+
+        decoded = await client.abi.decode_message_body(
+            params=ParamsOfDecodeMessageBody(
+                abi=self.cfg.root_interface_abi, body=body, is_internal=True))
+        if decoded.name != 'proveOwnership':
+            return
+
+        signed = bytes.fromhex(decoded.value['signedOTP'])
+        otp = signed[SIGNATURE_LENGTH:].decode('utf-8')
+        seq = otp[:RANDOM_CHARS]
+        cached = await self.cache.aget(seq)
+        if cached is None:
+            return
+        if 'dst' in message and \
+                self._tenant_by_address.get(message['dst']) != cached.get('tenant'):
+            # Sent to the ROOT contract of another site
+            return
+        self._scanned(seq)
+
+        public_key = await self._find_signer(wallet_address, signed)
+        pin = cached['pin']
+        if public_key is None or otp != cached['rand'] + ('' if pin is None else pin):
+            log.debug('Signed random is NOT valid')
+            self._exec_callback(cached, result=False)
+            return
+
+        log.debug('Check passed')
+        if await self.cache.apop(seq) is None:
+            return
+        self._exec_callback(
+            cached,
+            public_key=public_key,
+            wallet_address=wallet_address,
+            result=True
+        )
+
+    async def _function_id(self, function_name: str) -> int:
+        body = (await self.cfg.client.abi.encode_message_body(
+            params=ParamsOfEncodeMessageBody(
+                abi=self.cfg.root_interface_abi,
+                call_set=CallSet(function_name, input={'signedOTP': ''}),
+                is_internal=True,
+                signer=Signer.NoSigner()))).body
+        return body_function_id(body)
+
+    async def _find_signer(self, wallet_address: str, signed: bytes):
+        '''
+        :return: public key of the wallet custodian who signed the message or None
+        '''
+        for public_key in await self._get_custodians(wallet_address):
+            try:
+                await self.cfg.client.crypto.nacl_sign_open(
+                    params=ParamsOfNaclSignOpen(
+                        signed=hex_to_base64(signed.hex()), public=public_key))
+                return public_key
+            except TonException:
+                continue
+        return None
+
+    async def _get_custodians(self, wallet_address: str) -> List[str]:
+        keys = self.wallet_keys.get(wallet_address)
+        if keys is not None:
+            return keys
+
+        client = self.cfg.client
+        accounts = (await client.net.query_collection(
+            params=ParamsOfQueryCollection(
+                collection='accounts',
+                filter={'id': {'eq': wallet_address}},
+                result='boc'))).result
+        if len(accounts) == 0:
+            raise KeyError(wallet_address)
+        message = (await client.abi.encode_message(
+            params=ParamsOfEncodeMessage(
+                abi=self.cfg.multisig_abi,
+                address=wallet_address,
+                call_set=CallSet('getCustodians'),
+                signer=Signer.NoSigner()))).message
+        output = (await client.tvm.run_tvm(
+            params=ParamsOfRunTvm(
+                message=message,
+                account=accounts[0]['boc'],
+                abi=self.cfg.multisig_abi))).decoded.output
+        keys = [
+            format(int(custodian['pubkey'], 16), '064x')
+            for custodian in output['custodians']
+        ]
+        self.wallet_keys[wallet_address] = keys
+        return keys
+
+    async def _handle_messages(self) -> None:
+        '''
+        Consumes messages sent to the ROOT contract as they arrive,
+        several consumers decode messages concurrently
+        '''
+        while True:
+            try:
+                message = await self.messages.get()
+                log.debug(f'Message {message.get("id")} from {message.get("src")}')
+                if self.metrics is None:
+                    await self.handle_message(message)
                 else:
-                    await asyncio.sleep(period)
+                    start = time.perf_counter()
+                    await self.handle_message(message)
+                    self.metrics.observe('message_seconds', time.perf_counter() - start)
 
             # We subscribed to all messages to the ROOT contract,
             # not them all are related to authorization, and
             # sometimes our validation code will fail
             except (KeyError, AttributeError, ValueError, TonException):
-                asyncio.sleep(0)
+                pass
             except asyncio.CancelledError:
                 log.debug('OK. Message handling is canceled')
-                self._is_subscribed = False
-            except:
-                log.error(f'Unexpected error: {sys.exc_info()[1]}')
                 raise
+            except Exception:
+                log.error(f'Unexpected error: {sys.exc_info()[1]}')
@@ -1,41 +1,134 @@
 import time
+import asyncio
+from functools import partial
 from typing import Any
 
+from torauth.stores import MemoryStore
+
 
 class Cache:
     ''' Inner cache for registered callbacks '''
 
-    def __init__(self):
-        self.data = {}
+    def __init__(self, store=None):
+        '''
+        :param store: session store (see `torauth.stores`), in-memory by default
+        '''
+        self.store = MemoryStore() if store is None else store
+        self._executor = None
 
-    def add(self, seq, webhook_url: str, pin: str, retention_sec: int, rand: str, context: Any) -> None:
+    def add(self, seq, webhook_url: str, pin: str, retention_sec: int, rand: str, context: Any,
+            tenant: str = None) -> None:
         '''
         Saves data in a dictionary
         : param seq: random id
         : param webhook_url: user public key
         : param context: serializable context
         : param retention_sec: time period to keep data
+        : param tenant: the site (ROOT contract) the session belongs to
         '''
-        self.data[seq] = {
+        timestamp = time.time()
+        self.store.put(seq, {
             'webhook_url': webhook_url,
             'pin': pin,
             'context': context,
             'rand': rand,
-            'timestamp': time.time(),
+            'tenant': tenant,
+            'timestamp': timestamp,
             'retention_sec': retention_sec
-        }
+        }, timestamp + retention_sec)
+
+    def add_many(self, sessions) -> None:
+        '''
+        Saves several entries at once
+        :param sessions: iterable of dictionaries with `add` arguments
+        '''
+        timestamp = time.time()
+        self.store.put_many(
+            (s['seq'], {
+                'webhook_url': s['webhook_url'],
+                'pin': s['pin'],
+                'context': s['context'],
+                'rand': s['rand'],
+                'tenant': s.get('tenant'),
+                'timestamp': timestamp,
+                'retention_sec': s['retention_sec']
+            }, timestamp + s['retention_sec'])
+            for s in sessions
+        )
 
     def clean_obsolete(self):
-        obsolete_contexts = []
-        for k in list(self.data):
-            v = self.data[k]
-            if v['timestamp'] + v['retention_sec'] < time.time():
-                obsolete_contexts.append(v['context'])
-                del self.data[k]
-        return obsolete_contexts
+        '''
+        Removes expired entries, touching only those whose deadline has passed
+        :return: list of contexts of the removed entries, ordered by deadline
+        '''
+        return [v['context'] for v in self.pop_expired()]
+
+    def pop_expired(self):
+        '''
+        Removes expired entries
+        :return: list of the removed entries, ordered by deadline
+        '''
+        return self.store.pop_expired(time.time())
+
+    def next_deadline(self):
+        '''
+        :return: the earliest expiration time (as `time.time()`) or None if the cache is empty
+        '''
+        return self.store.next_deadline()
 
     def get(self, key):
-        return self.data.get(key)
+        return self.store.get(key)
+
+    def pop(self, key):
+        '''
+        Atomically gets and removes an entry
+        :return: the entry or None, if it was already removed (maybe by another worker)
+        '''
+        return self.store.pop(key)
 
     def remove(self, key):
-        return self.data.pop(key)
+        value = self.store.pop(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __len__(self):
+        return len(self.store)
+
+    # The same operations for the event loop: calls of a blocking store (SQLite, Redis)
+    # run in a worker thread, so a slow round trip or a lock wait doesn't stall webhooks
+
+    async def aadd(self, **kwargs) -> None:
+        await self._run(partial(self.add, **kwargs))
+
+    async def aadd_many(self, sessions) -> None:
+        await self._run(partial(self.add_many, sessions))
+
+    async def aget(self, key):
+        return await self._run(partial(self.get, key))
+
+    async def apop(self, key):
+        return await self._run(partial(self.pop, key))
+
+    async def apop_expired(self):
+        return await self._run(self.pop_expired)
+
+    async def anext_deadline(self):
+        return await self._run(self.next_deadline)
+
+    def close(self) -> None:
+        '''
+        Stops the worker thread, it is started again on the next call
+        '''
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _run(self, call):
+        if not self.store.blocking:
+            return call()
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            # Stores serialize their calls, one thread is enough
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix='torauth-store')
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
@@ -2,8 +2,6 @@ import os
 import re
 import base64
 import logging
-from dotenv import load_dotenv
-from tonclient.client import TonClient
 from tonclient.types import Abi, KeyPair, ClientConfig
 
 log = logging.getLogger(__name__)
@@ -13,9 +11,9 @@ def onlydigits(string):
     return re.sub('[^0-9]', '', string)
 
 
-def get_var(name):
-    # All variables MUST be set
-    value = os.getenv(name)
+def get_var(name, default=None):
+    # All variables MUST be set, unless they have a default value
+    value = os.getenv(name, default)
     log.debug(f'{name} = {value}')
     if value is None:
         raise TypeError(f'Variable not set {name}')
@@ -26,44 +24,114 @@ def fullPath(fname):
     return os.path.join(os.path.dirname(__file__), get_var(fname))
 
 
+# Contents of env, ABI and TVC files shared by all Config instances: path -> (mtime, content)
+_files = {}
+# TonClient instances shared by all Config instances: server address -> client
+_clients = {}
+
+
+def _cached_file(path, load):
+    mtime = os.stat(path).st_mtime_ns
+    cached = _files.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, load(path))
+        _files[path] = cached
+    return cached[1]
+
+
+def _read_abi(path):
+    return Abi.from_path(path)
+
+
+def _read_tvc(path):
+    with open(path, 'rb') as fp:
+        return base64.b64encode(fp.read()).decode()
+
+
+def shared_client(server_address: str):
+    '''
+    :return: TonClient connected to the server, one per process
+    '''
+    if server_address not in _clients:
+        # The native library is loaded with the first client
+        from tonclient.client import TonClient
+
+        client_config = ClientConfig()
+        client_config.network.server_address = server_address
+        _clients[server_address] = TonClient(
+            config=client_config,  is_core_async=True, is_async=True)
+    return _clients[server_address]
+
+
+class _Loaded:
+    '''
+    Config attribute loaded on the first access, then kept in the instance
+    '''
+
+    def __init__(self, var, load):
+        self.var = var
+        self.load = load
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = _cached_file(instance._paths[self.var], self.load)
+        instance.__dict__[self.name] = value
+        return value
+
+
 class Config:
 
     ''' Authentificator configuration '''
 
+    # ABIs and TVCs are read when they are used the first time,
+    # an auth-only worker reads just ROOT and root interface ones
+    root_abi = _Loaded('ROOT_ABI', _read_abi)
+    wallet_abi = _Loaded('WALLET_ABI', _read_abi)
+    giver_abi = _Loaded('GIVER_ABI', _read_abi)
+    multisig_abi = _Loaded('MULTISIG_ABI', _read_abi)
+    root_interface_abi = _Loaded('ROOT_INTERFACE_ABI', _read_abi)
+    wallet_tvc = _Loaded('WALLET_TVC', _read_tvc)
+    root_tvc = _Loaded('ROOT_TVC', _read_tvc)
+    giver_tvc = _Loaded('GIVER_TVC', _read_tvc)
+    multisig_tvc = _Loaded('MULTISIG_TVC', _read_tvc)
+
     def __init__(self, filename=None):
         if filename is None:
             filename = os.path.join(os.path.dirname(__file__), 'env.default')
 
         self._from_file(filename)
 
+    @property
+    def client(self):
+        if '_client' not in self.__dict__:
+            self._client = shared_client(self.server_address)
+        return self._client
+
+    @client.setter
+    def client(self, client) -> None:
+        self._client = client
+
     def _from_file(self, path):
         if os.path.isfile(path) == False:
             log.debug(f'File "{path}" not exists, but maybe that is OK')
-
-        load_dotenv(path)
-        self.root_abi = Abi.from_path(fullPath('ROOT_ABI'))
-        self.wallet_abi = Abi.from_path(fullPath('WALLET_ABI'))
-        self.giver_abi = Abi.from_path(fullPath('GIVER_ABI'))
-        self.multisig_abi = Abi.from_path(fullPath('MULTISIG_ABI'))
-        self.root_interface_abi = Abi.from_path(fullPath('ROOT_INTERFACE_ABI'))
-
-        with open(fullPath('WALLET_TVC'), 'rb') as fp:
-            self.wallet_tvc = base64.b64encode(fp.read()).decode()
-
-        with open(fullPath('ROOT_TVC'), 'rb') as fp:
-            self.root_tvc = base64.b64encode(fp.read()).decode()
-
-        with open(fullPath('GIVER_TVC'), 'rb') as fp:
-            self.giver_tvc = base64.b64encode(fp.read()).decode()
-
-        with open(fullPath('MULTISIG_TVC'), 'rb') as fp:
-            self.multisig_tvc = base64.b64encode(fp.read()).decode()
-
-        client_config = ClientConfig()
-        client_config.network.server_address = get_var('TON_SERVER_ADDRESS')
-
-        self.client = TonClient(
-            config=client_config,  is_core_async=True, is_async=True)
+        else:
+            from dotenv import dotenv_values
+            # Same as load_dotenv, but the file is parsed once
+            for name, value in _cached_file(path, dotenv_values).items():
+                if value is not None:
+                    os.environ.setdefault(name, value)
+        self._paths = {
+            name: fullPath(name) for name in (
+                'ROOT_ABI', 'WALLET_ABI', 'GIVER_ABI', 'MULTISIG_ABI', 'ROOT_INTERFACE_ABI',
+                'WALLET_TVC', 'ROOT_TVC', 'GIVER_TVC', 'MULTISIG_TVC'
+            )
+        }
+
+        self.server_address = get_var('TON_SERVER_ADDRESS')
 
         self.giver_keys = KeyPair(
             public=get_var('GIVER_PUBLIC'),
@@ -71,6 +139,8 @@ class Config:
         )
 
         self.giver_address = get_var('GIVER_ADDRESS')
+        # Giver messages processed at once, credits are queued and combined meanwhile
+        self.giver_max_in_flight = int(get_var('GIVER_MAX_IN_FLIGHT', '1'))
 
         self.root_public = get_var('ROOT_PUBLIC')
         self.root_secret = get_var('ROOT_SECRET')
@@ -81,3 +151,57 @@ class Config:
         )
 
         self.deep_link_url = get_var('DEEP_LINK_URL')
+
+        # Calculated contract addresses are saved to this file (empty - kept in memory only)
+        self.address_cache_path = get_var('ADDRESS_CACHE_PATH', '')
+
+        # Sessions are shared by workers when stored in sqlite or redis
+        self.session_store = get_var('SESSION_STORE', 'memory://')
+
+        # Messages to the ROOT contract waiting to be processed
+        self.message_queue_capacity = int(get_var('MESSAGE_QUEUE_CAPACITY', '10000'))
+        self.message_queue_overflow = get_var('MESSAGE_QUEUE_OVERFLOW', 'drop_oldest')
+        # Fields of the messages to the ROOT contract requested from the server,
+        # `body` is enough, `boc` is parsed if `body` is not requested
+        self.message_result = get_var('MESSAGE_RESULT', 'id src body')
+        # Server-side filters: internal messages only, not older than (0 - any age)
+        self.message_internal_only = \
+            get_var('MESSAGE_INTERNAL_ONLY', 'true').lower() in ('1', 'true', 'yes')
+        self.message_max_age_sec = int(get_var('MESSAGE_MAX_AGE_SEC', '0'))
+        # The subscription is restored after a disconnect with exponential backoff,
+        # messages missed meanwhile are fetched by pages, recently seen ids are skipped
+        self.subscription_backoff_min_sec = float(get_var('SUBSCRIPTION_BACKOFF_MIN_SEC', '1'))
+        self.subscription_backoff_max_sec = float(get_var('SUBSCRIPTION_BACKOFF_MAX_SEC', '60'))
+        self.subscription_page_size = int(get_var('SUBSCRIPTION_PAGE_SIZE', '50'))
+        self.subscription_seen_ids = int(get_var('SUBSCRIPTION_SEEN_IDS', '10000'))
+        # Number of coroutines decoding the messages concurrently
+        self.message_workers = int(get_var('MESSAGE_WORKERS', '4'))
+        # Cached custodian keys of the wallets: number of wallets and lifetime
+        self.custodian_cache_size = int(get_var('CUSTODIAN_CACHE_SIZE', '10000'))
+        self.custodian_cache_ttl_sec = float(get_var('CUSTODIAN_CACHE_TTL_SEC', '60'))
+
+        # QR codes are rendered in worker threads, or processes if their number is set
+        self.qr_render_workers = int(get_var('QR_RENDER_WORKERS', '0'))
+        self.qr_render_executor = get_var(
+            'QR_RENDER_EXECUTOR', 'process' if self.qr_render_workers > 0 else 'thread')
+        self.qr_render_max_pending = int(get_var('QR_RENDER_MAX_PENDING', '0'))
+
+        # QR code parameters, see `gen_qr_code`
+        self.qr_format = get_var('QR_FORMAT', 'png')
+        self.qr_version = int(get_var('QR_VERSION', '1'))
+        self.qr_box_size = int(get_var('QR_BOX_SIZE', '10'))
+        self.qr_border = int(get_var('QR_BORDER', '4'))
+        self.qr_error_correction = get_var('QR_ERROR_CORRECTION', 'L')
+        # Webhook signatures are verified in-process (local), with TonClient (tonclient),
+        # or in-process if PyNaCl or cryptography is installed (auto)
+        self.verify_engine = get_var('VERIFY_ENGINE', 'auto')
+        # Local verifications are collected in batches of up to this size,
+        # waiting no longer than the window
+        self.verify_batch_size = int(get_var('VERIFY_BATCH_SIZE', '1'))
+        self.verify_batch_window_ms = float(get_var('VERIFY_BATCH_WINDOW_MS', '2'))
+        # Local verification runs inline, in threads or in processes
+        self.verify_executor = get_var('VERIFY_EXECUTOR', 'inline')
+        self.verify_workers = int(get_var('VERIFY_WORKERS', '0')) or None
+
+        # Omit `seq` from the deep link, as it is equal to the random value
+        self.qr_compact = get_var('QR_COMPACT', 'false').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,141 @@
+import asyncio
+from collections import deque
+
+# Overflow policies
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+BLOCK = 'block'
+
+
+class MessageQueue:
+    ''' Bounded queue of incoming messages with counters of dropped and processed ones '''
+
+    def __init__(self, capacity: int = 10000, overflow: str = DROP_OLDEST):
+        '''
+        :param capacity: maximal number of queued messages
+        :param overflow: what to do with a new message when the queue is full:
+            drop the oldest queued one, drop the new one, or block the producer
+        '''
+        if overflow not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError(f'Unknown overflow policy {overflow}')
+        self.capacity = capacity
+        self.overflow = overflow
+        self.dropped = 0
+        self.processed = 0
+        self._items = deque()
+        self._getters = deque()
+        self._putters = deque()
+        # Items of `put_threadsafe` waiting for a free slot, in the order of arrival
+        self._pending = deque()
+        # Called when items of `put_threadsafe` start waiting for a free slot and when
+        # all of them are queued, e.g. to pause the producer, set by Authenticator
+        self.on_blocked = None
+        self.on_unblocked = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def full(self) -> bool:
+        return len(self._items) >= self.capacity
+
+    def put_nowait(self, item) -> bool:
+        '''
+        :return: False if the item was dropped
+        :raise asyncio.QueueFull: if the queue is full and the policy is BLOCK
+        '''
+        if self.full():
+            if self.overflow == DROP_NEWEST:
+                self.dropped += 1
+                return False
+            if self.overflow == DROP_OLDEST:
+                self._items.popleft()
+                self.dropped += 1
+            else:
+                raise asyncio.QueueFull
+        self._items.append(item)
+        self._wakeup(self._getters)
+        return True
+
+    async def put(self, item) -> bool:
+        '''
+        Waits for a free slot if the policy is BLOCK
+        :return: False if the item was dropped
+        '''
+        while self.overflow == BLOCK and self.full():
+            await self._wait(self._putters)
+        return self.put_nowait(item)
+
+    def put_threadsafe(self, item, loop) -> None:
+        '''
+        Puts an item from any thread, e.g. from a TonClient callback. The calling thread
+        never waits: with the BLOCK policy items wait for a free slot in the event loop,
+        and `on_blocked` is called to stop the producer meanwhile
+        '''
+        put = self.put_nowait if self.overflow != BLOCK else self._put_later
+        try:
+            in_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            put(item)
+        else:
+            loop.call_soon_threadsafe(put, item)
+
+    def _put_later(self, item) -> None:
+        if not self._pending and not self.full():
+            self.put_nowait(item)
+            return
+        # Items queue up behind the already waiting ones, `get_nowait` moves them
+        self._pending.append(item)
+        if len(self._pending) == 1 and self.on_blocked is not None:
+            self.on_blocked()
+
+    def get_nowait(self):
+        '''
+        :raise asyncio.QueueEmpty: if there are no messages
+        '''
+        if not self._items:
+            raise asyncio.QueueEmpty
+        item = self._items.popleft()
+        self.processed += 1
+        if self._pending:
+            self._items.append(self._pending.popleft())
+            if not self._pending and self.on_unblocked is not None:
+                self.on_unblocked()
+        else:
+            self._wakeup(self._putters)
+        return item
+
+    async def get(self):
+        ''' Waits for a message '''
+        while not self._items:
+            await self._wait(self._getters)
+        return self.get_nowait()
+
+    def clear(self) -> None:
+        self.dropped += len(self._items) + len(self._pending)
+        self._items.clear()
+        self._pending.clear()
+        while self._putters:
+            self._wakeup(self._putters)
+
+    async def _wait(self, waiters):
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in waiters:
+                waiters.remove(waiter)
+            # Pass the wake-up to the next waiter
+            if waiter.done() and not waiter.cancelled():
+                self._wakeup(waiters)
+            raise
+
+    @staticmethod
+    def _wakeup(waiters):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
@@ -0,0 +1,75 @@
+import time
+import asyncio
+from functools import partial
+
+
+EXECUTORS = ('inline', 'thread', 'process')
+
+
+class QrRenderer:
+    ''' Renders QR codes inline, in worker threads or in a pool of worker processes '''
+
+    def __init__(self, workers: int = 0, max_pending: int = 0, executor: str = None):
+        '''
+        :param workers: size of the pool, 0 - the default executor of the loop for threads,
+            as many processes as CPUs for processes
+        :param max_pending: how many QR codes may be rendered or queued at once,
+            further callers wait for a free slot. 0 means no limit
+        :param executor: `inline` (in the event loop), `thread` or `process`,
+            by default processes if `workers` is set, otherwise threads
+        '''
+        if executor is None:
+            executor = 'process' if workers > 0 else 'thread'
+        if executor not in EXECUTORS:
+            raise ValueError(f'Unknown QR rendering executor {executor}')
+        self.executor = executor
+        self.workers = workers
+        self.max_pending = max_pending
+        # `torauth.metrics.Metrics` for the render time, set by Authenticator
+        self.metrics = None
+        self._executor = None
+        self._semaphore = None
+
+    async def render(self, **kwargs) -> str:
+        '''
+        Renders a QR code, see `gen_qr_code` for arguments
+        :return: QR code encoded as base64 string
+        '''
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter()
+        if self.max_pending <= 0:
+            qr_code = await self._render(kwargs)
+        else:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.max_pending)
+            async with self._semaphore:
+                qr_code = await self._render(kwargs)
+        if metrics is not None:
+            metrics.observe('qr_render_seconds', time.perf_counter() - start,
+                            format=kwargs.get('qr_format'))
+        return qr_code
+
+    def close(self) -> None:
+        '''
+        Stops workers, they are started again on the next render
+        '''
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._semaphore = None
+
+    async def _render(self, kwargs):
+        # qrcode is imported with the first QR code
+        from torauth.gen_qr_code import gen_qr_code
+        if self.executor == 'inline':
+            return gen_qr_code(**kwargs)
+        if self._executor is None:
+            if self.executor == 'process':
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(self.workers or None)
+            elif self.workers > 0:
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(self.workers)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(gen_qr_code, **kwargs))
@@ -0,0 +1,263 @@
+import zlib
+import struct
+from bisect import bisect_left
+
+import qrcode
+from qrcode import util, base
+
+
+class QrTemplate:
+    '''
+    Precomputed parts of QR codes whose data differ only in a fixed-length middle part:
+    the data segment header with the static prefix and suffix, the padding,
+    the modules of function patterns and format information, the order and the mask
+    of data modules, PNG headers and border rows.
+    Only the per-session data bits, error correction codewords and masking are
+    computed for each QR code.
+    '''
+
+    def __init__(
+        self,
+        prefix: bytes,
+        suffix: bytes,
+        variable_length: int,
+        version: int = 1,
+        error_correction: int = qrcode.constants.ERROR_CORRECT_L,
+        box_size: int = 10,
+        border: int = 4,
+        mask_pattern: int = None
+    ):
+        '''
+        :param prefix, suffix: static parts of the data
+        :param variable_length: length in bytes of the part between them
+        :param version: minimal QR version, grows to fit the data
+        :param mask_pattern: by default the best pattern for a sample data is chosen
+        '''
+        self.prefix = prefix
+        self.suffix = suffix
+        self.variable_length = variable_length
+        self.box_size = box_size
+        self.border = border
+        length = len(prefix) + variable_length + len(suffix)
+        self.version = self._fit(length, version, error_correction)
+        self.size = self.version * 4 + 17
+
+        self._setup_data(length, error_correction)
+        self._setup_modules(error_correction, mask_pattern)
+        self._setup_png()
+
+    def modules(self, variable: bytes) -> list:
+        '''
+        :param variable: the middle part of the data, `variable_length` bytes
+        :return: QR matrix as a list of rows of booleans, without border
+        '''
+        if len(variable) != self.variable_length:
+            raise ValueError(
+                f'Expected {self.variable_length} bytes, got {len(variable)}')
+        data = (self._head << self._variable_shift) | \
+            (int.from_bytes(variable, 'big') << self._tail_bits) | self._tail
+        codewords = self._add_error_correction(data.to_bytes(self._data_count, 'big'))
+        stream = int.from_bytes(codewords, 'big') << self._remainder_bits
+
+        modules = [row[:] for row in self._base]
+        bits = format(stream ^ self._mask, self._positions_format)
+        for (row, col), bit in zip(self._positions, bits):
+            modules[row][col] = bit == '1'
+        return modules
+
+    def png(self, modules: list) -> bytes:
+        '''
+        :param modules: QR matrix returned by `modules`
+        :return: black and white PNG image
+        '''
+        scanlines = [self._border_rows]
+        border = self._border_bits
+        for row in modules:
+            bits = (border + ''.join(['0' if m else '1' for m in row]) + border).translate(self._scale)
+            line = b'\0' + int(bits + self._padding, 2).to_bytes(self._row_bytes, 'big')
+            scanlines.append(line * self.box_size)
+        scanlines.append(self._border_rows)
+        return self._png_head + _chunk(b'IDAT', zlib.compress(b''.join(scanlines))) + self._png_tail
+
+    @staticmethod
+    def _fit(length, version, error_correction):
+        # Smallest version not less than `version` fitting one 8-bit segment
+        while True:
+            needed = 4 + util.length_in_bits(util.MODE_8BIT_BYTE, version) + length * 8
+            fit = bisect_left(util.BIT_LIMIT_TABLE[error_correction], needed, version)
+            if fit > 40:
+                raise qrcode.exceptions.DataOverflowError()
+            if util.length_in_bits(util.MODE_8BIT_BYTE, fit) == \
+                    util.length_in_bits(util.MODE_8BIT_BYTE, version):
+                return fit
+            version = fit
+
+    def _setup_data(self, length, error_correction):
+        # Data codewords are `head | variable | tail` as one big integer
+        rs_blocks = base.rs_blocks(self.version, error_correction)
+        self._blocks = [(b.data_count, b.total_count - b.data_count) for b in rs_blocks]
+        self._data_count = sum(data_count for data_count, _ in self._blocks)
+        self._generators = {
+            ec_count: _generator_logs(ec_count) for _, ec_count in self._blocks
+        }
+
+        count_bits = util.length_in_bits(util.MODE_8BIT_BYTE, self.version)
+        head_bits = 4 + count_bits + len(self.prefix) * 8
+        self._head = (((util.MODE_8BIT_BYTE << count_bits) | length) << len(self.prefix) * 8) | \
+            int.from_bytes(self.prefix, 'big')
+
+        bit_limit = self._data_count * 8
+        used = head_bits + (self.variable_length + len(self.suffix)) * 8
+        terminator = min(bit_limit - used, 4)
+        delimit = -(used + terminator) % 8
+        pad_count = (bit_limit - used - terminator - delimit) // 8
+        pad = bytes(util.PAD0 if i % 2 == 0 else util.PAD1 for i in range(pad_count))
+
+        self._tail_bits = len(self.suffix) * 8 + terminator + delimit + pad_count * 8
+        self._tail = (int.from_bytes(self.suffix, 'big') << (terminator + delimit + pad_count * 8)) | \
+            int.from_bytes(pad, 'big')
+        self._variable_shift = self.variable_length * 8 + self._tail_bits
+
+    def _add_error_correction(self, data):
+        # Reed-Solomon codewords for each block, then data and EC codewords interleaved
+        data_blocks = []
+        ec_blocks = []
+        offset = 0
+        for data_count, ec_count in self._blocks:
+            block = data[offset:offset + data_count]
+            offset += data_count
+            data_blocks.append(block)
+            ec_blocks.append(_rs_remainder(block, self._generators[ec_count]))
+
+        out = bytearray()
+        for blocks in (data_blocks, ec_blocks):
+            for i in range(max(len(block) for block in blocks)):
+                for block in blocks:
+                    if i < len(block):
+                        out.append(block[i])
+        return bytes(out)
+
+    def _setup_modules(self, error_correction, mask_pattern):
+        self._base = function_patterns(self.version, error_correction, 0)
+        self._positions = data_positions(self._base)
+        self._positions_format = '0{}b'.format(len(self._positions))
+        self._remainder_bits = len(self._positions) - sum(
+            data_count + ec_count for data_count, ec_count in self._blocks) * 8
+
+        if mask_pattern is None:
+            mask_pattern = self._best_mask_pattern(error_correction)
+        self.mask_pattern = mask_pattern
+        self._base = function_patterns(self.version, error_correction, mask_pattern)
+        self._mask = data_mask(self._positions, mask_pattern)
+
+    def _best_mask_pattern(self, error_correction):
+        # Masks are rated on a sample data, all QR codes of the template share the result
+        sample = bytes((i * 37 + 11) % 256 for i in range(self.variable_length))
+        lost_points = []
+        for mask_pattern in range(8):
+            self._base = function_patterns(self.version, error_correction, mask_pattern)
+            self._mask = data_mask(self._positions, mask_pattern)
+            lost_points.append(util.lost_point(self.modules(sample)))
+        return lost_points.index(min(lost_points))
+
+    def _setup_png(self):
+        width = (self.size + 2 * self.border) * self.box_size
+        self._row_bytes = (width + 7) // 8
+        # A module is scaled to `box_size` pixels, rows are padded to whole bytes
+        self._scale = str.maketrans({'0': '0' * self.box_size, '1': '1' * self.box_size})
+        self._border_bits = '1' * self.border
+        self._padding = '0' * (self._row_bytes * 8 - width)
+        white_row = b'\0' + int('1' * width + self._padding, 2).to_bytes(self._row_bytes, 'big')
+        self._border_rows = white_row * (self.border * self.box_size)
+
+        # 1-bit grayscale
+        self._png_head = b'\x89PNG\r\n\x1a\n' + \
+            _chunk(b'IHDR', struct.pack('>IIBBBBB', width, width, 1, 0, 0, 0, 0))
+        self._png_tail = _chunk(b'IEND', b'')
+
+
+def function_patterns(version: int, error_correction: int, mask_pattern: int) -> list:
+    '''
+    :return: QR matrix with the function patterns and format information,
+        data modules are None
+    '''
+    size = version * 4 + 17
+    qr = qrcode.QRCode(version=version, error_correction=error_correction)
+    qr.modules_count = size
+    qr.modules = [[None] * size for _ in range(size)]
+    qr.setup_position_probe_pattern(0, 0)
+    qr.setup_position_probe_pattern(size - 7, 0)
+    qr.setup_position_probe_pattern(0, size - 7)
+    qr.setup_position_adjust_pattern()
+    qr.setup_timing_pattern()
+    qr.setup_type_info(False, mask_pattern)
+    if version >= 7:
+        qr.setup_type_number(False)
+    return qr.modules
+
+
+def data_positions(modules: list) -> list:
+    '''
+    :param modules: matrix returned by `function_patterns`
+    :return: (row, col) of data modules in the order of data bits
+    '''
+    # Data modules are placed upwards and downwards in two-column stripes from the right
+    size = len(modules)
+    positions = []
+    row, inc = size - 1, -1
+    col = size - 1
+    while col > 0:
+        if col == 6:
+            col -= 1
+        while 0 <= row < size:
+            for c in (col, col - 1):
+                if modules[row][c] is None:
+                    positions.append((row, c))
+            row += inc
+        row -= inc
+        inc = -inc
+        col -= 2
+    return positions
+
+
+def data_mask(positions: list, mask_pattern: int) -> int:
+    '''
+    :return: mask of the data modules at `positions` as an integer, the first one is
+        the highest bit
+    '''
+    mask_func = util.mask_func(mask_pattern)
+    return int(''.join('1' if mask_func(row, col) else '0' for row, col in positions), 2)
+
+
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + \
+        struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+
+def _generator_logs(ec_count):
+    # Coefficients of prod(x - a^i), i < ec_count, as logarithms, the leading 1 omitted
+    poly = [1]
+    for i in range(ec_count):
+        factor = base.gexp(i)
+        shifted = poly + [0]
+        for j, coef in enumerate(poly):
+            if coef:
+                shifted[j + 1] ^= base.gexp(base.glog(coef) + base.glog(factor))
+        poly = shifted
+    return [base.glog(coef) for coef in poly[1:]]
+
+
+def _rs_remainder(data, generator_logs):
+    exp = base.EXP_TABLE
+    log = base.LOG_TABLE
+    remainder = [0] * len(generator_logs)
+    for byte in data:
+        factor = byte ^ remainder[0]
+        remainder = remainder[1:]
+        remainder.append(0)
+        if factor:
+            factor_log = log[factor]
+            remainder = [
+                r ^ exp[(factor_log + g) % 255] for r, g in zip(remainder, generator_logs)
+            ]
+    return remainder
@@ -0,0 +1,219 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from tonclient.errors import TonException
+from tonclient.types import ParamsOfSubscribeCollection, ParamsOfQueryCollection, \
+    OrderBy, SortDirection, SubscriptionResponseType
+
+log = logging.getLogger(__name__)
+
+
+class Subscription:
+    '''
+    Subscription to a collection which survives disconnects: it is restored with
+    exponential backoff, and items created while it was down are fetched with
+    `query_collection`, page by page, starting from the time of the last seen one.
+    Items are delivered once, ids of the recently delivered ones are remembered.
+    '''
+
+    def __init__(
+        self,
+        client,
+        collection: str,
+        filter: dict,
+        result: str,
+        on_item: Callable,
+        backoff_min: float = 1,
+        backoff_max: float = 60,
+        page_size: int = 50,
+        seen_capacity: int = 10000
+    ):
+        '''
+        :param client: TonClient
+        :param filter, result: as for `subscribe_collection`, `id` and `created_at`
+            are added to the result if they are missing
+        :param on_item: called with each new item, from the TonClient thread
+            or from the event loop
+        :param backoff_min, backoff_max: delays in seconds between reconnection attempts
+        :param page_size: number of items in one backfill request
+        :param seen_capacity: number of remembered ids
+        '''
+        self.client = client
+        self.collection = collection
+        self.filter = filter
+        fields = result.split()
+        self.result = ' '.join(fields + [f for f in ('id', 'created_at') if f not in fields])
+        self.on_item = on_item
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.page_size = page_size
+        self.seen_capacity = seen_capacity
+        self.last_created_at = None
+        self.reconnects = 0
+        self.duplicates = 0
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._handle = None
+        self._loop = None
+        self._reconnect_task = None
+        self._lost_again = False
+        self._closed = False
+        self._paused = False
+        self._pause_task = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._closed = False
+        if self.last_created_at is None:
+            # Nothing is missed before the first subscription
+            self.last_created_at = int(time.time())
+        await self._subscribe()
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        await self._unsubscribe()
+
+    def pause(self) -> None:
+        '''
+        Stops the subscription while the consumer of items can't keep up with them.
+        Items arriving until it is stopped are still delivered
+        '''
+        if self._closed or self._paused:
+            return
+        self._paused = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        self._pause_task = asyncio.create_task(self._unsubscribe())
+
+    def resume(self) -> None:
+        '''
+        Subscribes again after `pause`, the items created meanwhile are fetched
+        '''
+        if not self._paused:
+            return
+        self._paused = False
+        self._reconnect_soon()
+
+    def deliver(self, item: dict) -> bool:
+        '''
+        Passes a new item to `on_item`, skips the already seen ones
+        :return: False if the item is a duplicate
+        '''
+        with self._lock:
+            if item['id'] in self._seen:
+                self.duplicates += 1
+                return False
+            self._seen[item['id']] = None
+            if len(self._seen) > self.seen_capacity:
+                self._seen.popitem(last=False)
+            if item['created_at'] > self.last_created_at:
+                self.last_created_at = item['created_at']
+        self.on_item(item)
+        return True
+
+    async def _subscribe(self) -> None:
+        # Called by TonClient from its own thread
+        def on_response(response_data, response_type, *args):
+            if response_type == SubscriptionResponseType.OK:
+                self.deliver(response_data['result'])
+            elif response_type == SubscriptionResponseType.ERROR:
+                log.warning(f'Subscription error: {response_data}')
+                self._loop.call_soon_threadsafe(self._reconnect_soon)
+            else:
+                log.debug(f'Subscription response {response_type}: {response_data}')
+
+        self._handle = await self.client.net.subscribe_collection(
+            params=ParamsOfSubscribeCollection(
+                collection=self.collection,
+                result=self.result,
+                filter=self.filter
+            ),
+            callback=on_response
+        )
+
+    async def _unsubscribe(self) -> None:
+        handle, self._handle = self._handle, None
+        if handle is not None:
+            try:
+                await self.client.net.unsubscribe(params=handle)
+            except TonException as err:
+                log.debug(f'Unsubscribe error: {err}')
+
+    def _reconnect_soon(self) -> None:
+        if self._closed or self._paused:
+            return
+        if self._reconnect_task is None:
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+        else:
+            # The restored subscription is lost before the reconnection completes
+            self._lost_again = True
+
+    async def _reconnect(self) -> None:
+        '''
+        Subscribes again, then fetches the items missed while the subscription
+        was down. Items arriving through both ways are delivered once.
+        '''
+        delay = self.backoff_min
+        # The new subscription may deliver newer items before the gap is filled
+        created_at = self.last_created_at
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                try:
+                    self._lost_again = False
+                    await self._unsubscribe()
+                    await self._subscribe()
+                    await self._backfill(created_at)
+                    if self._lost_again:
+                        continue
+                    self.reconnects += 1
+                    log.debug(f'Subscription to {self.collection} is restored')
+                    return
+                except TonException as err:
+                    log.warning(f'Reconnection failed: {err}')
+                    delay = min(delay * 2, self.backoff_max)
+        finally:
+            self._reconnect_task = None
+
+    async def _backfill(self, created_at: int) -> None:
+        '''
+        Fetches items created not earlier than `created_at` in the order of (created_at, id).
+        Ids do not follow the order of arrival, so the items of that second are fetched
+        again and skipped as duplicates
+        '''
+        page_filter = {**self.filter, 'created_at': {'ge': created_at}}
+        while True:
+            items = (await self.client.net.query_collection(
+                params=ParamsOfQueryCollection(
+                    collection=self.collection,
+                    result=self.result,
+                    filter=page_filter,
+                    order=[
+                        OrderBy(path='created_at', direction=SortDirection.ASC),
+                        OrderBy(path='id', direction=SortDirection.ASC)
+                    ],
+                    limit=self.page_size
+                ))).result
+            for item in items:
+                self.deliver(item)
+            if len(items) < self.page_size:
+                return
+            # The next page starts after the last item
+            last = items[-1]
+            page_filter = {
+                **self.filter,
+                'created_at': {'gt': last['created_at']},
+                'OR': {
+                    **self.filter,
+                    'created_at': {'eq': last['created_at']},
+                    'id': {'gt': last['id']}
+                }
+            }
@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TtlCache:
+    ''' Mapping of a limited size whose entries expire `ttl_sec` after they are set '''
+
+    def __init__(self, capacity: int = 10000, ttl_sec: float = 60):
+        '''
+        :param capacity: the oldest entries are evicted beyond this number
+        :param ttl_sec: lifetime of an entry
+        '''
+        self.capacity = capacity
+        self.ttl_sec = ttl_sec
+        # key -> (deadline, value), ordered by deadline, as all entries live equally long
+        self._items = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self._items.get(key)
+        if item is None:
+            return default
+        if item[0] <= time.monotonic():
+            del self._items[key]
+            return default
+        return item[1]
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        now = time.monotonic()
+        self._items.pop(key, None)
+        self._items[key] = (now + self.ttl_sec, value)
+        while self._items:
+            _, (deadline, _) = next(iter(self._items.items()))
+            if deadline > now and len(self._items) <= self.capacity:
+                break
+            self._items.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._items)
+
+    def pop(self, key, default=None):
+        item = self._items.pop(key, None)
+        if item is None or item[0] <= time.monotonic():
+            return default
+        return item[1]
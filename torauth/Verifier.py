@@ -0,0 +1,255 @@
+import time
+import asyncio
+import hashlib
+import logging
+import concurrent.futures
+
+from tonclient.types import ParamsOfNaclSignOpen, ParamsOfHash
+
+from torauth.utils import hex_to_base64, base64_to_hex, string_to_base64
+
+log = logging.getLogger(__name__)
+
+# Crypto libraries release the GIL, so threads verify signatures in parallel.
+# Pool classes are named to import multiprocessing only when a process pool is used
+EXECUTORS = {
+    'inline': None,
+    'thread': 'ThreadPoolExecutor',
+    'process': 'ProcessPoolExecutor',
+}
+
+_engine = None
+
+
+def _load_engine():
+    '''
+    Imports PyNaCl (or cryptography) with the first verification
+    :return: (engine name, verify function), (None, None) if neither is installed
+    '''
+    global _engine
+    if _engine is not None:
+        return _engine
+    try:
+        from nacl.signing import VerifyKey
+        from nacl.exceptions import BadSignatureError
+
+        def ed25519_verify(public_key: bytes, signature: bytes, message: bytes) -> bool:
+            try:
+                VerifyKey(public_key).verify(message, signature)
+                return True
+            except BadSignatureError:
+                return False
+
+        _engine = ('pynacl', ed25519_verify)
+    except ImportError:
+        try:
+            from cryptography.exceptions import InvalidSignature
+            from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+            def ed25519_verify(public_key: bytes, signature: bytes, message: bytes) -> bool:
+                try:
+                    Ed25519PublicKey.from_public_bytes(public_key).verify(signature, message)
+                    return True
+                except InvalidSignature:
+                    return False
+
+            _engine = ('cryptography', ed25519_verify)
+        except ImportError:
+            _engine = (None, None)
+    return _engine
+
+
+def __getattr__(name):
+    # `LOCAL_ENGINE`: 'pynacl', 'cryptography' or None
+    if name == 'LOCAL_ENGINE':
+        return _load_engine()[0]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def verify_signature(rand: str, pin: str, signed_message: str, public_key: str) -> bool:
+    '''
+    Checks that `signed_message` is a signature of sha256(rand + pin) made by `public_key`
+    :param signed_message: hex encoded ed25519 signature
+    :param public_key: hex encoded public key
+    :return: bool
+    '''
+    message = hashlib.sha256((rand + ('' if pin is None else pin)).encode('utf-8')).digest()
+    signature = bytes.fromhex(signed_message)
+    # TonClient treats everything after the first 64 bytes as a part of the message,
+    # so it never equals the hash
+    if len(signature) != 64:
+        return False
+    return _load_engine()[1](bytes.fromhex(public_key), signature, message)
+
+
+def verify_signatures(items: list) -> list:
+    '''
+    Verifies a batch of signatures
+    :param items: list of `verify_signature` argument tuples
+    :return: list of results, an exception instead of a result for a malformed item
+    '''
+    try:
+        return [verify_signature(*item) for item in items]
+    except Exception:
+        # Some item is malformed, check them one by one to find it
+        results = []
+        for item in items:
+            try:
+                results.append(verify_signature(*item))
+            except Exception as err:
+                results.append(err)
+        return results
+
+
+class LocalVerifier:
+    '''
+    Verifies signatures with hashlib and PyNaCl (or cryptography)
+    in the event loop or in a pool of worker threads or processes
+    '''
+
+    def __init__(self, executor: str = 'inline', workers: int = None):
+        '''
+        :param executor: `inline`, `thread` or `process`
+        :param workers: size of the pool, by default depends on the number of CPUs
+        '''
+        if _load_engine()[0] is None:
+            raise ImportError('Local verification requires PyNaCl or cryptography')
+        if executor not in EXECUTORS:
+            raise ValueError(f'Unknown verification executor {executor}')
+        self.executor = executor
+        self.workers = workers
+        self._pool = None
+
+    async def verify(self, rand: str, pin: str, signed_message: str, public_key: str) -> bool:
+        if self.executor == 'inline':
+            return verify_signature(rand, pin, signed_message, public_key)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_pool(), verify_signature, rand, pin, signed_message, public_key)
+
+    def close(self) -> None:
+        '''
+        Stops workers, they are started again on the next verification
+        '''
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = getattr(concurrent.futures, EXECUTORS[self.executor])(self.workers)
+        return self._pool
+
+
+class BatchVerifier(LocalVerifier):
+    '''
+    Collects verifications for up to `window` seconds or `batch_size` items,
+    checks them together and resolves each caller separately.
+    Neither PyNaCl nor cryptography provides batch ed25519 verification, so a batch is
+    checked item by item, but in one pass (and one trip to a worker) instead of one per webhook
+    '''
+
+    def __init__(self, batch_size: int = 64, window: float = 0.002,
+                 executor: str = 'inline', workers: int = None):
+        super().__init__(executor, workers)
+        self.batch_size = batch_size
+        self.window = window
+        self._pending = []
+        self._timer = None
+
+    async def verify(self, rand: str, pin: str, signed_message: str, public_key: str) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(((rand, pin, signed_message, public_key), future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        items = [item for item, _ in batch]
+        if self.executor == 'inline':
+            self._resolve(batch, verify_signatures(items))
+            return
+
+        def on_done(future):
+            if future.exception() is None:
+                self._resolve(batch, future.result())
+            else:
+                self._resolve(batch, [future.exception()] * len(batch))
+
+        asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), verify_signatures, items).add_done_callback(on_done)
+
+    @staticmethod
+    def _resolve(batch, results) -> None:
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class TonClientVerifier:
+    ''' Verifies signatures with TonClient core '''
+
+    def __init__(self, client):
+        self.client = client
+        # `torauth.metrics.Metrics` for the time of each call, set by Authenticator
+        self.metrics = None
+
+    async def verify(self, rand: str, pin: str, signed_message: str, public_key: str) -> bool:
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter()
+        hash_of_initial_random = (await self.client.crypto.sha256(params=ParamsOfHash(
+            data=string_to_base64(rand + ('' if pin is None else pin))
+        ))).hash
+        if metrics is not None:
+            hashed = time.perf_counter()
+            metrics.observe('verify_stage_seconds', hashed - start, stage='sha256')
+
+        signed = hex_to_base64(
+            signed_message + hash_of_initial_random
+        )
+
+        hash_of_received_random = (await self.client.crypto.nacl_sign_open(
+            params=ParamsOfNaclSignOpen(
+                signed=signed,
+                public=public_key
+            )
+        )).unsigned
+        if metrics is not None:
+            metrics.observe('verify_stage_seconds', time.perf_counter() - hashed,
+                            stage='nacl_sign_open')
+
+        return hash_of_initial_random == base64_to_hex(hash_of_received_random)
+
+    def close(self) -> None:
+        pass
+
+
+def create_verifier(engine: str, client, batch_size: int = 1, batch_window: float = 0.002,
+                    executor: str = 'inline', workers: int = None):
+    '''
+    :param engine: `local`, `tonclient` or `auto` (local, if PyNaCl or cryptography is installed)
+    :param client: TonClient
+    :param batch_size, batch_window: micro-batching of local verification, off if batch_size is 1
+    :param executor, workers: where local verification runs, see `LocalVerifier`
+    '''
+    local_engine = _load_engine()[0] if engine in ('local', 'auto') else None
+    if engine == 'tonclient' or (engine == 'auto' and local_engine is None):
+        return TonClientVerifier(client)
+    if engine in ('local', 'auto'):
+        log.debug(f'Signatures are verified locally with {local_engine}')
+        if batch_size > 1:
+            return BatchVerifier(batch_size, batch_window, executor, workers)
+        return LocalVerifier(executor, workers)
+    raise ValueError(f'Unknown verification engine {engine}')
@@ -1,5 +1,18 @@
 from . Config import Config
 from . Authenticator import Authenticator
-from . deploy_wallet import deploy_wallet
+from . AuthSession import AuthSession
+from . deploy_wallet import deploy_wallet, deploy_wallets
 from . deploy_root_contract import deploy_root_contract
-from . mocks import Surf
+
+__all__ = [
+    'Config', 'Authenticator', 'AuthSession', 'deploy_wallet', 'deploy_wallets',
+    'deploy_root_contract', 'Surf']
+
+
+def __getattr__(name):
+    # The Surf mock (with aiohttp) is imported only by those who use it (PEP 562)
+    if name == 'Surf':
+        from . mocks import Surf
+        globals()['Surf'] = Surf
+        return Surf
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
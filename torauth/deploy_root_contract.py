@@ -43,7 +43,9 @@ async def deploy_root_contract(cfg) -> None:
         client=client,
         abi=root_abi,
         signer=signer,
-        deploy_set=DeploySet(tvc=root_tvc)
+        deploy_set=DeploySet(tvc=root_tvc),
+        # Keys are new, the address is never calculated again
+        use_cache=False
     )
 
     await credit(cfg, address, root_initial_value)
@@ -1,23 +1,29 @@
+import asyncio
 import logging
-from tonclient.types import DeploySet, CallSet, Signer, ParamsOfProcessMessage, ParamsOfEncodeMessage
+from tonclient.types import DeploySet, CallSet, Signer, ParamsOfProcessMessage, ParamsOfEncodeMessage, \
+    KeyPair
 from torauth import Config
 from torauth.utils import credit, calc_address, process_message
 log = logging.getLogger(__name__)
 
 
-async def deploy_wallet(cfg: Config) -> (str, str, str):
+async def deploy_wallet(cfg: Config, keys: KeyPair = None) -> (str, str, str):
     ''' This function deploys multisig wallet with one custodian
     :param cfg: Configuration object, containing contract ABI and code
+    :param keys: keys of the custodian, generated if omitted
     :return Tuple: (wallet_address, public_key, secret_key)
     '''
-    keys = await cfg.client.crypto.generate_random_sign_keys()
+    if keys is None:
+        keys = await cfg.client.crypto.generate_random_sign_keys()
     signer = Signer.Keys(keys)
 
     address = await calc_address(
         client=cfg.client,
         abi=cfg.multisig_abi,
         signer=signer,
-        deploy_set=DeploySet(tvc=cfg.multisig_tvc)
+        deploy_set=DeploySet(tvc=cfg.multisig_tvc),
+        # Keys are new, the address is never calculated again
+        use_cache=False
     )
 
     await credit(cfg, address, cfg.multisig_initial_value)
@@ -43,3 +49,41 @@ async def deploy_wallet(cfg: Config) -> (str, str, str):
             send_events=False
         ))
     return (address, keys.public, keys.secret)
+
+
+async def deploy_wallets(cfg: Config, n: int, concurrency: int = 10):
+    ''' Deploys `n` multisig wallets, up to `concurrency` of them at once.
+    Keys of all wallets are generated up front, addresses are calculated concurrently.
+    Each wallet is credited by a separate giver transaction: neither giver
+    contract (giverv2 or SafeMultisigWallet) sends to several destinations in one call
+    :param cfg: Configuration object, containing contract ABI and code
+    :param n: number of wallets
+    :param concurrency: size of the worker pool
+    :return: async iterator of (wallet_address, public_key, secret_key) in the order
+        the wallets are deployed. Closing it early cancels the deployments in progress
+    '''
+    if n <= 0:
+        return
+    results = asyncio.Queue()
+    pending = iter(await asyncio.gather(
+        *(cfg.client.crypto.generate_random_sign_keys() for _ in range(n))))
+
+    async def worker():
+        for keys in pending:
+            try:
+                results.put_nowait(await deploy_wallet(cfg, keys))
+            except Exception as err:
+                results.put_nowait(err)
+                return
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(n, concurrency))]
+    try:
+        for _ in range(n):
+            result = await results.get()
+            if isinstance(result, Exception):
+                raise result
+            yield result
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
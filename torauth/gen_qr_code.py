@@ -1,28 +1,122 @@
-import io
 import base64
+from functools import lru_cache
+
 import qrcode
 
+from torauth.QrTemplate import QrTemplate
+
+# Output formats
+QR_PNG = 'png'        # PNG image encoded as a base64 string
+QR_SVG = 'svg'        # SVG image as a string
+QR_MATRIX = 'matrix'  # bytes: matrix size, then modules row by row, one bit per module
+QR_LINK = 'link'      # only the deep link, the client renders QR code itself
+
+ERROR_CORRECTION = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H,
+}
+
 
-def gen_qr_code(deep_link_url: str, seq: str, rand: str, webhook_url: str) -> str:
-    """ Function returns image in a .png format encoded as a base64 string
+def gen_qr_code(
+    deep_link_url: str,
+    seq: str,
+    rand: str,
+    webhook_url: str,
+    qr_format: str = QR_PNG,
+    version: int = 1,
+    box_size: int = 10,
+    border: int = 4,
+    error_correction: str = 'L',
+    compact: bool = False
+):
+    """ Function returns QR code containing the deep link in the requested format
     :params deep_link_url: string
     :params random: string
-    :return: base64 string
+    :params qr_format: one of QR_PNG, QR_SVG, QR_MATRIX, QR_LINK
+    :params version, box_size, border, error_correction: QR code parameters,
+        `version` is the minimal one, it grows to fit the data
+    :params compact: omit `seq` from the link, it must be equal to `rand`
+    :return: base64 string for QR_PNG, string for QR_SVG and QR_LINK, bytes for QR_MATRIX
     """
-    # TODO: move QRcode params into config.py
-    qr = qrcode.QRCode(
-        version=1,
-        border=4,
-        box_size=10,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
+    if compact:
+        if seq != rand:
+            raise ValueError('Compact link requires seq equal to rand')
+        variable = rand + ','
+    else:
+        variable = rand + ',' + seq
+    suffix = ',' + webhook_url
+
+    if qr_format == QR_LINK:
+        return deep_link_url + variable + suffix
+
+    variable = variable.encode('utf-8')
+    template = qr_template(
+        deep_link_url.encode('utf-8'),
+        suffix.encode('utf-8'),
+        len(variable),
+        version,
+        error_correction,
+        box_size,
+        border
+    )
+    modules = template.modules(variable)
+
+    if qr_format == QR_PNG:
+        return base64.b64encode(template.png(modules)).decode('utf-8')
+    if qr_format == QR_SVG:
+        return _to_svg(modules, box_size, border)
+    if qr_format == QR_MATRIX:
+        return _to_matrix(modules)
+    raise ValueError(f'Unknown QR code format {qr_format}')
+
+
+@lru_cache(maxsize=64)
+def qr_template(prefix, suffix, variable_length, version, error_correction, box_size, border):
+    '''
+    QR code templates are shared by all sessions with the same deep link, webhook and parameters
+    '''
+    return QrTemplate(
+        prefix,
+        suffix,
+        variable_length,
+        version=version,
+        error_correction=ERROR_CORRECTION[error_correction],
+        box_size=box_size,
+        border=border
+    )
+
+
+def _to_svg(modules, box_size, border):
+    # One path, a rectangle per horizontal run of dark modules
+    size = len(modules)
+    path = []
+    for y, row in enumerate(modules):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                path.append(f'M{start + border},{y + border}h{x - start}v1h-{x - start}z')
+            else:
+                x += 1
+    side = size + 2 * border
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" '
+        f'width="{side * box_size}" height="{side * box_size}" viewBox="0 0 {side} {side}">'
+        f'<rect width="{side}" height="{side}" fill="#fff"/>'
+        f'<path d="{"".join(path)}" fill="#000"/></svg>'
     )
 
-    qr.add_data(deep_link_url + ','.join([rand, seq, webhook_url]))
-    qr.make(fit=True)
-    img = qr.make_image(fill_color='black', back_color='white')
 
-    stream = io.BytesIO()
-    img.save(stream, 'PNG')
-    base64png = base64.b64encode(stream.getvalue()).decode('utf-8')
-    stream.close()
-    return base64png
+def _to_matrix(modules):
+    size = len(modules)
+    bits = 0
+    for row in modules:
+        for module in row:
+            bits = (bits << 1) | bool(module)
+    n_bits = size * size
+    padding = -n_bits % 8
+    return bytes([size]) + (bits << padding).to_bytes((n_bits + padding) // 8, 'big')
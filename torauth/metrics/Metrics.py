@@ -0,0 +1,172 @@
+import time
+from bisect import bisect_left
+from collections import deque
+
+# Upper bounds of histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class NullSpan:
+    ''' Span of disabled tracing '''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    ''' Finished or running span of the in-memory tracer '''
+
+    def __init__(self, spans: deque, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.start = None
+        self.duration = None
+        self.error = None
+        self._spans = spans
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc is not None:
+            self.error = repr(exc)
+        self._spans.append(self)
+        return False
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+
+class Metrics:
+    '''
+    In-memory counters, histograms and gauges of the authenticator
+    with an exporter to the Prometheus text format.
+    The same interface (`inc`, `observe`, `gauge`, `span`) is implemented
+    by `OpenTelemetryMetrics`
+    '''
+
+    def __init__(self, prefix: str = 'torauth', buckets=DEFAULT_BUCKETS, trace_capacity: int = 0):
+        '''
+        :param prefix: prefix of the metric names
+        :param buckets: upper bounds of histogram buckets in seconds
+        :param trace_capacity: how many finished spans are kept in `spans`, 0 disables tracing
+        '''
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.spans = deque(maxlen=trace_capacity)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            # Counts of buckets (and of +Inf), sum
+            histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0]
+        histogram[0][bisect_left(self.buckets, value)] += 1
+        histogram[1] += value
+
+    def gauge(self, name: str, callback) -> None:
+        '''
+        :param callback: function returning the current value, called on export
+        '''
+        self.gauges[name] = callback
+
+    def span(self, name: str, **attributes):
+        '''
+        :return: context manager timing a stage of an authentication,
+            the span is kept in `spans` if tracing is enabled
+        '''
+        if self.spans.maxlen == 0:
+            return NULL_SPAN
+        return Span(self.spans, name, attributes)
+
+    def value(self, name: str, **labels) -> float:
+        '''
+        :return: value of a counter or a gauge, or the count of a histogram
+        '''
+        key = (name, tuple(sorted(labels.items())))
+        if key in self.counters:
+            return self.counters[key]
+        if key in self.histograms:
+            return sum(self.histograms[key][0])
+        if name in self.gauges and not labels:
+            return self.gauges[name]()
+        return 0
+
+    def prometheus_text(self) -> str:
+        '''
+        :return: all metrics in the Prometheus text exposition format
+        '''
+        lines = []
+        for kind, metrics in (('counter', self.counters), ('histogram', self.histograms)):
+            declared = set()
+            for (name, labels), value in sorted(metrics.items(), key=_sort_key):
+                name = self._name(name)
+                if name not in declared:
+                    declared.add(name)
+                    lines.append(f'# TYPE {name} {kind}')
+                if kind == 'counter':
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    bucket_labels = _labels(labels + (('le', _number(bound)),))
+                    lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        for name, callback in sorted(self.gauges.items()):
+            name = self._name(name)
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {_number(callback())}')
+        return '\n'.join(lines) + '\n'
+
+    def _name(self, name: str) -> str:
+        return f'{self.prefix}_{name}' if self.prefix else name
+
+
+def _sort_key(item):
+    (name, labels), _ = item
+    return name, [(key, str(value)) for key, value in labels]
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return '{' + pairs + '}'
+
+
+def _escape(value) -> str:
+    if value is None:
+        return ''
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
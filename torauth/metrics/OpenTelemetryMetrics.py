@@ -0,0 +1,59 @@
+from torauth.metrics.Metrics import NULL_SPAN
+
+
+class OpenTelemetryMetrics:
+    '''
+    Sends the authenticator metrics to OpenTelemetry instruments:
+    counters, histograms (in seconds) and observable gauges of a meter,
+    spans of a tracer. `opentelemetry-api` is required
+    '''
+
+    def __init__(self, meter=None, tracer=None, prefix: str = 'torauth'):
+        '''
+        :param meter: OpenTelemetry meter, the one of the global meter provider by default
+        :param tracer: OpenTelemetry tracer, spans are not recorded if it is None
+        :param prefix: prefix of the instrument names
+        '''
+        from opentelemetry.metrics import Observation, get_meter
+        self.meter = get_meter('torauth') if meter is None else meter
+        self.tracer = tracer
+        self.prefix = prefix
+        self._observation = Observation
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = []
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters[name] = self.meter.create_counter(self._name(name))
+        counter.add(value, _attributes(labels))
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = self.meter.create_histogram(
+                self._name(name), unit='s')
+        histogram.record(value, _attributes(labels))
+
+    def gauge(self, name: str, callback) -> None:
+        '''
+        :param callback: function returning the current value, called on collection
+        '''
+        self._gauges.append(self.meter.create_observable_gauge(
+            self._name(name),
+            callbacks=[lambda options: [self._observation(callback())]]))
+
+    def span(self, name: str, **attributes):
+        if self.tracer is None:
+            return NULL_SPAN
+        return self.tracer.start_as_current_span(
+            self._name(name), attributes=_attributes(attributes))
+
+    def _name(self, name: str) -> str:
+        return f'{self.prefix}.{name}' if self.prefix else name
+
+
+def _attributes(labels: dict) -> dict:
+    # OpenTelemetry attributes can't be None
+    return {key: '' if value is None else value for key, value in labels.items()}
@@ -0,0 +1,12 @@
+from . Metrics import Metrics, NULL_SPAN
+
+__all__ = ['Metrics', 'OpenTelemetryMetrics', 'NULL_SPAN']
+
+
+def __getattr__(name):
+    # opentelemetry is imported only if its adapter is used (PEP 562)
+    if name == 'OpenTelemetryMetrics':
+        from . OpenTelemetryMetrics import OpenTelemetryMetrics
+        globals()[name] = OpenTelemetryMetrics
+        return OpenTelemetryMetrics
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,83 @@
+import os
+import json
+import asyncio
+import hashlib
+
+from tonclient.errors import TonException
+from tonclient.types import KeyPair
+
+##
+# This is a TonClient mock for deployment tools: keys are random, addresses are
+# hashes of the deploy parameters, messages take `latency` seconds to process.
+# A giver with time-based replay protection rejects its message
+# if another one is being processed.
+# Only the calls made by `deploy_wallet` and `credit` are supported
+
+
+class _Result:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class LocalChain:
+
+    def __init__(self, giver_address: str, latency: float = 0.05, time_replay_protection=True):
+        '''
+        :param giver_address: `sendTransaction` calls of this contract credit their `dest`
+        :param latency: time to process one message, seconds
+        :param time_replay_protection: the giver accepts one message at a time
+            (as SafeMultisigWallet), otherwise any number of them (as giverv2)
+        '''
+        self.giver_address = giver_address
+        self.latency = latency
+        self.time_replay_protection = time_replay_protection
+        self.balances = {}
+        self.deployed = set()
+        self.messages = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.giver_in_flight = 0
+        self.giver_messages = 0
+        self.replay_conflicts = 0
+        self.crypto = self.abi = self.processing = self
+
+    async def generate_random_sign_keys(self):
+        return KeyPair(public=os.urandom(32).hex(), secret=os.urandom(32).hex())
+
+    async def encode_message(self, params):
+        return _Result(address=self._address(params))
+
+    async def process_message(self, params):
+        encode = params.message_encode_params
+        to_giver = encode.address == self.giver_address and encode.deploy_set is None
+        conflict = to_giver and self.time_replay_protection and self.giver_in_flight > 0
+        self.messages += 1
+        self.in_flight += 1
+        self.giver_in_flight += to_giver
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+            self.giver_in_flight -= to_giver
+
+        if conflict:
+            self.replay_conflicts += 1
+            raise TonException('Message expired: rejected by replay protection of the giver')
+
+        if encode.deploy_set is not None:
+            address = self._address(encode)
+            if self.balances.get(address, 0) <= 0:
+                raise RuntimeError(f'{address} is deployed without funds')
+            self.deployed.add(address)
+        elif to_giver:
+            self.giver_messages += 1
+            inputs = encode.call_set.input
+            dest = inputs['dest']
+            self.balances[dest] = self.balances.get(dest, 0) + int(inputs['value'])
+        return _Result(transaction={}, out_messages=[], decoded=None, fees=None)
+
+    @staticmethod
+    def _address(params):
+        content = json.dumps([params.signer.dict, params.deploy_set.dict], sort_keys=True)
+        return '0:' + hashlib.sha256(content.encode('utf-8')).hexdigest()
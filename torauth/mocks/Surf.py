@@ -1,69 +1,52 @@
-import re
 import os
 import sys
 import json
 import logging
 import asyncio
-from functools import wraps, partial
 import aiohttp
 from tonclient.types import ParamsOfNaclSign, ParamsOfHash
 from torauth.utils import string_to_base64, hex_to_base64
-from . debot import debot
+from . debot import debot, DebotError
+from . decode_qr import decode_qr
 
 ##
 # This is a Surf mock working with real DeBot
-# To decode QR code external public API is used
-external_api = 'https://zxing.org/w/decode'
+# QR codes are decoded locally
 log = logging.getLogger(__name__)
 debot_address = '0:a4543b20e0b169a7d3edb354d0aa45bc0ada23d357104ade368efde09099ec0e'
 
 tmpfiles = './tmp/{}.keys'
-
-
-def async_wrap(func):
-    @wraps(func)
-    async def run(*args, loop=None, executor=None, **kwargs):
-        if loop is None:
-            loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
-    return run
-
-
-async_debot = async_wrap(debot)
+# Failed DeBot signings are retried, waiting between the attempts
+debot_attempts = 3
+debot_retry_sec = 1
 
 
 class Surf:
 
-    def __init__(self, config, wallet_address, public, secret, callback_type='blockchain'):
+    def __init__(self, config, wallet_address, public, secret, callback_type='blockchain',
+                 debot_pool=None, http_session=None):
+        '''
+        :param debot_pool: `DebotPool` shared by Surf mocks, a new DeBot session
+            is started for each signing otherwise
+        :param http_session: aiohttp.ClientSession shared by Surf mocks,
+            a new one is opened for each webhook call otherwise
+        '''
         self.cfg = config
         self.public = public
         self.secret = secret
         self.wallet_address = wallet_address
         self.callback_type = callback_type
+        self.debot_pool = debot_pool
+        self.http_session = http_session
 
     async def sign(self, qr_code, pin):
-        # Unfortunately, API sends the answer in html format only,
-        # so we need to parse it
-        async def parse_qr_code(params):
-            async with aiohttp.ClientSession() as session:
-                try:
-                    # To decode QR code we use external public API
-                    async with session.get(external_api, params=params) as response:
-                        log.debug(f'Status: {response.status}')
-                        if response.status == 200:
-                            # Surf got `random` from QR code
-                            html = await response.text()
-                            (rand, seq, webhook_url) = self._extract_random(html)
-                            return (rand, seq, webhook_url)
-                        raise f'Http status {response.status}'
-                except asyncio.CancelledError:
-                    log.debug('OK. Surf canceled')
-                except:
-                    log.error(
-                        f'Critical error in QR decoder service: {sys.exc_info()[1]}')
-                    sys.exit(1)
-
-        one_time_password, seq, webhook_url = await parse_qr_code({'u': f'data:image/png;base64,{qr_code}'})
+        '''
+        :param qr_code: QR code in any format of `gen_qr_code`
+        '''
+        # Surf got `random` from QR code
+        one_time_password, seq, webhook_url = self._parse_link(decode_qr(qr_code))
+        # Compact deep link omits `seq`, it is equal to the random value
+        seq = seq or one_time_password
 
         if self.callback_type == 'blockchain':
             keys_filename = os.path.join(
@@ -74,14 +57,9 @@ class Surf:
                 json.dump({"public": self. public,
                            "secret": self.secret}, outfile)
 
-            message_is_sent = False
-            while not message_is_sent:
-                message_is_sent = await async_debot(
-                    debot_address,
-                    self.wallet_address,
-                    keys_filename,
-                    one_time_password
-                )
+            # The DeBot signs the one-time password followed by the pin (maybe)
+            await self._sign_with_debot(
+                keys_filename, one_time_password + ('' if pin is None else pin))
         else:
             # lets sign one_time_password + pin (maybe)
             message_hash = (await self.cfg.client.crypto.sha256(params=ParamsOfHash(
@@ -102,17 +80,40 @@ class Surf:
                 "public_key": self.public,
                 "wallet_address": self.wallet_address
             }
-            async with aiohttp.ClientSession(json_serialize=json.dumps) as session:
-                async with session.post(webhook_url, json=data) as response:
-                    if response.status != 200:
-                        log.error(
-                            f'Local http server error: {sys.exc_info()[1]}')
-                        sys.exit(1)
+            if self.http_session is None:
+                async with aiohttp.ClientSession(json_serialize=json.dumps) as session:
+                    await self._post(session, webhook_url, data)
+            else:
+                await self._post(self.http_session, webhook_url, data)
 
         log.debug('Message sent')
 
-    def _extract_random(self, html):
-        tokenized = re.split('<[^>]+>', html)
-        res = list(filter(lambda x: self.cfg.deep_link_url in x, tokenized))
-        value = res[0].split(self.cfg.deep_link_url)[-1].strip()
-        return value.split(',')
+    async def _sign_with_debot(self, keys_filename, one_time_password):
+        for attempt in range(1, debot_attempts + 1):
+            try:
+                if self.debot_pool is None:
+                    sent = await debot(
+                        debot_address, self.wallet_address, keys_filename, one_time_password)
+                else:
+                    sent = await self.debot_pool.sign(
+                        self.wallet_address, keys_filename, one_time_password)
+                if sent:
+                    return
+                log.debug(f'DeBot transaction failed, attempt #{attempt}')
+            except DebotError as err:
+                log.debug(f'DeBot error: {err}, attempt #{attempt}')
+            if attempt < debot_attempts:
+                await asyncio.sleep(debot_retry_sec)
+        raise DebotError(f'Message is not sent in {debot_attempts} attempts')
+
+    async def _post(self, session, webhook_url, data):
+        async with session.post(webhook_url, json=data) as response:
+            if response.status != 200:
+                log.error(
+                    f'Local http server error: {sys.exc_info()[1]}')
+                sys.exit(1)
+
+    def _parse_link(self, link):
+        # <deep link url>rand,seq,webhook_url
+        value = link.split(self.cfg.deep_link_url)[-1].strip()
+        return value.split(',', 2)
@@ -1,50 +1,203 @@
-import subprocess
+import re
+import asyncio
 import logging
 log = logging.getLogger(__name__)
 
+##
+# Drives `tonos-cli debot fetch` of the authentication DeBot: waits for each prompt
+# and answers it. Sessions are asyncio subprocesses, a pool keeps them for reuse
 
-def debot(debot_address, wallet_address, keys_filename, one_time_password):
-    proc = subprocess.Popen([
-        'tonos-cli',
-        'debot',
-        'fetch',
-        debot_address
-    ],
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
+TONOS_CLI = 'tonos-cli'
 
-    def put(string):
-        proc.stdin.write(str.encode(string + '\n'))
-        proc.stdin.flush()
+# (prompt, answer) in the order the DeBot asks, prompts are case-insensitive regular
+# expressions, answers are formatted with `otp`, `keys` and `wallet`
+STEPS = (
+    (r'^\s*1\)', '1'),
+    (r'password', '{otp}'),
+    (r'key', '{keys}'),
+    (r'address', '{wallet}'),
+    (r'key', '{keys}'),
+)
+# The line printed by the DeBot after the last answer, it follows the prompt
+# on the same line as prompts have no line end
+RESULT = r'(?:^|: )(?:Transaction succeeded|Transaction failed|Error:.*)\.?$'
+SUCCESS = 'Transaction succeeded'
 
-    def output_line(n):
-        for _ in range(n):
-            log.debug(proc.stdout.readline())
 
-    output_line(7)
-    put('1')
+class DebotError(Exception):
+    ''' DeBot session ended or did not answer in time '''
 
-    output_line(2)
-    put(one_time_password)
 
-    output_line(1)
-    put(keys_filename)
+class DebotExited(DebotError):
+    ''' DeBot process exited '''
 
-    output_line(2)
-    put(wallet_address)
 
-    output_line(2)
-    put(keys_filename)
+class DebotIdle(DebotExited):
+    ''' DeBot process does not offer the menu again after a signing '''
 
-    output_line(1)
-    result = proc.stdout.readline().decode("utf-8")
 
-    proc.stdin.close()
-    proc.stdout.close()
-    proc.stderr.close()
-    proc.terminate()
-    proc.wait(timeout=1)
+class DebotSession:
 
-    return bool(result == 'Transaction succeeded.\n')
+    def __init__(self, debot_address, cli=TONOS_CLI, timeout: float = 30,
+                 reuse_timeout: float = 5):
+        '''
+        :param cli: tonos-cli executable, or a list of the command and its first arguments
+        :param timeout: longest wait for each prompt, seconds
+        :param reuse_timeout: longest wait for the menu after a previous signing, seconds.
+            If the DeBot does not offer it again, the session can't be reused
+        '''
+        self.debot_address = debot_address
+        self.cli = [cli] if isinstance(cli, str) else list(cli)
+        self.timeout = timeout
+        self.reuse_timeout = reuse_timeout
+        self.proc = None
+        self.signings = 0
+        # The last answer of the current signing, which sends the transaction, is sent
+        self.submitted = False
+        self._output = ''
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def start(self) -> None:
+        self.proc = await asyncio.create_subprocess_exec(
+            *self.cli, 'debot', 'fetch', self.debot_address,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL)
+        self._output = ''
+
+    async def expect(self, pattern: str, timeout: float = None) -> str:
+        '''
+        Reads the output until the pattern is found, prompts may have no line end
+        :param timeout: `timeout` of the session by default
+        :return: output up to the end of the match
+        '''
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self._expect(pattern), timeout)
+        except asyncio.TimeoutError:
+            raise DebotError(f'No "{pattern}" in {timeout}s, got: {self._output[-200:]!r}')
+
+    async def _expect(self, pattern):
+        regex = re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+        while True:
+            match = regex.search(self._output)
+            if match is not None:
+                text = self._output[:match.end()]
+                self._output = self._output[match.end():]
+                log.debug(text)
+                return text
+            chunk = await self.proc.stdout.read(4096)
+            if not chunk:
+                raise DebotExited(f'DeBot exited waiting for "{pattern}"')
+            self._output += chunk.decode('utf-8', errors='replace')
+
+    async def send(self, line: str) -> None:
+        self.proc.stdin.write(line.encode('utf-8') + b'\n')
+        await self.proc.stdin.drain()
+
+    async def sign(self, wallet_address, keys_filename, one_time_password) -> bool:
+        '''
+        Sends the one-time password to the ROOT contract from the wallet
+        :return: True if the transaction succeeded
+        '''
+        self.submitted = False
+        reused = self.alive and self.signings > 0
+        if not self.alive:
+            await self.start()
+        answers = {'otp': one_time_password, 'keys': keys_filename, 'wallet': wallet_address}
+        for step, (prompt, answer) in enumerate(STEPS):
+            if step == 0 and reused:
+                await self._expect_menu_again(prompt)
+            else:
+                await self.expect(prompt)
+            self.submitted = step == len(STEPS) - 1
+            await self.send(answer.format(**answers))
+        result = await self.expect(RESULT)
+        self.signings += 1
+        return result.rstrip('.').endswith(SUCCESS)
+
+    async def _expect_menu_again(self, prompt):
+        try:
+            await self.expect(prompt, self.reuse_timeout)
+        except DebotExited:
+            raise
+        except DebotError:
+            raise DebotIdle(f'No menu in {self.reuse_timeout}s after the previous signing')
+
+    async def close(self) -> None:
+        if self.proc is None:
+            return
+        if self.proc.returncode is None:
+            self.proc.stdin.close()
+            self.proc.terminate()
+        await self.proc.wait()
+        self.proc = None
+
+
+class DebotPool:
+    '''
+    Up to `size` DeBot sessions sign concurrently, the rest wait for a free one.
+    A session is reused after a signing and replaced if it failed. If a reused session
+    exits before the transaction is sent, the signing is repeated in a new one.
+    If a DeBot does not offer the menu again after a signing, sessions are no longer reused
+    '''
+
+    def __init__(self, debot_address, size: int = 10, cli=TONOS_CLI, timeout: float = 30,
+                 reuse_timeout: float = 5):
+        self.debot_address = debot_address
+        self.cli = cli
+        self.timeout = timeout
+        self.reuse_timeout = reuse_timeout
+        self.reuse = True
+        self.idle = []
+        self.started = 0
+        self._slots = asyncio.Semaphore(size)
+
+    async def sign(self, wallet_address, keys_filename, one_time_password) -> bool:
+        args = (wallet_address, keys_filename, one_time_password)
+        async with self._slots:
+            session = self.idle.pop() if self.idle else None
+            if session is not None and session.alive:
+                try:
+                    return await self._sign(session, *args)
+                except DebotExited as err:
+                    if session.submitted:
+                        # The transaction may be sent, it must not be sent twice
+                        raise
+                    # The DeBot has exited or is idle after the previous signing
+                    log.debug(f'DeBot session is not reusable: {err}')
+                    if isinstance(err, DebotIdle):
+                        self.reuse = False
+            session = DebotSession(
+                self.debot_address, self.cli, self.timeout, self.reuse_timeout)
+            self.started += 1
+            return await self._sign(session, *args)
+
+    async def _sign(self, session, *args):
+        try:
+            result = await session.sign(*args)
+        except BaseException:
+            await session.close()
+            raise
+        if self.reuse:
+            self.idle.append(session)
+        else:
+            await session.close()
+        return result
+
+    async def close(self) -> None:
+        sessions, self.idle = self.idle, []
+        await asyncio.gather(*(session.close() for session in sessions))
+
+
+async def debot(debot_address, wallet_address, keys_filename, one_time_password,
+                cli=TONOS_CLI, timeout: float = 30) -> bool:
+    ''' Signs in a new DeBot session '''
+    session = DebotSession(debot_address, cli, timeout)
+    try:
+        return await session.sign(wallet_address, keys_filename, one_time_password)
+    finally:
+        await session.close()
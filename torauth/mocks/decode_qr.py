@@ -0,0 +1,214 @@
+import re
+import zlib
+import base64
+import struct
+from functools import lru_cache
+
+from qrcode import util, base
+
+from torauth.QrTemplate import function_patterns, data_positions, data_mask
+
+##
+# Offline QR code decoder for the Surf mock. Reads the formats of `gen_qr_code`
+# (and PNG images of other QR generators): clean, not rotated images only,
+# error correction codewords are not used
+
+
+def decode_qr(qr_code) -> str:
+    '''
+    :param qr_code: base64 PNG, SVG string or matrix bytes returned by `gen_qr_code`,
+        a deep link (`link` format) is returned as is
+    :return: text of the QR code
+    '''
+    if isinstance(qr_code, (bytes, bytearray)):
+        modules = _from_matrix(qr_code)
+    elif qr_code.lstrip().startswith('<svg'):
+        modules = _from_svg(qr_code)
+    elif '://' in qr_code:
+        return qr_code
+    else:
+        modules = _from_png(base64.b64decode(qr_code))
+    return _decode(modules).decode('utf-8')
+
+
+def _from_matrix(matrix):
+    size = matrix[0]
+    bits = int.from_bytes(matrix[1:], 'big') >> (-size * size % 8)
+    n = size * size
+    return [
+        [bool(bits >> (n - 1 - (row * size + col)) & 1) for col in range(size)]
+        for row in range(size)
+    ]
+
+
+def _from_svg(svg):
+    side = int(re.search(r'viewBox="0 0 (\d+) \d+"', svg).group(1))
+    runs = [tuple(map(int, run)) for run in re.findall(r'M(\d+),(\d+)h(\d+)', svg)]
+    # The top left module is dark, it is shifted by the border
+    border = min(y for _, y, _ in runs)
+    size = side - 2 * border
+    modules = [[False] * size for _ in range(size)]
+    for x, y, width in runs:
+        for col in range(x - border, x - border + width):
+            modules[y - border][col] = True
+    return modules
+
+
+def _from_png(png):
+    if png[:8] != b'\x89PNG\r\n\x1a\n':
+        raise ValueError('Not a PNG image')
+    pos = 8
+    idat = []
+    while pos < len(png):
+        length, kind = struct.unpack('>I4s', png[pos:pos + 8])
+        data = png[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if kind == b'IHDR':
+            width, height, depth, color, _, _, interlace = struct.unpack('>IIBBBBB', data)
+        elif kind == b'IDAT':
+            idat.append(data)
+    if interlace or color not in (0, 2, 4, 6) or depth not in (1, 8):
+        raise ValueError('Only grayscale and RGB(A) PNG images are supported')
+    channels = {0: 1, 2: 3, 4: 2, 6: 4}[color]
+    stride = (width * channels * depth + 7) // 8
+    bpp = max(1, channels * depth // 8)
+    raw = zlib.decompress(b''.join(idat))
+
+    # Rows as integers, a bit per pixel, set for dark ones
+    rows = []
+    prev = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        line = _unfilter(raw[start], bytearray(raw[start + 1:start + 1 + stride]), prev, bpp)
+        prev = line
+        rows.append(line)
+    mask = (1 << width) - 1
+
+    def dark(line):
+        if depth == 1:
+            return ~int.from_bytes(line, 'big') >> (stride * 8 - width) & mask
+        return int(''.join('1' if line[x * channels] < 128 else '0' for x in range(width)), 2)
+
+    return _sample(rows, width, dark)
+
+
+def _unfilter(kind, line, prev, bpp):
+    if kind == 0:
+        return line
+    for i in range(len(line)):
+        left = line[i - bpp] if i >= bpp else 0
+        up = prev[i]
+        if kind == 1:
+            line[i] = (line[i] + left) & 0xff
+        elif kind == 2:
+            line[i] = (line[i] + up) & 0xff
+        elif kind == 3:
+            line[i] = (line[i] + ((left + up) >> 1)) & 0xff
+        elif kind == 4:
+            up_left = prev[i - bpp] if i >= bpp else 0
+            p = left + up - up_left
+            pa, pb, pc = abs(p - left), abs(p - up), abs(p - up_left)
+            predictor = left if pa <= pb and pa <= pc else up if pb <= pc else up_left
+            line[i] = (line[i] + predictor) & 0xff
+    return line
+
+
+def _sample(rows, width, dark):
+    # The top left finder pattern is 7 modules wide, the top right one ends the row.
+    # Pixel x of a row is bit `width - 1 - x`
+    top, bits = next((y, bits) for y, bits in enumerate(map(dark, rows)) if bits)
+    left = width - bits.bit_length()
+    right = width - (bits & -bits).bit_length()
+    # The first light pixel after `left`
+    light = width - (bits ^ ((1 << (width - left)) - 1)).bit_length()
+    box = (light - left) / 7
+    size = round((right - left + 1) / box)
+    columns = [width - 1 - int(left + (c + 0.5) * box) for c in range(size)]
+    modules = []
+    for r in range(size):
+        bits = dark(rows[int(top + (r + 0.5) * box)])
+        modules.append([bool(bits >> shift & 1) for shift in columns])
+    return modules
+
+
+def _decode(modules):
+    size = len(modules)
+    version = (size - 17) // 4
+    error_correction, mask_pattern = _format(modules)
+    positions, mask = _layout(version, error_correction, mask_pattern)
+    stream = int(''.join(['1' if modules[row][col] else '0' for row, col in positions]), 2) ^ mask
+
+    # Data codewords are interleaved by blocks, error correction codewords follow
+    blocks = base.rs_blocks(version, error_correction)
+    total = sum(block.total_count for block in blocks)
+    codewords = (stream >> (len(positions) - total * 8)).to_bytes(total, 'big')
+    data_blocks = [bytearray() for _ in blocks]
+    pos = 0
+    for i in range(max(block.data_count for block in blocks)):
+        for block, data in zip(blocks, data_blocks):
+            if i < block.data_count:
+                data.append(codewords[pos])
+                pos += 1
+    return _segments(b''.join(data_blocks), version)
+
+
+def _format(modules):
+    # 15 bits of format information next to the top left finder pattern
+    size = len(modules)
+    bits = 0
+    for i in range(15):
+        row = i if i < 6 else i + 1 if i < 8 else size - 15 + i
+        bits |= modules[row][8] << i
+    candidates = [
+        (bin(bits ^ util.BCH_type_info((ec << 3) | mask)).count('1'), ec, mask)
+        for ec in range(4) for mask in range(8)
+    ]
+    distance, ec, mask = min(candidates)
+    if distance > 3:
+        raise ValueError('Format information is not readable')
+    return ec, mask
+
+
+@lru_cache(maxsize=64)
+def _layout(version, error_correction, mask_pattern):
+    # Order of data modules and their mask as an integer, shared with the encoder
+    positions = data_positions(function_patterns(version, error_correction, mask_pattern))
+    return tuple(positions), data_mask(positions, mask_pattern)
+
+
+ALPHANUMERIC = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:'
+
+
+def _segments(data, version):
+    bits = int.from_bytes(data, 'big')
+    left = len(data) * 8
+    out = bytearray()
+
+    def read(n):
+        nonlocal left
+        left -= n
+        return (bits >> left) & ((1 << n) - 1)
+
+    while left >= 4:
+        mode = read(4)
+        if mode == 0:
+            break
+        length = read(util.length_in_bits(mode, version))
+        if mode == util.MODE_8BIT_BYTE:
+            out += bytes(read(8) for _ in range(length))
+        elif mode == util.MODE_ALPHA_NUM:
+            for _ in range(length // 2):
+                pair = read(11)
+                out += (ALPHANUMERIC[pair // 45] + ALPHANUMERIC[pair % 45]).encode()
+            if length % 2:
+                out += ALPHANUMERIC[read(6)].encode()
+        elif mode == util.MODE_NUMBER:
+            for _ in range(length // 3):
+                out += b'%03d' % read(10)
+            if length % 3 == 2:
+                out += b'%02d' % read(7)
+            elif length % 3 == 1:
+                out += b'%d' % read(4)
+        else:
+            raise ValueError(f'Unsupported QR segment mode {mode}')
+    return bytes(out)
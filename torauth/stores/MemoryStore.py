@@ -0,0 +1,60 @@
+import heapq
+import itertools
+
+from . Store import Store
+
+
+class MemoryStore(Store):
+    ''' In-process store, entries are kept as is '''
+
+    def __init__(self):
+        self.data = {}
+        self._deadline_of = {}
+        # Min-heap of (deadline, order, seq). Entries removed by `pop`
+        # stay in the heap and are skipped lazily when they reach the top
+        self._deadlines = []
+        self._order = itertools.count()
+
+    def put(self, seq, entry: dict, deadline: float) -> None:
+        self.data[seq] = entry
+        self._deadline_of[seq] = deadline
+        heapq.heappush(self._deadlines, (deadline, next(self._order), seq))
+        self._compact()
+
+    def get(self, seq):
+        return self.data.get(seq)
+
+    def pop(self, seq):
+        self._deadline_of.pop(seq, None)
+        return self.data.pop(seq, None)
+
+    def pop_expired(self, now: float) -> list:
+        expired = []
+        while self._deadlines and self._deadlines[0][0] < now:
+            deadline, _, seq = heapq.heappop(self._deadlines)
+            if self._is_live(deadline, seq):
+                expired.append(self.pop(seq))
+        return expired
+
+    def next_deadline(self):
+        while self._deadlines:
+            deadline, _, seq = self._deadlines[0]
+            if self._is_live(deadline, seq):
+                return deadline
+            heapq.heappop(self._deadlines)
+        return None
+
+    def __len__(self):
+        return len(self.data)
+
+    def _is_live(self, deadline, seq):
+        # A heap entry is stale if its session was removed or re-added
+        return self._deadline_of.get(seq) == deadline
+
+    def _compact(self):
+        # Keep the heap proportional to the number of live sessions
+        if len(self._deadlines) > 2 * len(self.data) + 64:
+            self._deadlines = [
+                entry for entry in self._deadlines if self._is_live(entry[0], entry[2])
+            ]
+            heapq.heapify(self._deadlines)
@@ -0,0 +1,169 @@
+import json
+import time
+import socket
+import threading
+
+from . Store import Store
+
+
+class RedisError(Exception):
+    ''' Error reply of a Redis-protocol server '''
+
+
+class RedisConnection:
+    ''' Minimal blocking RESP2 client '''
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=5):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile('rb')
+        if password is not None:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands):
+        '''
+        Sends all commands at once and reads their replies
+        :param commands: list of argument tuples
+        :return: list of replies
+        '''
+        self._sock.sendall(b''.join(self._encode(args) for args in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+    @staticmethod
+    def _encode(args):
+        out = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(out)
+
+    def _read(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            return RedisError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            if length == -1:
+                return None
+            return [self._read() for _ in range(length)]
+        raise RedisError(f'Unknown reply {line!r}')
+
+
+class RedisStore(Store):
+    '''
+    Store in a Redis-protocol server, can be shared by workers on any host.
+    Each entry is a key with a TTL, a sorted set indexes entries by deadline.
+    Entries are serialized as JSON, so the context must be JSON serializable
+    '''
+
+    blocking = True
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None,
+                 prefix='torauth:', grace_sec=60):
+        '''
+        :param prefix: key prefix, allows several services to share a database
+        :param grace_sec: entries live this long after their deadline, if no worker
+            has expired them (e.g. all workers were down)
+        '''
+        self._lock = threading.Lock()
+        self._conn = RedisConnection(host, port, db, password)
+        self._prefix = prefix
+        self._deadlines = prefix + 'deadlines'
+        self._grace_sec = grace_sec
+
+    def put(self, seq, entry: dict, deadline: float) -> None:
+        self.put_many([(seq, entry, deadline)])
+
+    def put_many(self, items) -> None:
+        now = time.time()
+        commands = []
+        for seq, entry, deadline in items:
+            ttl_ms = max(1, int((deadline - now + self._grace_sec) * 1000))
+            commands.append(('SET', self._key(seq), json.dumps(entry), 'PX', ttl_ms))
+            commands.append(('ZADD', self._deadlines, repr(deadline), seq))
+        if commands:
+            self._transaction(commands)
+
+    def get(self, seq):
+        with self._lock:
+            value = self._conn.execute('GET', self._key(seq))
+        return None if value is None else json.loads(value)
+
+    def pop(self, seq):
+        value, _, _ = self._transaction(self._pop_commands(seq))
+        return None if value is None else json.loads(value)
+
+    def pop_expired(self, now: float) -> list:
+        with self._lock:
+            candidates = self._conn.execute(
+                'ZRANGEBYSCORE', self._deadlines, '-inf', f'({now!r}')
+        if not candidates:
+            return []
+        # One transaction per entry, all of them pipelined.
+        # An entry popped concurrently by another worker comes back as nil
+        commands = []
+        for seq in candidates:
+            commands.append(('MULTI',))
+            commands.extend(self._pop_commands(seq.decode()))
+            commands.append(('EXEC',))
+        with self._lock:
+            replies = self._conn.pipeline(commands)
+        expired = []
+        for reply in replies[4::5]:
+            if reply is not None and reply[0] is not None:
+                expired.append(json.loads(reply[0]))
+        return expired
+
+    def next_deadline(self):
+        with self._lock:
+            reply = self._conn.execute('ZRANGE', self._deadlines, 0, 0, 'WITHSCORES')
+        return float(reply[1]) if reply else None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('ZCARD', self._deadlines)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _key(self, seq):
+        return f'{self._prefix}s:{seq}'
+
+    def _pop_commands(self, seq):
+        return [
+            ('GET', self._key(seq)),
+            ('DEL', self._key(seq)),
+            ('ZREM', self._deadlines, seq),
+        ]
+
+    def _transaction(self, commands):
+        with self._lock:
+            replies = self._conn.pipeline([('MULTI',)] + commands + [('EXEC',)])
+        return replies[-1]
@@ -0,0 +1,90 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from . Store import Store
+
+
+class SQLiteStore(Store):
+    '''
+    Store in a SQLite database in WAL mode, can be shared by worker processes of one host.
+    Entries are serialized as JSON, so the context must be JSON serializable
+    '''
+
+    blocking = True
+
+    def __init__(self, path: str, timeout: float = 5):
+        '''
+        :param path: database file
+        :param timeout: how long to wait for a lock held by another worker
+        '''
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS sessions '
+            '(seq TEXT PRIMARY KEY, deadline REAL NOT NULL, entry TEXT NOT NULL)')
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS sessions_deadline ON sessions (deadline)')
+
+    def put(self, seq, entry: dict, deadline: float) -> None:
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO sessions (seq, deadline, entry) VALUES (?, ?, ?)',
+                (seq, deadline, json.dumps(entry)))
+
+    def put_many(self, items) -> None:
+        with self._lock, self._transaction():
+            self._db.executemany(
+                'INSERT OR REPLACE INTO sessions (seq, deadline, entry) VALUES (?, ?, ?)',
+                [(seq, deadline, json.dumps(entry)) for seq, entry, deadline in items])
+
+    def get(self, seq):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT entry FROM sessions WHERE seq = ?', (seq,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def pop(self, seq):
+        with self._lock, self._transaction():
+            row = self._db.execute(
+                'SELECT entry FROM sessions WHERE seq = ?', (seq,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('DELETE FROM sessions WHERE seq = ?', (seq,))
+        return json.loads(row[0])
+
+    def pop_expired(self, now: float) -> list:
+        with self._lock, self._transaction():
+            rows = self._db.execute(
+                'SELECT entry FROM sessions WHERE deadline < ? ORDER BY deadline',
+                (now,)).fetchall()
+            if rows:
+                self._db.execute('DELETE FROM sessions WHERE deadline < ?', (now,))
+        return [json.loads(row[0]) for row in rows]
+
+    def next_deadline(self):
+        with self._lock:
+            return self._db.execute('SELECT MIN(deadline) FROM sessions').fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent
+        # get-and-delete from other workers can't interleave
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except:
+            self._db.execute('ROLLBACK')
+            raise
+        self._db.execute('COMMIT')
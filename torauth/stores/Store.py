@@ -0,0 +1,56 @@
+class Store:
+    '''
+    Storage interface behind `Cache`.
+    Entries are dictionaries keyed by `seq`, each one has a deadline (as `time.time()`)
+    after which it is considered expired.
+    '''
+
+    # Calls wait for I/O, `Cache` runs them in a worker thread off the event loop
+    blocking = False
+
+    def put(self, seq, entry: dict, deadline: float) -> None:
+        '''
+        Saves an entry, replacing an existing one with the same `seq`
+        '''
+        raise NotImplementedError
+
+    def put_many(self, items) -> None:
+        '''
+        Saves several entries at once
+        :param items: iterable of (seq, entry, deadline)
+        '''
+        for seq, entry, deadline in items:
+            self.put(seq, entry, deadline)
+
+    def get(self, seq):
+        '''
+        :return: the entry or None
+        '''
+        raise NotImplementedError
+
+    def pop(self, seq):
+        '''
+        Atomically gets and deletes an entry.
+        When several workers share the store, only one of them gets the entry
+        :return: the entry or None
+        '''
+        raise NotImplementedError
+
+    def pop_expired(self, now: float) -> list:
+        '''
+        Atomically removes entries whose deadline is earlier than `now`
+        :return: list of removed entries, ordered by deadline
+        '''
+        raise NotImplementedError
+
+    def next_deadline(self):
+        '''
+        :return: the earliest deadline or None if the store is empty
+        '''
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
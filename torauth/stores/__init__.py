@@ -0,0 +1,17 @@
+from . Store import Store
+from . MemoryStore import MemoryStore
+from . open_store import open_store
+
+__all__ = ['Store', 'MemoryStore', 'SQLiteStore', 'RedisStore', 'open_store']
+
+
+def __getattr__(name):
+    # sqlite3 and the Redis client are imported only if their store is used (PEP 562)
+    if name == 'SQLiteStore':
+        from . SQLiteStore import SQLiteStore as store
+    elif name == 'RedisStore':
+        from . RedisStore import RedisStore as store
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = store
+    return store
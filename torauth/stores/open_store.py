@@ -0,0 +1,26 @@
+from urllib.parse import urlparse, unquote
+
+from . MemoryStore import MemoryStore
+
+
+def open_store(url: str):
+    '''
+    Creates a session store by its URL
+    :param url: `memory://`, `sqlite:///path/to/file.db` or `redis://[:password@]host[:port][/db]`
+    :return: Store
+    '''
+    parsed = urlparse(url)
+    if parsed.scheme == 'memory':
+        return MemoryStore()
+    if parsed.scheme == 'sqlite':
+        from torauth.stores import SQLiteStore
+        return SQLiteStore(unquote(parsed.netloc + parsed.path))
+    if parsed.scheme == 'redis':
+        from torauth.stores import RedisStore
+        db = parsed.path.strip('/')
+        return RedisStore(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=None if parsed.password is None else unquote(parsed.password))
+    raise ValueError(f'Unknown session store {url}')
@@ -5,3 +5,4 @@ from . hex_to_base64 import *
 from . calc_address import *
 from . credit import *
 from . process_message import *
+from . body_function_id import *
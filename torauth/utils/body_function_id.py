@@ -0,0 +1,47 @@
+import base64
+
+BOC_MAGIC = b'\xb5\xee\x9c\x72'
+
+
+def body_function_id(body: str):
+    '''
+    Reads the function id (the first 32 bits of the root cell) of a message body
+    without a call to TonClient
+    :param body: message body BOC encoded in base64
+    :return: int or None if the body is too short or the BOC layout is not supported
+    '''
+    try:
+        boc = base64.b64decode(body)
+    except ValueError:
+        return None
+    if boc[:4] != BOC_MAGIC or len(boc) < 6:
+        return None
+    has_idx = boc[4] & 0x80
+    size = boc[4] & 0x07
+    off_bytes = boc[5]
+    pos = 6
+    cells = int.from_bytes(boc[pos:pos + size], 'big')
+    pos += size
+    roots = int.from_bytes(boc[pos:pos + size], 'big')
+    pos += 2 * size + off_bytes
+    if roots == 0:
+        return None
+    root = int.from_bytes(boc[pos:pos + size], 'big')
+    pos += roots * size
+    if has_idx:
+        pos += cells * off_bytes
+
+    # Cells are serialized one by one: descriptors, data, references
+    for i in range(root + 1):
+        if pos + 2 > len(boc):
+            return None
+        d1, d2 = boc[pos], boc[pos + 1]
+        if d1 & 0x10:
+            # Cell with stored hashes
+            return None
+        pos += 2
+        if i == root:
+            if d2 // 2 < 4:
+                return None
+            return int.from_bytes(boc[pos:pos + 4], 'big')
+        pos += (d2 + 1) // 2 + (d1 & 0x07) * size
@@ -1,10 +1,101 @@
-from tonclient.types import ParamsOfEncodeMessage
+import os
+import json
+import hashlib
+import logging
+
+from tonclient.types import ParamsOfEncodeMessage, Signer
+
+log = logging.getLogger(__name__)
+
+
+class AddressCache:
+    '''
+    Addresses of contracts depend only on the ABI, the deploy set (code and initial data)
+    and the public key, so they are kept by a hash of them.
+    Optionally the cache is saved to a file and survives restarts.
+    '''
+
+    def __init__(self, path: str = None):
+        '''
+        :param path: JSON file to load the cache from and to save it to, memory only by default
+        '''
+        self.hits = 0
+        self.misses = 0
+        self.addresses = {}
+        self.path = None
+        if path is not None:
+            self.persist_to(path)
+
+    def persist_to(self, path: str) -> None:
+        '''
+        Loads addresses saved to the file, new addresses are saved there too
+        '''
+        self.path = path
+        if os.path.isfile(path):
+            try:
+                with open(path) as fp:
+                    self.addresses.update(json.load(fp))
+            except (OSError, ValueError) as err:
+                log.warning(f'Address cache {path} is not loaded: {err}')
+
+    def get(self, key: str):
+        address = self.addresses.get(key)
+        if address is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return address
+
+    def put(self, key: str, address: str) -> None:
+        self.addresses[key] = address
+        if self.path is not None:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as fp:
+                json.dump(self.addresses, fp)
+            os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.addresses.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(abi, signer, deploy_set):
+        '''
+        :return: hash of everything the address depends on,
+            None if the public key is not known (e.g. it is in a signing box)
+        '''
+        if isinstance(signer, Signer.Keys):
+            public = signer.keys.public
+        elif isinstance(signer, Signer.External):
+            public = signer.public_key
+        elif isinstance(signer, Signer.NoSigner):
+            public = None
+        else:
+            return None
+        content = json.dumps([abi.dict, deploy_set.dict, public], sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+address_cache = AddressCache()
+
+
+async def calc_address(client, abi, signer, deploy_set, use_cache: bool = True):
+    '''
+    :param use_cache: take the address from `address_cache` if it was calculated before
+    '''
+    key = AddressCache.key(abi, signer, deploy_set) if use_cache else None
+    if key is not None:
+        address = address_cache.get(key)
+        if address is not None:
+            return address
 
-async def calc_address(client, abi, signer, deploy_set):
     msg = await client.abi.encode_message(params=ParamsOfEncodeMessage(
         abi=abi,
         signer=signer,
         deploy_set=deploy_set
     ))
 
+    if key is not None:
+        address_cache.put(key, msg.address)
     return msg.address
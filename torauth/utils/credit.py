@@ -1,26 +1,111 @@
 from tonclient.types import Signer, CallSet, ParamsOfEncodeMessage, ParamsOfProcessMessage
-import os
+import weakref
 import logging
+import asyncio
 
 from . process_message import process_message
 
 log = logging.getLogger(__name__)
 
 
+class CreditCoordinator:
+    '''
+    Sends the credits of one giver. Concurrent external messages of the giver
+    are rejected by its replay protection and retried, so the requests are queued
+    and sent by up to `max_in_flight` messages at a time. Requests to the same
+    address made while waiting are combined into one message: the giver ABI
+    has one destination per `sendTransaction`.
+    '''
+
+    def __init__(self, cfg, max_in_flight: int = 1):
+        '''
+        :param cfg: Configuration object, containing the giver ABI, address and keys
+        :param max_in_flight: number of giver messages processed at once
+        '''
+        self.cfg = cfg
+        self.client = cfg.client
+        self.max_in_flight = max_in_flight
+        self.pending = {}  # address -> [value, futures], in the order of requests
+        self.in_flight = 0
+        self.requests = 0
+        self.messages = 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._task = None
+        self._sends = set()
+
+    def credit(self, address: str, value) -> asyncio.Future:
+        '''
+        :return: future, done when the value is sent
+        '''
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = self.pending.setdefault(address, [0, []])
+        entry[0] += int(value)
+        entry[1].append(future)
+        self.requests += 1
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return future
+
+    async def _run(self):
+        while self.pending:
+            await self._slots.acquire()
+            address = next(iter(self.pending))
+            value, futures = self.pending.pop(address)
+            send = asyncio.create_task(self._send(address, value, futures))
+            self._sends.add(send)
+            send.add_done_callback(self._sends.discard)
+
+    async def _send(self, address, value, futures):
+        log.debug(f'Sending {value} to {address} for {len(futures)} request(s)')
+        self.in_flight += 1
+        self.messages += 1
+        try:
+            await process_message(client=self.client, params=credit_params(self.cfg, address, value))
+        except Exception as err:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(err)
+        else:
+            for future in futures:
+                if not future.done():
+                    future.set_result(None)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+
+# Coordinators of the running event loops, by giver address and client
+_coordinators = weakref.WeakKeyDictionary()
+
+
+def credit_coordinator(cfg) -> CreditCoordinator:
+    '''
+    :return: coordinator of the giver in the running event loop
+    '''
+    coordinators = _coordinators.setdefault(asyncio.get_running_loop(), {})
+    key = (cfg.giver_address, id(cfg.client))
+    if key not in coordinators:
+        coordinators[key] = CreditCoordinator(cfg, cfg.giver_max_in_flight)
+    return coordinators[key]
+
+
+def credit_params(cfg, address, value):
+    return ParamsOfProcessMessage(
+        message_encode_params=ParamsOfEncodeMessage(
+            abi=cfg.giver_abi,
+            signer=Signer.Keys(cfg.giver_keys),
+            address=cfg.giver_address,
+            call_set=CallSet(
+                function_name='sendTransaction',
+                input={'dest': address, 'value': value, 'bounce': False}
+            )
+        ), send_events=False
+    )
+
+
 def credit(cfg, address, value):
 
     log.debug(f'Sending {value} to {address}')
 
-    return process_message(
-        client=cfg.client,
-        params=ParamsOfProcessMessage(
-            message_encode_params=ParamsOfEncodeMessage(
-                abi=cfg.giver_abi,
-                signer=Signer.Keys(cfg.giver_keys),
-                address=cfg.giver_address,
-                call_set=CallSet(
-                    function_name='sendTransaction',
-                    input={'dest': address, 'value': value, 'bounce': False}
-                )
-            ), send_events=False
-        ))
+    return credit_coordinator(cfg).credit(address, value)